@@ -0,0 +1,143 @@
+import os
+
+
+"""
+This module holds the runtime settings for the application. Settings are read from environment variables
+so the API, the data loader and the tests can switch behaviour without code changes.
+Modules should read settings as `config.SETTING` at call time rather than importing the names directly,
+so that overrides (e.g. pytest's monkeypatch) are picked up.
+"""
+
+
+def env_bool(name: str, default: bool) -> bool:
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# Path of the SQLite database file, defaults to `app/database/trustpilot_reviews.db`
+DATABASE_PATH = os.environ.get("REVIEWS_DB_PATH")
+
+# How `review_date` is stored in SQLite. The mode is fixed when the `reviews` table is created.
+#   "iso"        - ISO-8601 text (`YYYY-MM-DD`) in a `DATE` column
+#   "epoch_days" - INTEGER days since 1970-01-01, compact and compared numerically in range queries
+REVIEW_DATE_STORAGE = os.environ.get("REVIEW_DATE_STORAGE", "iso")
+
+# How the reviews are laid out in SQLite, also fixed when the database is created.
+#   "single"      - one `reviews` table
+#   "partitioned" - one table per month of `review_date` behind a `reviews` view, see `app/database/partitions.py`
+#   "split"       - `review_content` in a side table, joined only when requested, see `app/database/split_layout.py`
+STORAGE_LAYOUT = os.environ.get("STORAGE_LAYOUT", "single")
+# SQLite tuning profile applied to every connection: "default", "read_heavy", "write_heavy" or "bulk_load",
+# see `app/database/tuning.py`
+STORAGE_PROFILE = os.environ.get("STORAGE_PROFILE", "default")
+# With the split layout, store long `review_content` values zlib-compressed. Can be changed at any time, each
+# value is read back according to how it was stored.
+CONTENT_COMPRESSION = env_bool("CONTENT_COMPRESSION", True)
+
+# Data loading. With compact dtypes the cleaning pipeline keeps `country` and `country_code` as categoricals,
+# free text as Arrow-backed strings when pyarrow is installed, and ratings in the smallest integer type that fits.
+COMPACT_DTYPES = env_bool("COMPACT_DTYPES", False)
+# Log the DataFrame memory after each stage of the cleaning pipeline. Measuring it reads every string.
+REPORT_DATAFRAME_MEMORY = env_bool("REPORT_DATAFRAME_MEMORY", False)
+
+# Logging. Records are handed to a background writer thread through a bounded queue, so the request thread
+# never waits on file I/O or message formatting. When the queue is full new records are dropped.
+LOG_ASYNC = env_bool("LOG_ASYNC", True)
+LOG_QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", "10000"))
+# "text" for the classic `time - logger - level - message` lines, "json" for one JSON object per line
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "text")
+# Fraction of DEBUG/INFO records that are kept, WARNING and above are always kept
+LOG_SAMPLE_RATE = float(os.environ.get("LOG_SAMPLE_RATE", "1.0"))
+# Messages longer than this are truncated when written
+LOG_MAX_MESSAGE_CHARS = int(os.environ.get("LOG_MAX_MESSAGE_CHARS", "2000"))
+LOG_TO_CONSOLE = env_bool("LOG_TO_CONSOLE", True)
+
+# Slow-query log. SQL operations slower than the threshold are kept, with their query plan, in a ring buffer
+# exposed at `/admin/slow-queries`. A negative threshold disables the log.
+SLOW_QUERY_THRESHOLD_MS = float(os.environ.get("SLOW_QUERY_THRESHOLD_MS", "100"))
+SLOW_QUERY_LOG_SIZE = int(os.environ.get("SLOW_QUERY_LOG_SIZE", "100"))
+
+# Production server, see `app/server.py`. Workers are separate processes sharing the database file in WAL mode.
+SERVER_WORKERS = int(os.environ.get("SERVER_WORKERS", str(os.cpu_count() or 1)))
+# Seconds a worker waits for in-flight requests to finish when it is stopped or restarted
+SERVER_GRACEFUL_TIMEOUT = float(os.environ.get("SERVER_GRACEFUL_TIMEOUT", "30"))
+# Warm each worker up before it accepts traffic: open a database connection, load the country tables and
+# read the database file so its pages are in the OS page cache
+WARM_UP_ON_STARTUP = env_bool("WARM_UP_ON_STARTUP", True)
+# Upper bound on the bytes of the database file read during warm-up, 0 skips priming the page cache
+WARM_UP_MAX_BYTES = int(os.environ.get("WARM_UP_MAX_BYTES", str(256 * 2 ** 20)))
+
+# Background mutation jobs (`?background=true` on `/reviews/delete` and `/reviews/update`). Matching rows are
+# changed this many ids at a time, with a pause between batches so other writers can take the write lock.
+JOB_BATCH_SIZE = int(os.environ.get("JOB_BATCH_SIZE", "1000"))
+JOB_BATCH_PAUSE_MS = float(os.environ.get("JOB_BATCH_PAUSE_MS", "10"))
+# Jobs run one at a time by default, concurrent jobs would only contend for the write lock
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "1"))
+# Finished jobs kept for progress queries
+JOB_HISTORY_SIZE = int(os.environ.get("JOB_HISTORY_SIZE", "100"))
+
+# File uploads to `/reviews/upload`, loaded by a background job. Uploads are streamed to this directory,
+# defaulting to the system temp directory, and larger uploads are refused.
+UPLOAD_DIR = os.environ.get("UPLOAD_DIR")
+UPLOAD_MAX_BYTES = int(os.environ.get("UPLOAD_MAX_BYTES", str(2 * 2 ** 30)))
+# Rows written per commit by an upload job
+UPLOAD_CHUNK_ROWS = int(os.environ.get("UPLOAD_CHUNK_ROWS", "50000"))
+
+# Rows `ANALYZE` samples per index when refreshing the statistics behind estimated counts
+# (`/reviews/select?count=estimated`), 0 reads every row
+ANALYZE_ROW_LIMIT = int(os.environ.get("ANALYZE_ROW_LIMIT", "1000"))
+
+# Admission control. Reads and writes each have a pool of requests allowed to run at once, with a bounded queue
+# of requests waiting for a slot. Requests are shed with 429 when the queue is full, and with 503 when they
+# waited longer than the queue timeout, both with `Retry-After`. SQLite runs one write at a time, so writes
+# get a small pool.
+ADMISSION_CONTROL = env_bool("ADMISSION_CONTROL", True)
+ADMISSION_READ_LIMIT = int(os.environ.get("ADMISSION_READ_LIMIT", "24"))
+ADMISSION_READ_QUEUE = int(os.environ.get("ADMISSION_READ_QUEUE", "100"))
+ADMISSION_READ_QUEUE_TIMEOUT_MS = float(os.environ.get("ADMISSION_READ_QUEUE_TIMEOUT_MS", "2000"))
+ADMISSION_WRITE_LIMIT = int(os.environ.get("ADMISSION_WRITE_LIMIT", "4"))
+ADMISSION_WRITE_QUEUE = int(os.environ.get("ADMISSION_WRITE_QUEUE", "50"))
+ADMISSION_WRITE_QUEUE_TIMEOUT_MS = float(os.environ.get("ADMISSION_WRITE_QUEUE_TIMEOUT_MS", "2000"))
+# Serve selects from an in-memory copy of the database, loaded when each worker starts and kept current from the
+# change log, which has to be enabled. Writes of other processes are picked up every READ_REPLICA_SYNC_INTERVAL
+# seconds, see `app/database/read_replica.py`.
+READ_REPLICA = env_bool("READ_REPLICA", False)
+READ_REPLICA_SYNC_INTERVAL = float(os.environ.get("READ_REPLICA_SYNC_INTERVAL", "1"))
+
+# Query cost guards of `/reviews/select`. Selects without a `limit` matching more than SELECT_DEFAULT_LIMIT rows,
+# and a larger `limit` than SELECT_MAX_LIMIT, are rejected, callers page through with `limit` and `offset` instead.
+# Statements running longer than QUERY_TIMEOUT_MS are interrupted, 0 disables the deadline.
+SELECT_DEFAULT_LIMIT = int(os.environ.get("SELECT_DEFAULT_LIMIT", "1000"))
+SELECT_MAX_LIMIT = int(os.environ.get("SELECT_MAX_LIMIT", "10000"))
+QUERY_TIMEOUT_MS = float(os.environ.get("QUERY_TIMEOUT_MS", "5000"))
+# Most queries `/reviews/select/batch` runs in one request, each with the guards above
+SELECT_BATCH_MAX_QUERIES = int(os.environ.get("SELECT_BATCH_MAX_QUERIES", "50"))
+# Tag select responses with an ETag built from the data version of the reviews, and answer a matching
+# If-None-Match with 304 without running the query
+SELECT_ETAGS = env_bool("SELECT_ETAGS", True)
+# Seconds clients are asked to wait before retrying a shed request, or one that hit a locked database
+ADMISSION_RETRY_AFTER = int(os.environ.get("ADMISSION_RETRY_AFTER", "1"))
+
+# Change log behind `/reviews/changes`. Every insert, update and delete appends one entry per review, which
+# downstream consumers read to sync incrementally. Entries older than the retention are pruned on server start
+# and after data loads.
+CHANGE_LOG = env_bool("CHANGE_LOG", True)
+CHANGE_LOG_RETENTION_DAYS = float(os.environ.get("CHANGE_LOG_RETENTION_DAYS", "7"))
+# Longest `wait` of a long-polling `/reviews/changes` request, and how often new changes are checked for
+CHANGE_FEED_MAX_WAIT = float(os.environ.get("CHANGE_FEED_MAX_WAIT", "30"))
+CHANGE_FEED_POLL_INTERVAL = float(os.environ.get("CHANGE_FEED_POLL_INTERVAL", "0.5"))
+
+# Scheduled database maintenance, see `app/database/maintenance.py`. Each worker checks every
+# MAINTENANCE_CHECK_INTERVAL seconds and only runs due tasks once it served no request for
+# MAINTENANCE_QUIET_SECONDS. Each task runs at most once per its interval in seconds, 0 disables it.
+MAINTENANCE = env_bool("MAINTENANCE", True)
+MAINTENANCE_CHECK_INTERVAL = float(os.environ.get("MAINTENANCE_CHECK_INTERVAL", "60"))
+MAINTENANCE_QUIET_SECONDS = float(os.environ.get("MAINTENANCE_QUIET_SECONDS", "30"))
+MAINTENANCE_OPTIMIZE_INTERVAL = float(os.environ.get("MAINTENANCE_OPTIMIZE_INTERVAL", "3600"))
+MAINTENANCE_ANALYZE_INTERVAL = float(os.environ.get("MAINTENANCE_ANALYZE_INTERVAL", "86400"))
+MAINTENANCE_VACUUM_INTERVAL = float(os.environ.get("MAINTENANCE_VACUUM_INTERVAL", "3600"))
+MAINTENANCE_PRUNE_INTERVAL = float(os.environ.get("MAINTENANCE_PRUNE_INTERVAL", "3600"))
+# Pages given back to the file system per vacuum run, 0 for every free page
+MAINTENANCE_VACUUM_PAGES = int(os.environ.get("MAINTENANCE_VACUUM_PAGES", "10000"))
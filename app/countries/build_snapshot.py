@@ -0,0 +1,37 @@
+import json
+
+import country_converter as coco
+
+from app.countries.lookup import SNAPSHOT_PATH
+
+"""
+This module regenerates `country_snapshot.json` from the tables shipped with country_converter. Run it after
+upgrading country_converter:
+
+    python -m app.countries.build_snapshot
+"""
+
+SNAPSHOT_COLUMNS = ["name_short", "ISO2", "ISO3", "ISOnumeric", "regex"]
+
+
+def snapshot_value(value):
+    value = value.item() if hasattr(value, "item") else value
+    # Some releases read the numeric codes as floats, matched without their `.0`
+    return int(value) if isinstance(value, float) and value.is_integer() else value
+
+
+def build_snapshot() -> dict:
+    data = coco.CountryConverter().data
+    countries = [[snapshot_value(value) for value in row] for row in data[SNAPSHOT_COLUMNS].itertuples(index=False)]
+    return {"source": f"country_converter {coco.__version__}", "columns": SNAPSHOT_COLUMNS,
+            "countries": countries}
+
+
+def write_snapshot(path: str = SNAPSHOT_PATH) -> str:
+    with open(path, "w", encoding="utf-8") as snapshot_file:
+        json.dump(build_snapshot(), snapshot_file, ensure_ascii=False, separators=(",", ":"))
+    return path
+
+
+if __name__ == "__main__":
+    print(f"Wrote {write_snapshot()}")
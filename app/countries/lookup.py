@@ -0,0 +1,145 @@
+import json
+import os
+import re
+import threading
+from typing import Dict, List, Union
+
+from app.countries.matcher import PatternMatcher
+
+"""
+This module resolves country names, ISO codes and ISO numeric codes from a precompiled snapshot of the
+country_converter tables (`country_snapshot.json`), with the same matching rules as
+`country_converter.CountryConverter.convert`:
+
+    - a number is matched against the ISO numeric code
+    - two characters are matched against the ISO2 code patterns
+    - three characters are matched exactly (ignoring case) against the ISO3 code
+    - anything longer is searched with each country's regular expression, through a `PatternMatcher` that
+      only runs the expressions whose literal text is in the name
+    - anything after an exclusion prefix ("excluding ...", "without", "w/o") is ignored
+
+Loading the snapshot takes a few milliseconds, whereas importing country_converter pulls in pandas and parses
+its full table. Results are memoised per name, since review data repeats the same few countries, up to
+`MAX_MEMOISED_NAMES` names so a column of free text can't grow the memo without bound. Regenerate
+the snapshot with `python -m app.countries.build_snapshot` after upgrading country_converter.
+"""
+
+SNAPSHOT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "country_snapshot.json")
+
+NOT_FOUND = "not found"
+# Names memoised by `CountryLookup.find`, names beyond it are matched every time
+MAX_MEMOISED_NAMES = 100_000
+EXCLUDE_PREFIX = re.compile(r"excl\w.*|without|w/o")
+# Output classifications in the snapshot, with the aliases country_converter accepts for them
+CLASSIFICATION_ALIASES = {
+    "name_short": "name_short", "short": "name_short", "short_name": "name_short", "name": "name_short",
+    "names": "name_short", "iso2": "ISO2", "iso3": "ISO3", "isonumeric": "ISOnumeric", "isocode": "ISOnumeric",
+}
+
+
+class CountryLookup:
+    """
+    Converts country names between classifications using a loaded snapshot.
+
+    Args:
+        snapshot (dict): The snapshot, with a `columns` list and one row per country in `countries`.
+    """
+
+    def __init__(self, snapshot: dict):
+        columns = snapshot["columns"]
+        self.rows = [dict(zip(columns, row)) for row in snapshot["countries"]]
+        self.name_matcher = PatternMatcher([row["regex"] for row in self.rows])
+        self.iso2_matcher = PatternMatcher([row["ISO2"] for row in self.rows])
+        self.iso3_index = self.exact_index("ISO3")
+        self.isonumeric_index = self.exact_index("ISOnumeric")
+        self.matches_by_name: Dict[str, List[int]] = {}
+        self.lock = threading.Lock()
+
+    def exact_index(self, column: str) -> Dict[str, List[int]]:
+        index = {}
+        for position, row in enumerate(self.rows):
+            index.setdefault(str(row[column]).lower(), []).append(position)
+        return index
+
+    def find(self, name: str) -> List[int]:
+        """
+        Returns the positions of the countries matching `name`, memoised per name.
+        """
+        matches = self.matches_by_name.get(name)
+        if matches is None:
+            matches = self.match(EXCLUDE_PREFIX.split(name)[0])
+            if len(self.matches_by_name) < MAX_MEMOISED_NAMES:
+                with self.lock:
+                    self.matches_by_name[name] = matches
+        return matches
+
+    def match(self, name: str) -> List[int]:
+        try:
+            int(name)
+            return self.isonumeric_index.get(name.lower(), [])
+        except ValueError:
+            pass
+        if len(name) == 3:
+            return self.iso3_index.get(name.lower(), [])
+        matcher = self.iso2_matcher if len(name) == 2 else self.name_matcher
+        return matcher.search(name)
+
+    def convert(self, name, to: str = "ISO3", not_found: str = NOT_FOUND) -> Union[str, int, List]:
+        """
+        Converts one name to the `to` classification.
+
+        Args:
+            name: The country name or code.
+            to (str): The output classification: "name_short" (or "short_name"), "ISO2", "ISO3" or "ISOnumeric".
+            not_found (str): Returned when nothing matches, or the name itself when None.
+
+        Returns:
+            The converted value, or a list of values when the name matches more than one country.
+        """
+        name = str(name)
+        column = output_column(to)
+        results = [output_value(self.rows[position][column], column) for position in self.find(name)]
+        if not results:
+            return not_found or name
+        return results[0] if len(results) == 1 else results
+
+
+def output_column(to: str) -> str:
+    column = CLASSIFICATION_ALIASES.get(to.lower())
+    if column is None:
+        raise KeyError(f"{to} is not a supported country classification")
+    return column
+
+
+def output_value(value, column: str):
+    if column in ("ISO2", "ISO3"):
+        # ISO2 entries may be patterns such as `^GB$|^UK$`, the first code is the canonical one
+        value = "".join(c for c in str(value).split("|")[0] if c.isalnum()).upper()
+    try:
+        return int(value)
+    except ValueError:
+        return value
+
+
+lookup = None
+lookup_lock = threading.Lock()
+
+
+def country_lookup() -> CountryLookup:
+    """
+    Returns the process-wide lookup, loading the snapshot on first use.
+    """
+    global lookup
+    if lookup is None:
+        with lookup_lock:
+            if lookup is None:
+                with open(SNAPSHOT_PATH, encoding="utf-8") as snapshot_file:
+                    lookup = CountryLookup(json.load(snapshot_file))
+    return lookup
+
+
+def convert_country(name, to: str = "ISO3", not_found: str = NOT_FOUND):
+    """
+    Converts a country name or code, see `CountryLookup.convert`.
+    """
+    return country_lookup().convert(name, to=to, not_found=not_found)
@@ -0,0 +1,145 @@
+import re
+from typing import Dict, FrozenSet, List, Optional
+
+try:
+    from re import _constants as sre_constants, _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_constants
+    import sre_parse
+
+"""
+This module matches a name against every country pattern of the snapshot in close to one pass over the name,
+instead of running each of the 250 regular expressions on it.
+
+Every pattern is reduced to the literal text any match of it must contain: `'^(?=.*americ).*samoa'` can only
+match a name containing "americ", and `'benin|dahome'` one containing "benin" or "dahome". The literals of all
+patterns are compiled into a single trie-shaped regular expression, so one scan of the name lists the
+literals it contains, and only the patterns those literals belong to are run, along with the few patterns no
+literal could be taken from. The regular expressions still decide every match, the literals only rule out
+patterns that can't match, so the results are those of running all the patterns in order (`scan`).
+
+Patterns are matched ignoring case. Names are folded the way `re.IGNORECASE` compares them with ASCII letters:
+lowercased, with the four non-ASCII characters it treats as equal to an ASCII letter mapped to that letter.
+"""
+
+# Non-ASCII characters `re.IGNORECASE` matches with an ASCII letter
+ASCII_FOLDS = str.maketrans({"İ": "i", "ı": "i", "ſ": "s", "K": "k"})
+# Pattern items that don't consume text, so the literals on either side of them are adjacent in the name
+ZERO_WIDTH = {sre_constants.AT, sre_constants.ASSERT, sre_constants.ASSERT_NOT}
+REPEATS = {sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT,
+           getattr(sre_constants, "POSSESSIVE_REPEAT", sre_constants.MAX_REPEAT)}
+
+
+def fold(text: str) -> str:
+    return text.translate(ASCII_FOLDS).lower()
+
+
+def required_literals(items) -> Optional[FrozenSet[str]]:
+    """
+    Returns literals one of which any text matching the parsed pattern `items` contains, or None when the
+    pattern doesn't require any. Of the alternatives found, the set whose shortest literal is longest is kept,
+    since it rules out the most names.
+    """
+    candidates = []
+    run = []
+
+    def end_run():
+        if run:
+            candidates.append(frozenset(["".join(run)]))
+            run.clear()
+
+    for op, value in items:
+        if op is sre_constants.LITERAL and value < 128:
+            run.append(chr(value).lower())
+            continue
+        if op in ZERO_WIDTH:
+            if op is sre_constants.ASSERT:
+                # A lookaround's text is somewhere in the name, not necessarily next to the run
+                candidates.append(required_literals(value[1]))
+            continue
+        end_run()
+        if op is sre_constants.SUBPATTERN:
+            candidates.append(required_literals(value[-1]))
+        elif op is sre_constants.BRANCH:
+            alternatives = [required_literals(branch) for branch in value[1]]
+            if all(alternatives):
+                candidates.append(frozenset().union(*alternatives))
+        elif op in REPEATS and value[0] >= 1:
+            candidates.append(required_literals(value[2]))
+    end_run()
+    candidates = [candidate for candidate in candidates if candidate]
+    return max(candidates, key=lambda literals: min(map(len, literals)), default=None)
+
+
+def trie_pattern(literals: List[str]) -> str:
+    """
+    Returns a regular expression matching the longest of `literals` starting at a position, written as a trie
+    so each character of the name is compared at most once per branch.
+    """
+    trie = {}
+    for literal in literals:
+        node = trie
+        for char in literal:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def pattern(node) -> str:
+        branches = [re.escape(char) + pattern(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        # Optional when a literal ends here, greedy so longer literals are tried first
+        return f"(?:{body})?" if "" in node else body
+
+    return pattern(trie)
+
+
+class PatternMatcher:
+    """
+    Finds which of `patterns` match a name, see the module docstring.
+
+    Args:
+        patterns (list): Regular expressions, matched with `re.IGNORECASE`.
+    """
+
+    def __init__(self, patterns: List[str]):
+        self.regexes = [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
+        self.always_run: List[int] = []
+        positions_by_literal: Dict[str, List[int]] = {}
+        for position, pattern in enumerate(patterns):
+            literals = required_literals(sre_parse.parse(pattern, re.IGNORECASE))
+            if literals is None:
+                self.always_run.append(position)
+                continue
+            for literal in literals:
+                positions_by_literal.setdefault(literal, []).append(position)
+        # A match of the trie is the longest literal at its position, the shorter ones it starts with are there too
+        self.positions_by_match = {
+            literal: {position for prefix, positions in positions_by_literal.items() if literal.startswith(prefix)
+                      for position in positions}
+            for literal in positions_by_literal
+        }
+        literals = sorted(positions_by_literal)
+        self.literal_regex = re.compile(f"(?=({trie_pattern(literals)}))") if literals else None
+
+    def candidates(self, name: str) -> List[int]:
+        """
+        Returns the positions of the patterns that may match `name`, in order.
+        """
+        positions = set(self.always_run)
+        if self.literal_regex is not None:
+            for literal in {match.group(1) for match in self.literal_regex.finditer(fold(name))}:
+                positions.update(self.positions_by_match[literal])
+        return sorted(positions)
+
+    def search(self, name: str) -> List[int]:
+        """
+        Returns the positions of the patterns found in `name`, in order.
+        """
+        return [position for position in self.candidates(name) if self.regexes[position].search(name)]
+
+    def scan(self, name: str) -> List[int]:
+        """
+        Runs every pattern on `name`, the reference `search` is checked and benchmarked against.
+        """
+        return [position for position, regex in enumerate(self.regexes) if regex.search(name)]
@@ -1,5 +1,11 @@
-from app.database.database import create_connection
+from app.database.change_log import INSERT, log_changes
+from app.database.database import create_connection, raise_if_busy
 from app.database.database_logger import database_logger
+from app.database.date_storage import to_storage_date
+from app.database.read_replica import sync_replica
+from app.database.partitions import allocate_ids, ensure_partition, month_key, uses_partitions
+from app.database.split_layout import uses_split_layout, write_contents
+from app.monitoring.metrics import observe_query
 from sqlite3 import Error as SQLiteError
 from app.models.models import Review
 from typing import List
@@ -19,27 +25,80 @@ def insert_reviews(reviews: List[Review]):
     with create_connection() as conn:
         try:
             cursor = conn.cursor()
-            for review in reviews:
-                # Prepare and execute the INSERT query for each review
-                insert_query = """INSERT INTO reviews (reviewer_name, review_title, review_rating, review_content,
-                                email_address, country, country_code, review_date) VALUES (?, ?, ?, ?, ?, ?, ?, ?)"""
-                params = [review.reviewer_name, review.review_title, review.review_rating,
-                          review.review_content, review.email_address, review.country,
-                          review.country_code, review.review_date]
-
-                cursor.execute(insert_query, params)
-                last_row_id = cursor.lastrowid  # ID of the last inserted row
-                inserted_ids.append(last_row_id)  # Collect all inserted row IDs
-                database_logger.info(f"Inserted row into `reviews` table where `id`={last_row_id}")
-
-            conn.commit()
+            with observe_query("insert") as query:
+                if uses_partitions():
+                    inserted_ids = insert_into_partitions(conn, reviews)
+                elif uses_split_layout():
+                    inserted_ids = insert_into_split_tables(conn, reviews)
+                else:
+                    for review in reviews:
+                        # Prepare and execute the INSERT query for each review
+                        insert_query = """INSERT INTO reviews (reviewer_name, review_title, review_rating, review_content,
+                                        email_address, country, country_code, review_date) VALUES (?, ?, ?, ?, ?, ?, ?, ?)"""
+                        params = [review.reviewer_name, review.review_title, review.review_rating,
+                                  review.review_content, review.email_address, review.country,
+                                  review.country_code, to_storage_date(review.review_date)]
+
+                        cursor.execute(insert_query, params)
+                        last_row_id = cursor.lastrowid  # ID of the last inserted row
+                        inserted_ids.append(last_row_id)  # Collect all inserted row IDs
+
+                log_changes(conn, inserted_ids, INSERT)
+                conn.commit()
+                query.rows = len(inserted_ids)
+            # One summary record instead of a record per row
+            database_logger.info("Inserted %s rows into `reviews` table where `id` in %s", len(inserted_ids), inserted_ids)
         except SQLiteError as error:
-            database_logger.error(f"Failed to insert data into sqlite table: {error}")
+            database_logger.error("Failed to insert data into sqlite table: %s", error)
+            raise_if_busy(error)
             return None
 
+    sync_replica()
     return inserted_ids
 
 
+def insert_into_partitions(conn, reviews: List[Review]) -> List[int]:
+    """
+    Inserts reviews into the partition of their `review_date` month, with ids from the shared id sequence.
+
+    Returns:
+        List[int]: The ids of the inserted reviews.
+    """
+    ids = allocate_ids(conn, len(reviews))
+    partitions = {}
+    for review_id, review in zip(ids, reviews):
+        review_date = to_storage_date(review.review_date)
+        key = month_key(review.review_date)
+        if key not in partitions:
+            partitions[key] = ensure_partition(conn, key)
+        partition = partitions[key]
+        conn.execute(f"""INSERT INTO {partition} (id, reviewer_name, review_title, review_rating, review_content,
+                     email_address, country, country_code, review_date) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                     [review_id, review.reviewer_name, review.review_title, review.review_rating,
+                      review.review_content, review.email_address, review.country, review.country_code,
+                      review_date])
+    return ids
+
+
+def insert_into_split_tables(conn, reviews: List[Review]) -> List[int]:
+    """
+    Inserts reviews into `reviews` and their text into the content table, with the split layout.
+
+    Returns:
+        List[int]: The ids of the inserted reviews.
+    """
+    ids = []
+    for review in reviews:
+        cursor = conn.execute("""INSERT INTO reviews (reviewer_name, review_title, review_rating, email_address,
+                              country, country_code, review_date) VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                              [review.reviewer_name, review.review_title, review.review_rating,
+                               review.email_address, review.country, review.country_code,
+                               to_storage_date(review.review_date)])
+        ids.append(cursor.lastrowid)
+    write_contents(conn, zip(ids, (review.review_content for review in reviews)))
+    return ids
+
+
 if __name__ == "__main__":
     # Example usage of insert_reviews
     reviews = [
@@ -1,8 +1,13 @@
 from sqlite3 import Error as SQLiteError
-from app.database.database import create_connection
+from app.database.change_log import DELETE, log_matching, log_truncate
+from app.database.database import create_connection, raise_if_busy
 from app.database.database_logger import database_logger
+from app.monitoring.metrics import observe_query
 from app.models.models import Condition
 from app.crud.utils import build_where_clause
+from app.database.partitions import write_tables
+from app.database.read_replica import sync_replica
+from app.database.split_layout import truncate_split_tables, uses_split_layout
 from typing import List
 
 
@@ -20,23 +25,42 @@ def delete_reviews(conditions: List[Condition] = None):
     with create_connection() as conn:
         try:
             cursor = conn.cursor()
-            if not conditions:  # Delete all records
-                where_clause = "1 = 1;"
-                params = []
+            rows_deleted = 0
+            if conditions:
+                log_matching(conn, DELETE, *build_where_clause(conditions))
             else:
-                where_clause, params = build_where_clause(conditions)
-
-            delete_statement = f"DELETE FROM reviews WHERE {where_clause}"
-            database_logger.info(f"Executing delete statement: {delete_statement}")
+                # One entry, however many reviews there are
+                log_truncate(conn)
+            if not conditions and uses_split_layout():
+                # Several statements, to keep the truncate optimization despite the trigger on `reviews`
+                with observe_query("delete") as query:
+                    query.rows = truncate_split_tables(conn)
+                rows_deleted = query.rows
+            else:
+                # One table, or with the partitioned layout the partitions the conditions can match
+                for table in write_tables(conn, conditions):
+                    if not conditions:
+                        # Delete all records. Without a WHERE clause (and without triggers on the table) SQLite uses
+                        # its truncate optimization and frees the table's pages instead of visiting every row.
+                        delete_statement = f"DELETE FROM {table};"
+                        params = []
+                    else:
+                        where_clause, params = build_where_clause(conditions)
+                        delete_statement = f"DELETE FROM {table} WHERE {where_clause}"
+                    database_logger.info("Executing delete statement: %s", delete_statement)
 
-            cursor.execute(delete_statement, params)
-            rows_deleted = cursor.rowcount  # Number of rows affected by the delete operation
+                    with observe_query("delete", delete_statement, params, conn) as query:
+                        cursor.execute(delete_statement, params)
+                        query.rows = cursor.rowcount  # Number of rows affected by the delete operation
+                    rows_deleted += cursor.rowcount
             conn.commit()
 
-            database_logger.info(f"Number of rows deleted: {rows_deleted}")
+            database_logger.info("Number of rows deleted: %s", rows_deleted)
+            sync_replica()
             return rows_deleted
-        except SQLiteError as error:
-            database_logger.error(f"Failed to delete data: {error}")
+        except (SQLiteError, ValueError) as error:
+            database_logger.error("Failed to delete data: %s", error)
+            raise_if_busy(error)
             return "Error"
 
 
@@ -1,8 +1,20 @@
-from app.database.database import create_connection
+from app.database.change_log import (DELETE, INSERT, TRUNCATE, ensure_change_log, latest_seq, oldest_seq,
+                                     read_change_entries)
+from app import config
+from app.database.database import create_connection, raise_if_busy, statement_deadline
+from app.database.data_version import ensure_data_versions, read_data_version
 from app.database.database_logger import database_logger
-from app.crud.utils import build_select_query
+from app.database.date_storage import from_storage_date, uses_epoch_days
+from app.database.partitions import list_partitions, prune_partitions, uses_partitions
+from app.database.read_replica import create_read_connection, create_snapshot_connection
+from app.database.split_layout import joined_source, uses_split_layout
+from app.database.statistics import equality_row_estimate, table_row_estimate
+from app.monitoring.metrics import observe_query
+from app.crud.utils import build_count_query, build_select_query
 from app.models.models import QueryInput, Condition
 from sqlite3 import Error as SQLiteError
+import json
+from typing import List, Optional
 
 def format_results_to_json(cursor):
     """
@@ -14,12 +26,57 @@ def format_results_to_json(cursor):
     Returns:
         dict: A dictionary where each key-value pair represents a column name and its value.
     """
-    results = [dict((cursor.description[i][0], value)
-               for i, value in enumerate(row)) for row in cursor.fetchall()]
+    column_names = [column[0] for column in cursor.description]
+    results = [dict(zip(column_names, row)) for row in cursor.fetchall()]
+    if uses_epoch_days() and "review_date" in column_names:
+        # Epoch-day integers are returned to callers as ISO-8601 dates
+        for result in results:
+            result["review_date"] = from_storage_date(result["review_date"])
     returned_set = results if results else {}
-    database_logger.info(f"{len(returned_set)} results returned from query")
+    database_logger.info("%s results returned from query", len(returned_set))
     return returned_set
 
+class RowLimitExceeded(Exception):
+    """
+    Raised for a select asking for more rows than `config.SELECT_MAX_LIMIT`, or matching more rows than
+    `config.SELECT_DEFAULT_LIMIT` without a `limit`. The API answers it with 400.
+    """
+
+
+def apply_row_cap(query_input: QueryInput) -> QueryInput:
+    """
+    Returns `query_input` with `config.SELECT_DEFAULT_LIMIT` as its limit when it has none, so one select can't
+    materialize the whole table.
+
+    Raises:
+        RowLimitExceeded: The limit is above `config.SELECT_MAX_LIMIT`.
+    """
+    if query_input.limit is None:
+        return query_input.model_copy(update={"limit": config.SELECT_DEFAULT_LIMIT})
+    if query_input.limit > config.SELECT_MAX_LIMIT:
+        raise RowLimitExceeded(f"`limit` can be at most {config.SELECT_MAX_LIMIT}, page through larger results "
+                               f"with `offset`.")
+    return query_input
+
+def select_within_cap(conn, query_input: QueryInput, partitions=None):
+    """
+    Runs `query_input` as `select_rows` does, with the row cap of `apply_row_cap`. A select without a `limit`
+    reads one row past `config.SELECT_DEFAULT_LIMIT`, to tell results that fit under the cap from results it
+    would cut.
+
+    Raises:
+        RowLimitExceeded: The limit is above `config.SELECT_MAX_LIMIT`, or there is no limit and more rows than
+            `config.SELECT_DEFAULT_LIMIT` match.
+    """
+    if query_input.limit is not None:
+        return select_rows(conn, apply_row_cap(query_input), partitions)
+    results = select_rows(conn, query_input.model_copy(update={"limit": config.SELECT_DEFAULT_LIMIT + 1}),
+                          partitions)
+    if len(results) > config.SELECT_DEFAULT_LIMIT:
+        raise RowLimitExceeded(f"More than {config.SELECT_DEFAULT_LIMIT} rows match a select without a `limit`, "
+                               f"page through them with `limit` and `offset`.")
+    return results
+
 def get_all_reviews():
     """
     Retrieve all reviews from the database.
@@ -29,15 +86,32 @@ def get_all_reviews():
     """
     select_query, params = build_select_query(QueryInput(table="reviews"))
     try:
-        with create_connection() as conn:
+        with create_read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(select_query, params)
             results = format_results_to_json(cursor)
             return results
     except SQLiteError as error:
-        database_logger.error(f"Failed to run sql query {select_query} with params {params}: {error}")
+        database_logger.error("Failed to run sql query %s with params %s: %s", select_query, params, error)
+        raise_if_busy(error)
         return "Error"
 
+def read_select_version() -> Optional[str]:
+    """
+    Returns the data version of the reviews as seen by selects, from the read replica when it is loaded.
+
+    Returns:
+        Optional[str]: The version, or None if it couldn't be read.
+    """
+    try:
+        with create_read_connection() as conn:
+            ensure_data_versions(conn)
+            conn.commit()
+            return read_data_version(conn)
+    except SQLiteError as error:
+        database_logger.warning("Unable to read the data version: %s", error)
+        return None
+
 def run_select_query(query_input: QueryInput):
     """
     Execute a SELECT SQL query based on the provided QueryInput object.
@@ -47,18 +121,216 @@ def run_select_query(query_input: QueryInput):
 
     Returns:
         list: A list of dictionaries representing the query results.
+
+    Raises:
+        RowLimitExceeded: The query asks for more rows than `config.SELECT_MAX_LIMIT`, or more rows than
+            `config.SELECT_DEFAULT_LIMIT` match a query without a limit.
+        QueryTimeoutError: The query ran past `config.QUERY_TIMEOUT_MS`.
+    """
+    apply_row_cap(query_input)
+    try:
+        with create_read_connection() as conn, statement_deadline(conn):
+            partitions = list_partitions(conn) if uses_partitions() else None
+            return select_within_cap(conn, query_input, partitions)
+    except (SQLiteError, ValueError) as error:
+        database_logger.error("Failed to run select query for %s\nError: %s", query_input, error)
+        raise_if_busy(error)
+        return "Error"
+
+def select_rows(conn, query_input: QueryInput, partitions=None):
+    """
+    Runs the SELECT described by `query_input` on `conn` and returns the formatted results.
+    """
+    # Building the query can fail on condition values the storage layer cannot represent
+    select_query, params = build_select_query(query_input, partitions)
+    cursor = conn.cursor()
+    database_logger.debug("Running select query: `%s` with params `%s`", select_query, params)
+    with observe_query("select", select_query, params, conn) as query:
+        cursor.execute(select_query, params)
+        results = format_results_to_json(cursor)
+        query.rows = len(results)
+    return results
+
+def run_select_query_with_total(query_input: QueryInput, count_mode: str = "exact"):
+    """
+    Execute a SELECT query and count all the rows it matches, ignoring its limit, in one read transaction.
+
+    Args:
+        query_input (QueryInput): An object containing parameters for building a SELECT query.
+        count_mode (str): "exact" runs a `COUNT(*)` with the same filters. "estimated" reads the table
+            statistics instead, for unfiltered queries and a single `equals` condition on an indexed column,
+            and falls back to the exact count for other filters.
+
+    Returns:
+        tuple: The results, the total and whether the total is an estimate. "Error" if the query failed.
+
+    Raises:
+        RowLimitExceeded: The query asks for more rows than `config.SELECT_MAX_LIMIT`, or more rows than
+            `config.SELECT_DEFAULT_LIMIT` match a query without a limit.
+        QueryTimeoutError: The select and the count together ran past `config.QUERY_TIMEOUT_MS`.
+    """
+    apply_row_cap(query_input)
+    try:
+        with create_snapshot_connection() as conn, statement_deadline(conn):
+            # Both statements read the same snapshot
+            conn.execute("BEGIN;")
+            partitions = list_partitions(conn) if uses_partitions() else None
+            results = select_within_cap(conn, query_input, partitions)
+            total = estimate_count(conn, query_input, partitions) if count_mode == "estimated" else None
+            estimated = total is not None
+            if total is None:
+                total = count_rows(conn, query_input, partitions)
+            conn.rollback()
+            return results, total, estimated
+    except (SQLiteError, ValueError) as error:
+        database_logger.error("Failed to run select query with total for %s\nError: %s", query_input, error)
+        raise_if_busy(error)
+        return "Error"
+
+def run_select_batch(query_inputs: List[QueryInput]):
+    """
+    Execute several SELECT queries on one connection, in one read transaction, so they all see the same snapshot.
+
+    Each query is capped and guarded as by `run_select_query`, its deadline running from its own start. A query
+    that fails doesn't stop the others.
+
+    Args:
+        query_inputs (List[QueryInput]): The queries, run in order.
+
+    Returns:
+        dict: The results of each query keyed by its index, "Error" for the queries that failed. "Error" if the
+        connection or the transaction failed.
+
+    Raises:
+        RowLimitExceeded: A query asks for more rows than `config.SELECT_MAX_LIMIT`, or more rows than
+            `config.SELECT_DEFAULT_LIMIT` match a query without a limit.
+        QueryTimeoutError: A query ran past `config.QUERY_TIMEOUT_MS`.
+    """
+    for query_input in query_inputs:
+        apply_row_cap(query_input)
+    results = {}
+    try:
+        with create_snapshot_connection() as conn:
+            conn.execute("BEGIN;")
+            partitions = list_partitions(conn) if uses_partitions() else None
+            for index, query_input in enumerate(query_inputs):
+                try:
+                    with statement_deadline(conn):
+                        results[index] = select_within_cap(conn, query_input, partitions)
+                except (SQLiteError, ValueError) as error:
+                    database_logger.error("Failed to run select query %s of a batch for %s\nError: %s",
+                                          index, query_input, error)
+                    raise_if_busy(error)
+                    results[index] = "Error"
+            conn.rollback()
+    except SQLiteError as error:
+        database_logger.error("Failed to run a batch of %s select queries: %s", len(query_inputs), error)
+        raise_if_busy(error)
+        return "Error"
+    return results
+
+def read_changes(since: int, limit: int):
+    """
+    Reads the change log after `since`, with the current state of each changed review.
+
+    Entries of the same review are merged into its latest one, and the operation reflects the review as it
+    is now: "delete" when it no longer exists, even if it was changed again after the entries read. A truncate
+    is returned as one change with the "truncate" operation and no review id, and replaces the entries read
+    before it: the consumer drops every review it holds, then applies the changes after it.
+
+    Args:
+        since (int): The last `seq` the caller has seen, 0 to read from the start of the log.
+        limit (int): The maximum number of log entries read.
+
+    Returns:
+        dict: The `changes`, each with its `seq`, review `id`, `operation`, `changed_at` and the `review` (None
+        once deleted), oldest first, the `last_seq` to continue from, whether there are `more` entries, the
+        `head` of the log, and whether entries after `since` have `expired` from the log. "Error" if the log
+        couldn't be read.
     """
-    select_query, params = build_select_query(query_input)
     try:
         with create_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(select_query, params)
-            results = format_results_to_json(cursor)
-            return results
+            ensure_change_log(conn)
+            conn.commit()
+            # The entries and the reviews are read from the same snapshot
+            conn.execute("BEGIN;")
+            entries = read_change_entries(conn, since, limit)
+            head, oldest = latest_seq(conn), oldest_seq(conn)
+            truncates = [entry for entry in entries if entry[2] == TRUNCATE]
+            entries_after = [entry for entry in entries if not truncates or entry[0] > truncates[-1][0]]
+            latest_entries = {review_id: (seq, operation, changed_at) for seq, review_id, operation, changed_at
+                              in entries_after}
+            reviews = {}
+            if latest_entries:
+                source = joined_source() if uses_split_layout() else "reviews"
+                cursor = conn.execute(f"SELECT * FROM {source} WHERE id IN (SELECT value FROM json_each(?));",
+                                      [json.dumps(list(latest_entries))])
+                reviews = {review["id"]: review for review in format_results_to_json(cursor) or []}
+            conn.rollback()
     except SQLiteError as error:
-        database_logger.error(f"Failed to run sql query: `{select_query}` with params `{params}`\nError: {error}")
+        database_logger.error("Failed to read the change log after %s: %s", since, error)
+        raise_if_busy(error)
         return "Error"
 
+    changes = []
+    if truncates:
+        seq, _, operation, changed_at = truncates[-1]
+        changes.append({"seq": seq, "id": None, "operation": operation, "changed_at": changed_at, "review": None})
+    for review_id, (seq, operation, changed_at) in sorted(latest_entries.items(), key=lambda item: item[1][0]):
+        review = reviews.get(review_id)
+        if review is None:
+            operation = DELETE
+        elif operation == DELETE:
+            # The id was deleted, then used again by a new review
+            operation = INSERT
+        changes.append({"seq": seq, "id": review_id, "operation": operation, "changed_at": changed_at,
+                        "review": review})
+    last_seq = entries[-1][0] if entries else since
+    return {
+        "changes": changes,
+        "last_seq": last_seq,
+        "more": last_seq < head,
+        "head": head,
+        # Entries are only ever removed by pruning, so a gap before the oldest one means some were missed
+        "expired": since < (head if oldest is None else oldest - 1),
+    }
+
+def count_rows(conn, query_input: QueryInput, partitions=None) -> int:
+    """
+    Counts the rows `query_input` matches with `COUNT(*)`, which only reads an index when one covers the filters.
+    """
+    count_query, params = build_count_query(query_input, partitions)
+    with observe_query("count", count_query, params, conn) as query:
+        total = conn.execute(count_query, params).fetchone()[0]
+        query.rows = 1
+    return total
+
+def estimate_count(conn, query_input: QueryInput, partitions=None) -> Optional[int]:
+    """
+    Estimates the rows `query_input` matches from the statistics gathered by `ANALYZE`.
+
+    Returns:
+        Optional[int]: The estimate, or None when the filters or the available statistics don't allow one.
+    """
+    tables = [query_input.table]
+    if partitions is not None and query_input.table == "reviews":
+        tables = prune_partitions(partitions, query_input.conditions)
+    conditions = query_input.conditions
+    if not conditions:
+        estimates = [table_row_estimate(conn, table) for table in tables]
+    elif len(conditions) == 1 and set(conditions[0].model_dump(exclude_none=True)) == {"column", "equals"}:
+        estimates = [equality_row_estimate(conn, table, conditions[0].column) for table in tables]
+    elif len(conditions) == 1 and set(conditions[0].model_dump(exclude_none=True)) == {"column", "in_"}:
+        # Each value is assumed as common as the average one
+        values = len(set(conditions[0].in_))
+        estimates = [None if estimate is None else estimate * values
+                     for estimate in (equality_row_estimate(conn, table, conditions[0].column) for table in tables)]
+    else:
+        return None
+    if any(estimate is None for estimate in estimates):
+        return None
+    return sum(estimates)
+
 if __name__ == "__main__":
     # Example usage of run_select_query with specific conditions
     condition = Condition(column="country", equals='United States')
@@ -8,12 +8,22 @@ identified by unique identifiers like ID or a combination of reviewer name and
 review date, as well as more advanced batch update operations.
 """
 
-from typing import List
+import json
+from typing import Dict, List, Tuple
 from sqlite3 import Error as SQLiteError
-from app.database.database import create_connection
+from app.database.change_log import UPDATE, log_changes, log_matching
+from app.database.database import create_connection, raise_if_busy
 from app.database.database_logger import database_logger
-from app.crud.utils import build_update_clause
-from app.models.models import Condition, ColumnToUpdate
+from app.monitoring.metrics import observe_query
+from app.crud.utils import build_update_clause, build_where_clause, storage_value
+from app.database.partitions import update_rows, uses_partitions, write_tables
+from app.database.read_replica import sync_replica
+from app.database.split_layout import CONTENT_COLUMN, update_split_rows, update_split_rows_by_id, uses_split_layout
+from app.models.models import Condition, ColumnToUpdate, ReviewUpdate
+
+# Columns a batch update may change. Column names are interpolated into the SQL, so they must be checked.
+UPDATABLE_COLUMNS = ("reviewer_name", "review_title", "review_rating", "review_content", "email_address",
+                     "country", "country_code", "review_date")
 
 
 def update_review(conditions: List[Condition], columns_to_update: List[ColumnToUpdate]):
@@ -27,24 +37,165 @@ def update_review(conditions: List[Condition], columns_to_update: List[ColumnToU
     Returns:
         int: The number of rows that were updated.
     """
-    # Build the SQL update clause with provided conditions and columns to update
-    set_clause, update_params = build_update_clause("reviews", conditions, columns_to_update)
-
     with create_connection() as conn:
         try:
+            # Build the SQL update clause with provided conditions and columns to update
+            set_clause, update_params = build_update_clause("reviews", conditions, columns_to_update)
             cursor = conn.cursor()
-            database_logger.info(f"Executing UPDATE on `reviews`: {set_clause} with params {update_params}")
-            cursor.execute(set_clause, update_params)
-            rows_updated = cursor.rowcount  # Capture the number of rows affected by the update
+            database_logger.info("Executing UPDATE on `reviews`: %s with params %s", set_clause, update_params)
+            # Logged before the update, which may change the rows the conditions match
+            log_matching(conn, UPDATE, *build_where_clause(conditions))
+            if uses_partitions():
+                rows_updated = update_partitions(conn, conditions, columns_to_update)
+            elif uses_split_layout():
+                where_clause, where_params = build_where_clause(conditions)
+                # Runs a statement per table, none of which is `set_clause`
+                with observe_query("update") as query:
+                    query.rows = update_split_rows(conn, where_clause, where_params,
+                                                   storage_assignments(columns_to_update))
+                rows_updated = query.rows
+            else:
+                with observe_query("update", set_clause, update_params, conn) as query:
+                    cursor.execute(set_clause, update_params)
+                    query.rows = cursor.rowcount  # Capture the number of rows affected by the update
+                rows_updated = query.rows
             conn.commit()
-            database_logger.info(f"Rows updated in `reviews`: {rows_updated}")
+            database_logger.info("Rows updated in `reviews`: %s", rows_updated)
+            sync_replica()
             return rows_updated
-        except SQLiteError as error:
-            # Log the error and return None if an SQLite error occurs
-            database_logger.error(f"An error occurred whilst trying to update `reviews` table: {error}")
+        except (SQLiteError, ValueError) as error:
+            # Log the error and return None if an SQLite error occurs or a value cannot be stored
+            database_logger.error("An error occurred whilst trying to update `reviews` table: %s", error)
+            raise_if_busy(error)
             return None
 
 
+def update_partitions(conn, conditions: List[Condition], columns_to_update: List[ColumnToUpdate]) -> int:
+    """
+    Applies an update to the partitions the conditions can match, with the partitioned layout.
+    """
+    where_clause, where_params = build_where_clause(conditions)
+    # Runs a statement per partition, and moves rows between partitions when `review_date` changes
+    with observe_query("update") as query:
+        query.rows = update_rows(conn, conditions, where_clause, where_params, storage_assignments(columns_to_update))
+    return query.rows
+
+
+def storage_assignments(columns_to_update: List[ColumnToUpdate]) -> Dict[str, object]:
+    """
+    Returns the columns to set, with their values converted for storage.
+    """
+    return {column.column_name: storage_value(column.column_name, column.column_value)
+            for column in columns_to_update}
+
+
+def validate_review_update(item: ReviewUpdate) -> Tuple[Tuple[str, ...], List]:
+    """
+    Checks the changes of one batch item and converts their values for storage.
+
+    Args:
+        item (ReviewUpdate): The review id and its changes.
+
+    Returns:
+        tuple: The changed column names, in order, and the values to bind for them.
+
+    Raises:
+        ValueError: If there are no changes, a column can't be updated, a column is repeated or a value can't
+            be stored.
+    """
+    if not item.changes:
+        raise ValueError("No changes given")
+    columns = tuple(change.column_name for change in item.changes)
+    unknown_columns = [column for column in columns if column not in UPDATABLE_COLUMNS]
+    if unknown_columns:
+        raise ValueError(f"Columns can't be updated: {unknown_columns}")
+    if len(set(columns)) != len(columns):
+        raise ValueError(f"Columns changed more than once: {list(columns)}")
+    return columns, [storage_value(change.column_name, change.column_value) for change in item.changes]
+
+
+def update_reviews_batch(items: List[ReviewUpdate]):
+    """
+    Applies a different set of changes to each review, in a single transaction.
+
+    Items changing the same columns share one `UPDATE ... WHERE id = ?` statement, run with `executemany`,
+    so a large batch costs a handful of statements and one commit instead of one request per review.
+    Invalid items and unknown ids are reported per item and don't stop the rest of the batch, whereas an
+    SQLite error rolls the whole batch back.
+
+    Args:
+        items (List[ReviewUpdate]): The review ids and the changes to apply to each.
+
+    Returns:
+        List[dict]: One result per item, in the order given, with the review `id`, a `status` of "updated",
+        "not_found" or "invalid", and an `error` for invalid items. None if the transaction failed.
+    """
+    results = [{"id": item.id, "status": "updated"} for item in items]
+    # Statement shape (the changed columns, in order) -> parameter rows
+    groups: Dict[Tuple[str, ...], List[Tuple[int, list]]] = {}
+    for position, item in enumerate(items):
+        try:
+            columns, values = validate_review_update(item)
+        except ValueError as error:
+            results[position].update(status="invalid", error=str(error))
+            continue
+        groups.setdefault(columns, []).append((position, values + [item.id]))
+
+    conn = create_connection()
+    try:
+        # Take the write lock up front, so the ids found below are still there when the updates run
+        conn.execute("BEGIN IMMEDIATE;")
+        requested_ids = [item.id for item in items]
+        existing_ids = {row[0] for row in conn.execute(
+            "SELECT id FROM reviews WHERE id IN (SELECT value FROM json_each(?));", [json.dumps(requested_ids)])}
+
+        rows_updated = 0
+        for columns, rows in groups.items():
+            params = []
+            for position, row_params in rows:
+                if row_params[-1] in existing_ids:
+                    params.append(row_params)
+                else:
+                    results[position]["status"] = "not_found"
+            if not params:
+                continue
+            set_clause = ", ".join(f"{column} = ?" for column in columns)
+            if uses_partitions() and "review_date" in columns:
+                # The review may move to another month's partition, so each one is updated on its own
+                with observe_query("update") as query:
+                    query.rows = sum(update_rows(conn, None, "id = ?", [row_params[-1]],
+                                                 dict(zip(columns, row_params[:-1]))) for row_params in params)
+                rows_updated += query.rows
+                continue
+            if uses_split_layout() and CONTENT_COLUMN in columns:
+                # The text is set in the content table, the other columns in `reviews`
+                with observe_query("update") as query:
+                    query.rows = update_split_rows_by_id(conn, columns, params)
+                rows_updated += query.rows
+                continue
+            for table in write_tables(conn):
+                update_sql = f"UPDATE {table} SET {set_clause} WHERE id = ?"
+                database_logger.debug("Executing batch UPDATE on `%s`: %s for %s rows", table, update_sql, len(params))
+                with observe_query("update", update_sql, params[0], conn) as query:
+                    cursor = conn.executemany(update_sql, params)
+                    query.rows = cursor.rowcount
+                rows_updated += cursor.rowcount
+        log_changes(conn, (result["id"] for result in results if result["status"] == "updated"), UPDATE)
+        conn.commit()
+    except SQLiteError as error:
+        conn.rollback()
+        database_logger.error("An error occurred whilst batch updating `reviews`, rolled back: %s", error)
+        raise_if_busy(error)
+        return None
+    finally:
+        conn.close()
+
+    database_logger.info("Batch update of %s items changed %s rows in %s statements",
+                         len(items), rows_updated, len(groups))
+    sync_replica()
+    return results
+
+
 # Example usage of the function
 if __name__ == "__main__":
     # Conditions and columns to update for demonstration purposes
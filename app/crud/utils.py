@@ -1,13 +1,55 @@
 from app.database.database_logger import database_logger
+from app.database.date_storage import to_storage_date, review_date_sql_expression
+from app.database.partitions import partition_source, prune_partitions
+from app.database.split_layout import (CONTENT_COLUMN, content_condition, content_expression, joined_source,
+                                       needs_content, uses_split_layout)
+import json
 from typing import List
 from app.models.models import Condition, QueryInput, ColumnToUpdate
 
 """
 This module provides utility functions to build SQL clauses for various database operations.
-It leverages parameterized queries to prevent SQL injection and currently supports 'AND' conditions.
-Future improvements may include the addition of 'OR' operators.
+It leverages parameterized queries to prevent SQL injection. Conditions are combined with 'AND', and a
+condition's `or` groups with 'OR'.
 """
 
+# `in` lists up to this length are bound one parameter per value, which SQLite matches with one index lookup
+# each. Longer lists are bound as a single JSON array, read back with `json_each`, so no list runs into SQLite's
+# limit on the number of parameters of a statement (999 before SQLite 3.32)
+IN_LIST_PARAMS = 500
+COMPARISONS = {"gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+
+def storage_value(column: str, value):
+    """
+    Converts a value supplied by the caller into the representation stored in `column`.
+
+    Args:
+        column (str): The column the value is compared with or written to.
+        value: The value as supplied by the caller.
+
+    Returns:
+        The value to bind as a query parameter.
+    """
+    if column == "review_date":
+        return to_storage_date(value)
+    return value
+
+def column_expression(column: str) -> str:
+    """
+    Returns the SQL expression reading the value of `column`, decompressing the text with the split layout.
+    """
+    if column == CONTENT_COLUMN and uses_split_layout():
+        return content_expression()
+    return column
+
+def text_expression(column: str) -> str:
+    """
+    Returns the SQL expression used when `column` is matched as text, e.g. by a `contains` condition.
+    """
+    if column == "review_date":
+        return review_date_sql_expression(column)
+    return column_expression(column)
+
 def build_update_clause(table_name: str, conditions: List[Condition], columns_to_update: List[ColumnToUpdate]):
     """
     Constructs an SQL UPDATE statement with SET and WHERE clauses.
@@ -21,18 +63,90 @@ def build_update_clause(table_name: str, conditions: List[Condition], columns_to
         tuple: A tuple containing the SQL update statement and parameters.
     """
     where_clause, where_clause_params = build_where_clause(conditions)
+    set_clause_str, set_clause_params = build_set_clause(columns_to_update)
+
+    # Combine the SET and WHERE clause parameters in order
+    update_params = set_clause_params + where_clause_params
+
+    return f"UPDATE {table_name} SET {set_clause_str} WHERE {where_clause}", update_params
+
+def build_set_clause(columns_to_update: List[ColumnToUpdate]):
+    """
+    Builds the assignments of an UPDATE statement's SET clause.
 
+    Args:
+        columns_to_update (List[ColumnToUpdate]): A list of columns and their new values.
+
+    Returns:
+        tuple: The assignments, e.g. `review_title = ?, review_rating = ?`, and their parameters.
+    """
     set_clauses = []
     set_clause_params = []
     for col_to_update in columns_to_update:
         set_clauses.append(f"{col_to_update.column_name} = ?")
-        set_clause_params.append(col_to_update.column_value)
-    set_clause_str = ", ".join(set_clauses)
+        set_clause_params.append(storage_value(col_to_update.column_name, col_to_update.column_value))
+    return ", ".join(set_clauses), set_clause_params
 
-    # Combine the SET and WHERE clause parameters in order
-    update_params = set_clause_params + where_clause_params
+def build_in_clause(expression: str, values: list):
+    """
+    Builds `expression IN (...)`, see `IN_LIST_PARAMS`.
 
-    return f"UPDATE {table_name} SET {set_clause_str} WHERE {where_clause}", update_params
+    Returns:
+        tuple: The clause and its parameters.
+    """
+    if len(values) <= IN_LIST_PARAMS:
+        return f"{expression} IN ({', '.join('?' * len(values))})", list(values)
+    return f"{expression} IN (SELECT value FROM json_each(?))", [json.dumps(list(values))]
+
+def build_condition_clause(condition: Condition):
+    """
+    Builds the SQL of a single condition, its operators and `or` groups joined with AND. Of `range`, `contains`
+    and `equals`, only the first one set applies, as it always has.
+
+    Args:
+        condition (Condition): The condition.
+
+    Returns:
+        tuple: The clause and its parameters. Validated conditions always set an operator, or an `or` group
+        of non-empty groups, so the clause is never empty.
+    """
+    clauses = []
+    params = []
+    if condition.or_ is not None:
+        group_clauses = []
+        for group in condition.or_:
+            group_clause, group_params = build_where_clause(group)
+            group_clauses.append(f"({group_clause})" if " AND " in group_clause else group_clause)
+            params.extend(group_params)
+        clauses.append(f"({' OR '.join(group_clauses)})")
+    if condition.column is None:
+        return " AND ".join(clauses), params
+
+    expression = column_expression(condition.column)
+    if condition.range is not None:
+        clauses.append(f"{expression} BETWEEN ? AND ?")
+        params.extend(storage_value(condition.column, value) for value in condition.range)
+    elif condition.contains is not None:
+        clauses.append(f"{text_expression(condition.column)} LIKE ?")
+        params.append(f"%{condition.contains}%")
+    elif condition.equals is not None:
+        clauses.append(f"{expression} = ?")
+        params.append(storage_value(condition.column, condition.equals))
+    if condition.in_ is not None:
+        in_clause, in_params = build_in_clause(
+            expression, [storage_value(condition.column, value) for value in condition.in_])
+        clauses.append(in_clause)
+        params.extend(in_params)
+    for operator, sql_operator in COMPARISONS.items():
+        value = getattr(condition, operator)
+        if value is not None:
+            clauses.append(f"{expression} {sql_operator} ?")
+            params.append(storage_value(condition.column, value))
+    clause = " AND ".join(clauses)
+    if condition.column == CONTENT_COLUMN and uses_split_layout():
+        # The text lives in the side table, the statement itself only reads `reviews`
+        clause = content_condition(clause)
+    return clause, params
 
 def build_where_clause(conditions=List[Condition]):
     """
@@ -48,21 +162,17 @@ def build_where_clause(conditions=List[Condition]):
     params = []
 
     for condition in conditions:
-        if condition.range:
-            where_clauses.append(f"{condition.column} BETWEEN ? AND ?")
-            params.extend(condition.range)
-        elif condition.contains:
-            where_clauses.append(f"{condition.column} LIKE ?")
-            params.append(f"%{condition.contains}%")
-        elif condition.equals:
-            where_clauses.append(f"{condition.column} = ?")
-            params.append(condition.equals)
+        clause, clause_params = build_condition_clause(condition)
+        if not clause:
+            continue
+        where_clauses.append(clause)
+        params.extend(clause_params)
 
     where_clause = " AND ".join(where_clauses) if where_clauses else ""
-    database_logger.info(f"Generated WHERE clause: `{where_clause}`, Params: `{params}`")
+    database_logger.debug("Generated WHERE clause: `%s`, Params: `%s`", where_clause, params)
     return where_clause, params
 
-def build_select_query_(query_input=QueryInput, where_clause="", params=None):
+def build_select_query_(query_input=QueryInput, where_clause="", params=None, partitions=None):
     """
     Constructs a SELECT SQL query.
 
@@ -70,26 +180,38 @@ def build_select_query_(query_input=QueryInput, where_clause="", params=None):
         query_input (QueryInput): Object containing query parameters.
         where_clause (str): The WHERE clause for the query.
         params (List): Parameters for the WHERE clause.
+        partitions (Optional[List[str]]): The partitions of the `reviews` table with the partitioned layout.
+            Only those the `review_date` conditions can match are read.
 
     Returns:
         tuple: The SQL SELECT query and parameters.
     """
-    base_query = f"SELECT {', '.join(query_input.columns) if query_input.columns else '*'} FROM {query_input.table}"
+    source = query_input.table
+    if partitions is not None and query_input.table == "reviews":
+        source = partition_source(prune_partitions(partitions, query_input.conditions))
+    elif uses_split_layout() and query_input.table == "reviews" and needs_content(query_input.columns):
+        source = joined_source()
+    base_query = f"SELECT {', '.join(query_input.columns) if query_input.columns else '*'} FROM {source}"
 
     if where_clause:
         base_query += " WHERE " + where_clause
-    if query_input.limit:
+    if query_input.limit or query_input.offset:
+        # SQLite needs a LIMIT before an OFFSET, -1 meaning no limit
         base_query += " LIMIT ?"
-        params.append(query_input.limit)
-    database_logger.info(f"Generated SELECT query: `{base_query}`, Params: `{params}`")
+        params.append(query_input.limit or -1)
+    if query_input.offset:
+        base_query += " OFFSET ?"
+        params.append(query_input.offset)
+    database_logger.debug("Generated SELECT query: `%s`, Params: `%s`", base_query, params)
     return base_query, params if params else []
 
-def build_select_query(query_input: QueryInput):
+def build_select_query(query_input: QueryInput, partitions=None):
     """
     Builds a complete SELECT query using query input.
 
     Args:
         query_input (QueryInput): An object encapsulating the table, columns, conditions, and limit for the query.
+        partitions (Optional[List[str]]): The partitions of the `reviews` table, with the partitioned layout.
 
     Returns:
         tuple: A complete SQL SELECT statement and its parameters.
@@ -98,10 +220,30 @@ def build_select_query(query_input: QueryInput):
     base_query, params = build_select_query_(
         query_input,
         where_clause_generated,
-        params_generated
+        params_generated,
+        partitions
     )
     return base_query, params
 
+def build_count_query(query_input: QueryInput, partitions=None):
+    """
+    Builds a `SELECT COUNT(*)` over the rows `query_input` matches, ignoring its columns and limit.
+
+    Args:
+        query_input (QueryInput): The query to count the matches of.
+        partitions (Optional[List[str]]): The partitions of the `reviews` table, with the partitioned layout.
+
+    Returns:
+        tuple: The SQL statement and its parameters.
+    """
+    where_clause, params = build_where_clause(query_input.conditions)
+    source = query_input.table
+    if partitions is not None and query_input.table == "reviews":
+        source = partition_source(prune_partitions(partitions, query_input.conditions))
+    count_query = f"SELECT COUNT(*) FROM {source}" + (f" WHERE {where_clause}" if where_clause else "")
+    database_logger.debug("Generated COUNT query: `%s`, Params: `%s`", count_query, params)
+    return count_query, params
+
 # Example use cases for demonstration
 if __name__ == "__main__":
     # Define conditions for the WHERE clause
@@ -1,12 +1,12 @@
+import importlib.util
 import pandas as pd
-from typing import Union
+from typing import Callable, List, Union
 import re
-import country_converter as coco
 
+from app import config
+from app.countries.lookup import country_lookup
 from app.data_loader.data_loader_logger import data_loader_logger
 
-cc = coco.CountryConverter()
-
 
 class MissingColumns(Exception):
     pass
@@ -17,10 +17,16 @@ class InvalidColumnDtype(Exception):
 
 
 def read_csv(filename: str) -> pd.DataFrame:
-    data_loader_logger.info(msg=f"Reading csv file into dataframe {filename}")
+    data_loader_logger.info("Reading csv file into dataframe %s", filename)
     return pd.read_csv(filename)
 
 
+def read_parquet(filename: str) -> pd.DataFrame:
+    # Needs pyarrow or fastparquet, which are optional
+    data_loader_logger.info("Reading parquet file into dataframe %s", filename)
+    return pd.read_parquet(filename)
+
+
 def convert_col_names(df: pd.DataFrame) -> pd.DataFrame:
     """
     Returns a new pd.DataFrame object with column names more appropriate for database use
@@ -30,7 +36,8 @@ def convert_col_names(df: pd.DataFrame) -> pd.DataFrame:
     new_df = df.copy()  # Work on a copy of the DataFrame
     new_col_names = [col.strip().lower().replace(" ", "_") for col in new_df.columns]
     new_df.columns = new_col_names
-    data_loader_logger.info(f"Convering column names into standard snakecase format from {df.columns} to {new_col_names}")
+    data_loader_logger.info("Convering column names into standard snakecase format from %s to %s",
+                            list(df.columns), new_col_names)
     return new_df
 
 
@@ -47,12 +54,12 @@ def validate_and_convert_dtypes(df: pd.DataFrame, expected_datatypes: dict) -> U
         if column in new_df.columns:
             actual_dtype = new_df[column].dtype
             if actual_dtype != expected_dtype:
-                data_loader_logger.info(f"Converting {column} from {actual_dtype} to {expected_dtype}")
+                data_loader_logger.info("Converting %s from %s to %s", column, actual_dtype, expected_dtype)
                 # Exception potentially raised here
                 new_df[column] = convert_column_dtype(new_df[column], expected_dtype)
         else:
             missing_columns.append(column)
-            data_loader_logger.warn(f"Expected column '{column}' not found in DataFrame")
+            data_loader_logger.warning("Expected column '%s' not found in DataFrame", column)
 
     if missing_columns:
         error_msg = f"Missing columns in input data, please investigate, missing columns = {missing_columns}"
@@ -79,9 +86,20 @@ def convert_column_dtype(column, target_dtype):
         if target_dtype == 'dt.date':
             # Convert to datetime and then to date (without time)
             return pd.to_datetime(column, errors='coerce').dt.date
+        elif target_dtype.startswith('datetime64'):
+            # Keep a vectorised datetime64 column, unparseable values become NaT
+            return pd.to_datetime(column, errors='coerce').astype(target_dtype)
         elif target_dtype == 'object':
             # Clean string fields: strip whitespace and replace multiple spaces with a single space
             return column.str.strip().str.replace('\s+', ' ', regex=True).astype(str)
+        elif target_dtype == 'text':
+            # Compact mode: the same cleaning, stored as compact strings. Missing values stay missing
+            return column.astype(text_dtype()).str.strip().str.replace(r'\s+', ' ', regex=True)
+        elif target_dtype == 'category':
+            return column.astype(text_dtype()).str.strip().str.replace(r'\s+', ' ', regex=True).astype('category')
+        elif target_dtype == 'small_int':
+            # Checked as int64 first, so missing or fractional ratings are rejected as in the default mode
+            return pd.to_numeric(column.astype('int64'), downcast='integer')
         else:
             # For other data types, use direct conversion
             return column.astype(target_dtype)
@@ -104,27 +122,75 @@ def validate_input_datastructure_and_types(df: pd.DataFrame):
     Note:
         This function expects a specific set of columns with defined target data types.
     """
-    # Define the expected data types for each column
+    # Convert column names to a consistent format, then validate and convert the data types
+    return convert_to_expected_dtypes(convert_col_names(df))
+
+
+def convert_to_expected_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Validates and converts the columns of a DataFrame with snake_case column names to the expected types.
+    """
+    # Define the expected data types for each column. In "epoch_days" storage mode review dates stay
+    # as a datetime64 column and are only converted to integers when they are written to the database
+    review_date_dtype = 'datetime64[ns]' if config.REVIEW_DATE_STORAGE == "epoch_days" else 'dt.date'
+    # In compact mode free text becomes compact strings, `country` a categorical and ratings small integers
+    text = 'text' if config.COMPACT_DTYPES else 'object'
     expected_datatypes = {
-        'reviewer_name': 'object',
-        'review_title': 'object',
-        'review_rating': 'int64',
-        'review_content': 'object',
-        'email_address': 'object',
-        'country': 'object',
-        'review_date': 'dt.date'
+        'reviewer_name': text,
+        'review_title': text,
+        'review_rating': 'small_int' if config.COMPACT_DTYPES else 'int64',
+        'review_content': text,
+        'email_address': text,
+        'country': 'category' if config.COMPACT_DTYPES else 'object',
+        'review_date': review_date_dtype
     }
-    data_loader_logger.info(f"Mapping of expected datatype: {expected_datatypes}")
+    data_loader_logger.info("Mapping of expected datatype: %s", expected_datatypes)
+    return validate_and_convert_dtypes(df, expected_datatypes)
+
+
+def text_dtype():
+    """
+    Returns the dtype of free text in compact mode: strings stored in Arrow buffers when pyarrow is installed,
+    rather than one Python object per value, otherwise pandas' own string dtype.
+    """
+    if importlib.util.find_spec("pyarrow") is not None:
+        return pd.StringDtype("pyarrow")
+    return pd.StringDtype()
+
+
+def to_epoch_days(column: pd.Series) -> pd.Series:
+    """
+    Converts a datetime64 column into whole days since 1970-01-01, the "epoch_days" storage format.
+
+    Args:
+        column (pd.Series): A datetime64 column, missing values as NaT.
+
+    Returns:
+        pd.Series: A nullable Int64 column, missing values as <NA>.
+    """
+    return (column.dt.floor('D') - pd.Timestamp('1970-01-01')).dt.days.astype('Int64')
+
+
+def convert_dates_for_storage(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converts the `review_date` column into the representation selected by `config.REVIEW_DATE_STORAGE`.
 
-    # Convert column names to a consistent format
-    corrected_table_name_df = convert_col_names(df)
+    Args:
+        df (pd.DataFrame): The cleaned DataFrame about to be written to the database.
 
-    # Validate and convert data types of the DataFrame
-    return validate_and_convert_dtypes(corrected_table_name_df, expected_datatypes)
+    Returns:
+        pd.DataFrame: The DataFrame itself in "iso" mode, otherwise a copy with epoch-day review dates.
+    """
+    if config.REVIEW_DATE_STORAGE != "epoch_days":
+        return df
+    new_df = df.copy()
+    data_loader_logger.info("Converting 'review_date' column to epoch days for storage.")
+    new_df['review_date'] = to_epoch_days(new_df['review_date'])
+    return new_df
 
 
 def is_valid_email(email):
-    if email:  # Check if email is not None or empty
+    if isinstance(email, str) and email:  # Check if email is a non-empty string, not None, NaN or <NA>
         return bool(re.match(r"[^@]+@[^@]+\.[^@]+", email))
     return False
 
@@ -133,12 +199,22 @@ def is_valid_rating(rating):
     return rating >= 0
 
 
+def convert_country_series(series: pd.Series, to: str, not_found: str) -> pd.Series:
+    """
+    Converts each distinct value of `series` once and maps the results back onto the series.
+    """
+    lookup = country_lookup()
+    unique_values = series.unique()
+    mapping = {value: lookup.convert(value, to=to, not_found=not_found) for value in unique_values}
+    return series.map(mapping).fillna(not_found)
+
+
 def convert_country_names(df: pd.DataFrame) -> pd.DataFrame:
     """
     Converts the country names in a DataFrame to standardized short names and ISO3 codes.
 
-    The function uses the country_converter package to perform the conversion. If a country name
-    cannot be matched, it is replaced with "Not Found".
+    The function uses the precompiled country lookup, with the matching rules of the country_converter
+    package, to perform the conversion. If a country name cannot be matched, it is replaced with "Not Found".
 
     Args:
         df (pd.DataFrame): The DataFrame with a 'country' column containing country names.
@@ -149,11 +225,15 @@ def convert_country_names(df: pd.DataFrame) -> pd.DataFrame:
     """
     new_df = df.copy()
     data_loader_logger.info("Converting 'country' column values to standardized short names.")
-    country_names = cc.pandas_convert(series=new_df["country"], to='name_short', not_found="Not Found")
+    country_names = convert_country_series(new_df["country"], to='name_short', not_found="Not Found")
 
     data_loader_logger.info("Converting 'country' column values to standardized ISO3 country codes.")
-    country_codes = cc.pandas_convert(series=new_df["country"], to='ISO3', not_found="Not Found")
+    country_codes = convert_country_series(new_df["country"], to='ISO3', not_found="Not Found")
 
+    if config.COMPACT_DTYPES:
+        # A few hundred distinct values repeated on every row
+        country_names = country_names.astype('category')
+        country_codes = country_codes.astype('category')
     new_df["country"] = country_names
     new_df["country_code"] = country_codes
     return new_df
@@ -188,9 +268,11 @@ def validate_emails_and_ratings(df: pd.DataFrame) -> pd.DataFrame:
     df_invalid_emails = new_df[~new_df['email_valid']]
     df_invalid_ratings = new_df[~new_df['rating_valid']]
     if not df_invalid_emails.empty:
-        data_loader_logger.warn(f"Dataframe contains invalid emails, which will be removed: \n{df_invalid_emails}")
+        data_loader_logger.warning("Dataframe contains %s invalid emails, which will be removed: %s",
+                                   len(df_invalid_emails), df_invalid_emails['email_address'].head(20).tolist())
     if not df_invalid_ratings.empty:
-        data_loader_logger.warn(f"Dataframe contains invalid ratings, which will be removed: \n{df_invalid_ratings}")
+        data_loader_logger.warning("Dataframe contains %s invalid ratings, which will be removed: %s",
+                                   len(df_invalid_ratings), df_invalid_ratings['review_rating'].head(20).tolist())
 
     # Remove rows with invalid emails or ratings
     new_df = new_df[new_df['email_valid'] & new_df['rating_valid']]
@@ -200,23 +282,59 @@ def validate_emails_and_ratings(df: pd.DataFrame) -> pd.DataFrame:
 
 
 
-def clean_and_transform_data(df: pd.DataFrame) -> pd.DataFrame:
+def standardize_reviewer_names(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Returns a new DataFrame with whitespace stripped from `reviewer_name` and the names title-cased.
+    """
+    new_df = df.copy()
+    data_loader_logger.info("Stripping whitespace and titling reviewer name")
+    new_df['reviewer_name'] = new_df['reviewer_name'].str.strip().str.title()
+    return new_df
 
-    country_transformed_df = convert_country_names(df)
 
-    # Standardise and capitalise reviewer_name field
-    data_loader_logger.info(f"Stripping whitespace and titling reviewer name")
-    country_transformed_df['reviewer_name'] = country_transformed_df['reviewer_name'].str.strip().str.title()
+def dataframe_memory_mb(df: pd.DataFrame) -> float:
+    """
+    Returns the memory held by `df`, including the strings its object columns point to.
+    """
+    return df.memory_usage(deep=True).sum() / 2 ** 20
+
 
-    email_transformed_df = validate_emails_and_ratings(country_transformed_df)
-    # Need further context on the data and use cases to determine whether to drop rows with NaN values for other fields
-    return email_transformed_df
+def run_stages(df: pd.DataFrame, stages: List[Callable[[pd.DataFrame], pd.DataFrame]], run=None) -> pd.DataFrame:
+    """
+    Applies each stage to the output of the previous one, timing it when the `LoadRun` of a load is given (see
+    `load_runs.py`). With `config.REPORT_DATAFRAME_MEMORY` on, logs the DataFrame memory before and after each
+    stage, and the memory per column at the end.
+    """
+    memory_mb = dataframe_memory_mb(df) if config.REPORT_DATAFRAME_MEMORY else None
+    for stage in stages:
+        df = stage(df) if run is None else run.run_stage(stage.__name__, stage, df)
+        if memory_mb is not None:
+            stage_memory_mb = dataframe_memory_mb(df)
+            data_loader_logger.info("DataFrame memory %.2f MB -> %.2f MB after %s (%s rows)", memory_mb,
+                                    stage_memory_mb, stage.__name__, len(df))
+            memory_mb = stage_memory_mb
+    if memory_mb is not None:
+        column_memory = df.memory_usage(deep=True, index=False) / 2 ** 20
+        data_loader_logger.info("DataFrame memory per column (MB): %s",
+                                {column: round(mb, 2) for column, mb in column_memory.items()})
+    return df
+
+
+# Standardise and capitalise reviewer_name field, then drop rows with invalid emails or ratings.
+# Need further context on the data and use cases to determine whether to drop rows with NaN values for other fields
+CLEANING_STAGES = [convert_country_names, standardize_reviewer_names, validate_emails_and_ratings]
+# The stages after reading a file, timed one by one by `load_data`
+PREPARATION_STAGES = [convert_col_names, convert_to_expected_dtypes] + CLEANING_STAGES
+
+
+def clean_and_transform_data(df: pd.DataFrame) -> pd.DataFrame:
+    return run_stages(df, CLEANING_STAGES)
 
 
-def prepare_data_for_loading(csv_file_name: str) -> pd.DataFrame:
-    df = read_csv(csv_file_name)
-    valid_df = validate_input_datastructure_and_types(df)
-    return clean_and_transform_data(valid_df)
+def prepare_data_for_loading(csv_file_name: str, file_format: str = "csv", run=None) -> pd.DataFrame:
+    read = read_parquet if file_format == "parquet" else read_csv
+    df = read(csv_file_name) if run is None else run.run_stage(read.__name__, read, csv_file_name)
+    return run_stages(df, PREPARATION_STAGES, run)
 
 
 if __name__ == "__main__":
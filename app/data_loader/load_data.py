@@ -1,25 +1,168 @@
-from app.data_loader.data_cleaning_and_transformation import prepare_data_for_loading
+from app.database.change_log import INSERT, log_matching, prune_change_log
 from app.database.database import create_connection
+from app.database.statistics import analyze
+from app.database.partitions import UNDATED, allocate_ids, ensure_partition, month_key, uses_partitions
+from app.database.split_layout import CONTENT_COLUMN, uses_split_layout, write_contents
+from app.database.tuning import PROFILES
 from app.data_loader.data_loader_logger import data_loader_logger
+from app.data_loader.load_runs import LoadRun
 
 import argparse
+import sqlite3
 
 
-def load_data(table_name: str, csv_file_name: str):
-    df = prepare_data_for_loading(csv_file_name)
-    conn = create_connection()
-    data_loader_logger.info(f"Expecting to load `{len(df)}` rows into `{table_name}`")
-    res = df.to_sql(table_name, conn, if_exists='append', index=False)
-    data_loader_logger.info(f"{res} rows loaded successfully")
-    data_loader_logger.info(f"Closing connection")
-    conn.commit()
-    conn.close()
+def begin_write(conn):
+    """
+    Starts the write transaction of a load, taking the write lock, unless one is already open.
+    """
+    if not conn.in_transaction:
+        conn.execute("BEGIN IMMEDIATE;")
+
+
+def insert_rows(conn, table_name: str, df) -> int:
+    """
+    Appends the rows of `df` to `table_name`, creating the table from the DataFrame's columns if it doesn't
+    exist. Unlike `DataFrame.to_sql`, which commits, the rows stay in the caller's transaction.
+
+    Returns:
+        int: The number of rows written.
+    """
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?;", [table_name]).fetchone():
+        from pandas.io.sql import get_schema
+        conn.execute(get_schema(df, table_name, con=conn))
+    columns = ", ".join(f'"{column}"' for column in df.columns)
+    placeholders = ", ".join("?" * len(df.columns))
+    # Boxed as Python values, with None for the missing ones of any dtype
+    values = df.astype(object).where(df.notna(), None)
+    conn.executemany(f'INSERT INTO "{table_name}" ({columns}) VALUES ({placeholders});',
+                     values.itertuples(index=False, name=None))
+    return len(df)
+
+
+def write_reviews(df, conn, table_name: str = "reviews") -> int:
+    """
+    Appends the cleaned reviews to `table_name`. With the partitioned layout each review goes to the partition
+    of its month, with ids from the shared id sequence, and with the split layout the text goes to the content
+    table. Opens a write transaction if none is open, the caller commits.
+
+    Returns:
+        int: The number of rows written.
+    """
+    begin_write(conn)
+    if uses_split_layout() and table_name == "reviews":
+        return write_split_reviews(df, conn)
+    if not uses_partitions() or table_name != "reviews":
+        return insert_rows(conn, table_name, df)
+
+    df = df.copy()
+    df.insert(0, "id", allocate_ids(conn, len(df)))
+    keys = df["review_date"].map(month_key, na_action="ignore").fillna(UNDATED)
+    for key, partition_df in df.groupby(keys, sort=True):
+        partition = ensure_partition(conn, key)
+        data_loader_logger.info("Loading %s rows into partition `%s`", len(partition_df), partition)
+        insert_rows(conn, partition, partition_df)
+    return len(df)
+
+
+def write_split_reviews(df, conn) -> int:
+    """
+    Writes the text of the reviews to the content table and the other columns to `reviews`, ids assigned here
+    so both halves of a review share it. Runs in the transaction `write_reviews` opened, which holds the write
+    lock from reading the highest id until the caller commits.
+    """
+    first_id = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM reviews;").fetchone()[0]
+    df = df.copy()
+    df.insert(0, "id", range(first_id, first_id + len(df)))
+    contents = df.pop(CONTENT_COLUMN)
+    data_loader_logger.info("Loading the text of %s reviews into the content table", len(df))
+    # Missing texts are NaN, or <NA> with compact dtypes, stored as NULL
+    contents = contents.astype(object).where(contents.notna(), None)
+    write_contents(conn, zip(df["id"].tolist(), contents.tolist()))
+    return insert_rows(conn, "reviews", df)
+
+
+def load_reviews(df, conn) -> int:
+    """
+    Appends cleaned reviews to `reviews`, records them in the change log and bumps the data version, all in one
+    write transaction, so consumers of the log and of the version never miss a committed row. The caller commits.
+
+    Returns:
+        int: The number of rows written.
+    """
+    # The write lock is held from here, so no other writer adds rows between reading the highest id and logging
+    begin_write(conn)
+    previous_max_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM reviews;").fetchone()[0]
+    rows = write_reviews(df, conn)
+    # Loaded rows get ids above the previous highest one
+    log_matching(conn, INSERT, "id > ?", [previous_max_id])
+    return rows
+
+
+def load_data(table_name: str, csv_file_name: str, storage_profile: str = None, profile: bool = False,
+              profile_dir: str = None) -> LoadRun:
+    """
+    Loads a CSV file of reviews into `table_name`, timing each stage. The run is recorded in `load_runs`, also
+    when it fails, see `load_runs.py`.
+
+    Args:
+        table_name (str): The table to load into.
+        csv_file_name (str): The file to load.
+        storage_profile (str): The SQLite tuning profile of the load, `config.STORAGE_PROFILE` by default.
+        profile (bool): Also run cProfile and tracemalloc over the load, writing their output to `profile_dir`.
+        profile_dir (str): Where the profiles are written, `./load_profiles` by default.
+
+    Returns:
+        LoadRun: The stages and totals of the run.
+    """
+    # Imported here so the CLI starts, and reports argument errors, without waiting for pandas to import
+    from app.data_loader.data_cleaning_and_transformation import prepare_data_for_loading, convert_dates_for_storage
+
+    run = LoadRun(csv_file_name, profile, profile_dir)
+    conn = create_connection(storage_profile)
+    try:
+        with run:
+            df = prepare_data_for_loading(csv_file_name, run=run)
+            df = run.run_stage("convert_dates_for_storage", convert_dates_for_storage, df)
+            data_loader_logger.info("Expecting to load `%s` rows into `%s`", len(df), table_name)
+            if table_name == "reviews":
+                res = run.run_stage("to_sql", lambda reviews: load_reviews(reviews, conn), df)
+                prune_change_log(conn)
+            else:
+                res = run.run_stage("to_sql", lambda reviews: write_reviews(reviews, conn, table_name), df)
+            data_loader_logger.info("%s rows loaded successfully", res)
+            # Keep the statistics behind estimated counts in line with the new rows. ANALYZE runs in the
+            # load's transaction and commits it, so the rows are only kept once every stage succeeded.
+            run.run_stage("analyze", lambda _: analyze(conn), None)
+            conn.commit()
+            run.rows_loaded = res
+    except Exception:
+        # Nothing of a failed load is kept, apart from its record
+        conn.rollback()
+        raise
+    finally:
+        try:
+            run.save(conn)
+        except sqlite3.Error as error:
+            data_loader_logger.warning("Unable to record the load run: %s", error)
+        data_loader_logger.info("Closing connection")
+        conn.close()
+        data_loader_logger.info("%s", run.summary())
+    return run
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Load data into the SQLite database.")
     parser.add_argument('--file', required=True, help="Path to the CSV file")
+    parser.add_argument('--storage-profile', default=None, choices=list(PROFILES),
+                        help="SQLite tuning profile of the load, e.g. bulk_load when nothing else uses the database. "
+                             "Defaults to STORAGE_PROFILE")
+    parser.add_argument('--profile', action='store_true',
+                        help="Run cProfile and tracemalloc over the load, which slows it down")
+    parser.add_argument('--profile-dir', default=None,
+                        help="Where --profile writes its output. Defaults to ./load_profiles")
     args = parser.parse_args()
     table_name = "reviews"
-    load_data(table_name=table_name, csv_file_name=args.file)
+    load_run = load_data(table_name=table_name, csv_file_name=args.file, storage_profile=args.storage_profile,
+                         profile=args.profile, profile_dir=args.profile_dir)
+    print(load_run.summary())
 
@@ -0,0 +1,199 @@
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Optional
+
+from app.data_loader.data_loader_logger import data_loader_logger
+
+"""
+This module records the runs of `load_data`, to tell which stage of a load got slower when a nightly load does.
+
+Every stage, from reading the file to writing the rows, records its wall and CPU time, the rows it received and
+returned, and the peak resident memory of the process while it ran, sampled on a background thread. A run is
+saved to `load_runs` in the database it loaded, with its stages as JSON, and summarised in the log and by the CLI.
+
+`profile=True` (`--profile`) also runs cProfile and tracemalloc over the whole run, which slows it down. It adds
+the peak traced memory of each stage, and writes a `.prof` file, for `python -m pstats` or snakeviz, and the top
+allocation sites of the tracemalloc snapshot to `profile_dir`.
+"""
+
+LOAD_RUNS_TABLE = "load_runs"
+LOAD_RUNS_TABLE_SQL = f"""
+CREATE TABLE IF NOT EXISTS {LOAD_RUNS_TABLE} (
+            id INTEGER PRIMARY KEY,
+            started_at TEXT NOT NULL,
+            source TEXT,
+            status TEXT NOT NULL,
+            rows_loaded INTEGER,
+            wall_seconds REAL,
+            cpu_seconds REAL,
+            peak_rss_mb REAL,
+            stages TEXT,
+            profile_path TEXT,
+            error TEXT
+        );"""
+# Allocation sites listed in the tracemalloc report
+TRACEMALLOC_TOP = 25
+
+
+def current_rss_bytes() -> int:
+    """
+    Returns the resident set size of this process, or its peak when the current value isn't available.
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+class PeakRssSampler:
+    """
+    Samples the resident set size on a background thread and keeps the peak, without slowing the stage down
+    the way allocation tracing would.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.peak = 0
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def run(self):
+        while not self.stop_event.is_set():
+            self.peak = max(self.peak, current_rss_bytes())
+            self.stop_event.wait(self.interval)
+
+    def __enter__(self):
+        self.peak = current_rss_bytes()
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop_event.set()
+        self.thread.join()
+        self.peak = max(self.peak, current_rss_bytes())
+
+
+def row_count(value) -> Optional[int]:
+    # Stages take and return DataFrames, apart from reading the file and the count the write returns
+    if isinstance(value, int):
+        return value
+    return len(value) if hasattr(value, "__len__") and not isinstance(value, str) else None
+
+
+class LoadRun:
+    """
+    The stages of one load, see the module docstring.
+    """
+
+    def __init__(self, source: str, profile: bool = False, profile_dir: str = None):
+        self.source = source
+        self.profile = profile
+        self.profile_dir = profile_dir or os.path.join(os.getcwd(), "load_profiles")
+        self.profile_path = None
+        self.profiler = cProfile.Profile() if profile else None
+        self.stages = []
+        self.status = "running"
+        self.error = None
+        self.rows_loaded = None
+        self.started_at = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        self.start_wall = self.start_cpu = None
+        self.wall_seconds = self.cpu_seconds = None
+
+    def __enter__(self):
+        if self.profile:
+            tracemalloc.start()
+            self.profiler.enable()
+        self.start_wall, self.start_cpu = time.perf_counter(), time.process_time()
+        return self
+
+    def __exit__(self, exc_type, error, traceback):
+        self.wall_seconds = time.perf_counter() - self.start_wall
+        self.cpu_seconds = time.process_time() - self.start_cpu
+        if error is not None:
+            self.status, self.error = "failed", str(error)
+        elif self.status == "running":
+            self.status = "completed"
+        if self.profile:
+            self.profiler.disable()
+            self.write_profile()
+            tracemalloc.stop()
+
+    def run_stage(self, name: str, function, value):
+        """
+        Runs one stage on `value`, records it and returns its output.
+        """
+        if self.profile and hasattr(tracemalloc, "reset_peak"):
+            # Python 3.9+, before it a stage's traced peak covers the run so far
+            tracemalloc.reset_peak()
+        with PeakRssSampler() as sampler:
+            start_wall, start_cpu = time.perf_counter(), time.process_time()
+            output = function(value)
+            wall_seconds, cpu_seconds = time.perf_counter() - start_wall, time.process_time() - start_cpu
+        stage = {
+            "stage": name,
+            "wall_seconds": round(wall_seconds, 4),
+            "cpu_seconds": round(cpu_seconds, 4),
+            "rows_in": row_count(value),
+            "rows_out": row_count(output),
+            "peak_rss_mb": round(sampler.peak / 2 ** 20, 1),
+        }
+        if self.profile:
+            stage["traced_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 1)
+        self.stages.append(stage)
+        data_loader_logger.info("Stage %s took %.3fs wall, %.3fs CPU, %s -> %s rows, %.1f MB peak RSS", name,
+                                wall_seconds, cpu_seconds, stage["rows_in"], stage["rows_out"], stage["peak_rss_mb"])
+        return output
+
+    def write_profile(self):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        base_path = os.path.join(self.profile_dir, f"load_{time.strftime('%Y%m%dT%H%M%S')}_{os.getpid()}")
+        self.profiler.dump_stats(f"{base_path}.prof")
+        top_stats = tracemalloc.take_snapshot().statistics("lineno")[:TRACEMALLOC_TOP]
+        with open(f"{base_path}.tracemalloc.txt", "w") as report:
+            report.write(f"Top {len(top_stats)} allocation sites still held at the end of the load\n")
+            report.writelines(f"{stat}\n" for stat in top_stats)
+        self.profile_path = f"{base_path}.prof"
+        data_loader_logger.info("Wrote the load profile to %s and %s.tracemalloc.txt", self.profile_path, base_path)
+
+    def save(self, conn) -> int:
+        """
+        Records the run in `load_runs`, and commits.
+
+        Returns:
+            int: The id of the run.
+        """
+        conn.execute(LOAD_RUNS_TABLE_SQL)
+        run_id = conn.execute(
+            f"INSERT INTO {LOAD_RUNS_TABLE} (started_at, source, status, rows_loaded, wall_seconds, cpu_seconds, "
+            f"peak_rss_mb, stages, profile_path, error) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?);",
+            [self.started_at, self.source, self.status, self.rows_loaded, self.wall_seconds, self.cpu_seconds,
+             max((stage["peak_rss_mb"] for stage in self.stages), default=None), json.dumps(self.stages),
+             self.profile_path, self.error]).lastrowid
+        conn.commit()
+        return run_id
+
+    def summary(self) -> str:
+        """
+        Returns the stages and the totals of the run as a table.
+        """
+        lines = [f"Load of {self.source} {self.status} in {self.wall_seconds or 0:.3f}s "
+                 f"({self.cpu_seconds or 0:.3f}s CPU), {self.rows_loaded} rows loaded",
+                 f"  {'stage':<30} {'wall s':>9} {'CPU s':>9} {'rows in':>10} {'rows out':>10} {'peak MB':>9}"]
+        for stage in self.stages:
+            lines.append(f"  {stage['stage']:<30} {stage['wall_seconds']:>9.3f} {stage['cpu_seconds']:>9.3f} "
+                         f"{stage['rows_in'] if stage['rows_in'] is not None else '-':>10} "
+                         f"{stage['rows_out'] if stage['rows_out'] is not None else '-':>10} "
+                         f"{stage['peak_rss_mb']:>9.1f}")
+        if self.error:
+            lines.append(f"  Failed: {self.error}")
+        if self.profile_path:
+            lines.append(f"  Profile: {self.profile_path}")
+        return "\n".join(lines)
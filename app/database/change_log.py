@@ -0,0 +1,126 @@
+import json
+from typing import Iterable, List, Optional, Tuple
+
+from app import config
+from app.database import database
+from app.database.data_version import bump_data_version
+from app.database.database_logger import database_logger
+
+"""
+This module keeps the change log behind `/reviews/changes`. Every insert, update and delete of reviews appends
+one row per review to `review_changes`, in the transaction of the change, so the log can't disagree with the
+table. `seq` is an AUTOINCREMENT key: it only grows, even after old entries are pruned, so consumers can ask
+for everything after the last `seq` they saw.
+
+Entries are written by the code making the change rather than by triggers, so a truncate keeps SQLite's fast
+path, and a row moved between partitions by an update is logged once, as an update. A truncate is logged as a
+single `truncate` entry, with no review id, rather than one delete per review: consumers drop everything they
+hold, then apply the entries after it.
+"""
+
+CHANGE_TABLE = "review_changes"
+INSERT = "insert"
+UPDATE = "update"
+DELETE = "delete"
+TRUNCATE = "truncate"
+# The review id of a truncate entry, review ids start at 1
+TRUNCATE_REVIEW_ID = 0
+CHANGE_TABLE_SQL = f"""
+CREATE TABLE IF NOT EXISTS {CHANGE_TABLE} (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            review_id INTEGER NOT NULL,
+            operation TEXT NOT NULL,
+            changed_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now'))
+        );"""
+
+
+# Database files whose change log is known to exist, see `ensure_change_log`
+created_for = set()
+
+
+def create_change_log(conn):
+    conn.execute(CHANGE_TABLE_SQL)
+    created_for.add(database.db_path)
+
+
+def ensure_change_log(conn):
+    """
+    Creates the change log on first use in this process, so databases created before it existed get one
+    without a migration.
+    """
+    if database.db_path not in created_for:
+        create_change_log(conn)
+
+
+def log_changes(conn, review_ids: Iterable[int], operation: str):
+    """
+    Appends an entry for each of `review_ids`, and bumps the data version. Runs inside the caller's transaction.
+    """
+    bump_data_version(conn)
+    if not config.CHANGE_LOG:
+        return
+    ensure_change_log(conn)
+    conn.execute(f"INSERT INTO {CHANGE_TABLE} (review_id, operation) SELECT value, ? FROM json_each(?);",
+                 [operation, json.dumps(list(review_ids))])
+
+
+def log_matching(conn, operation: str, where_clause: str = "", params: list = None, table: str = "reviews"):
+    """
+    Appends an entry for each review of `table` matching the WHERE clause. Updates and deletes call this before
+    changing the rows, inside their transaction, so it sees the rows the change applies to. Bumps the data
+    version.
+    """
+    bump_data_version(conn)
+    if not config.CHANGE_LOG:
+        return
+    ensure_change_log(conn)
+    where_sql = f" WHERE {where_clause}" if where_clause else ""
+    conn.execute(f"INSERT INTO {CHANGE_TABLE} (review_id, operation) SELECT id, ? FROM {table}{where_sql};",
+                 [operation] + list(params or []))
+
+
+def log_truncate(conn):
+    """
+    Appends the entry of a delete of every review, and bumps the data version. Runs inside the caller's
+    transaction.
+    """
+    log_changes(conn, [TRUNCATE_REVIEW_ID], TRUNCATE)
+
+
+def read_change_entries(conn, since: int, limit: int) -> List[Tuple[int, int, str, str]]:
+    """
+    Returns up to `limit` entries after `since`, as `(seq, review_id, operation, changed_at)`, oldest first.
+    """
+    return conn.execute(f"SELECT seq, review_id, operation, changed_at FROM {CHANGE_TABLE} WHERE seq > ? "
+                        f"ORDER BY seq LIMIT ?;", [since, limit]).fetchall()
+
+
+def latest_seq(conn) -> int:
+    """
+    Returns the highest `seq` handed out, 0 before the first change.
+    """
+    row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = ?;", [CHANGE_TABLE]).fetchone()
+    return row[0] if row else 0
+
+
+def oldest_seq(conn) -> Optional[int]:
+    """
+    Returns the oldest `seq` still in the log, or None when it is empty.
+    """
+    return conn.execute(f"SELECT MIN(seq) FROM {CHANGE_TABLE};").fetchone()[0]
+
+
+def prune_change_log(conn, retention_days: float = None) -> int:
+    """
+    Deletes the entries older than `retention_days`, `config.CHANGE_LOG_RETENTION_DAYS` by default. The
+    caller commits.
+
+    Returns:
+        int: The number of entries deleted.
+    """
+    retention_days = config.CHANGE_LOG_RETENTION_DAYS if retention_days is None else retention_days
+    deleted = conn.execute(f"DELETE FROM {CHANGE_TABLE} WHERE changed_at < strftime('%Y-%m-%dT%H:%M:%fZ', 'now', ?);",
+                           [f"{-float(retention_days)} days"]).rowcount
+    if deleted:
+        database_logger.info("Pruned %s change log entries older than %s days", deleted, retention_days)
+    return deleted
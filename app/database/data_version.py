@@ -0,0 +1,52 @@
+from app.database import database
+
+"""
+This module keeps the data version of the reviews, which the ETags of `/reviews/select` are built from, so a
+client re-sending its ETag can be answered with 304 without running the query.
+
+Every write of reviews bumps the version in its own transaction. The write paths all record their changes
+through `log_changes` or `log_matching`, which bump it even with the change log disabled. The version is a
+counter with a random epoch set when its row is created, so a database rebuilt from scratch doesn't hand out
+the versions of the previous one again.
+"""
+
+DATA_VERSION_TABLE = "data_versions"
+DATA_VERSION_TABLE_SQL = f"""
+CREATE TABLE IF NOT EXISTS {DATA_VERSION_TABLE} (
+            name TEXT PRIMARY KEY,
+            epoch TEXT NOT NULL DEFAULT (lower(hex(randomblob(8)))),
+            version INTEGER NOT NULL DEFAULT 0
+        );"""
+
+# Database files whose version table is known to exist, see `ensure_data_versions`
+created_for = set()
+
+
+def create_data_versions(conn):
+    conn.execute(DATA_VERSION_TABLE_SQL)
+    created_for.add(database.db_path)
+
+
+def ensure_data_versions(conn):
+    """
+    Creates the version table on first use in this process, for databases created before it existed.
+    """
+    if database.db_path not in created_for:
+        create_data_versions(conn)
+
+
+def bump_data_version(conn, name: str = "reviews"):
+    """
+    Increments the version of `name`. Runs inside the caller's transaction.
+    """
+    ensure_data_versions(conn)
+    conn.execute(f"INSERT INTO {DATA_VERSION_TABLE} (name, version) VALUES (?, 1) "
+                 f"ON CONFLICT (name) DO UPDATE SET version = version + 1;", [name])
+
+
+def read_data_version(conn, name: str = "reviews") -> str:
+    """
+    Returns the version of `name` as `<epoch>.<counter>`, "0" before its first write.
+    """
+    row = conn.execute(f"SELECT epoch, version FROM {DATA_VERSION_TABLE} WHERE name = ?;", [name]).fetchone()
+    return f"{row[0]}.{row[1]}" if row else "0"
@@ -1,40 +1,147 @@
 import sqlite3
 import os
+import time
+from contextlib import contextmanager
 
+from app import config
 from app.database.database_logger import database_logger
+from app.database.text_compression import decompress_text
+from app.database.tuning import apply_profile
+from app.monitoring.metrics import DB_CONNECTION_WAIT
 
 
 # Construct an absolute path to the database file
 base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-# Use this path when connecting to the database
-db_path = os.path.join(base_dir, 'database/trustpilot_reviews.db')
+# Use this path when connecting to the database, unless it is overridden with `REVIEWS_DB_PATH`
+db_path = config.DATABASE_PATH or os.path.join(base_dir, 'database/trustpilot_reviews.db')
 
 
-CREATE_TABLE_SQL = """
-CREATE TABLE IF NOT EXISTS reviews (
+# `review_date` is stored as INTEGER epoch-days or as ISO-8601 text, see `config.REVIEW_DATE_STORAGE`
+REVIEW_DATE_COLUMN_TYPE = "INTEGER" if config.REVIEW_DATE_STORAGE == "epoch_days" else "DATE"
+
+REVIEW_COLUMNS = ["id", "reviewer_name", "review_title", "review_rating", "review_content", "email_address",
+                  "country", "country_code", "review_date"]
+
+
+def create_table_sql(table_name: str, with_content: bool = True) -> str:
+    """
+    Returns the CREATE TABLE statement of a reviews table. `with_content=False` leaves out `review_content`,
+    which the split layout stores in a side table.
+    """
+    content_column = "\n            review_content TEXT," if with_content else ""
+    return f"""
+CREATE TABLE IF NOT EXISTS {table_name} (
             id INTEGER PRIMARY KEY,
             reviewer_name TEXT,
             review_title TEXT,
-            review_rating INTEGER,
-            review_content TEXT,
+            review_rating INTEGER,{content_column}
             email_address TEXT,
             country TEXT,
             country_code TEXT,
-            review_date DATE
+            review_date {REVIEW_DATE_COLUMN_TYPE}
         );"""
 
+
+def create_indexes_sql(table_name: str) -> list:
+    return [
+        f"CREATE INDEX IF NOT EXISTS idx_{table_name}_review_date ON {table_name} (review_date);",
+    ]
+
+
+CREATE_TABLE_SQL = create_table_sql("reviews")
+
+CREATE_INDEXES_SQL = create_indexes_sql("reviews")
+
 DROP_TABLE_SQL = "DROP TABLE reviews"
 
+# Virtual machine instructions between two checks of a statement's deadline, well under a millisecond
+DEADLINE_CHECK_INSTRUCTIONS = 10000
+
+
+class DatabaseBusyError(Exception):
+    """
+    Raised when SQLite gave up waiting for a lock held by another connection. The API answers it with 503
+    and `Retry-After`, as the request can succeed once the lock is released.
+    """
+
+
+class QueryTimeoutError(Exception):
+    """
+    Raised when a statement ran past its deadline and was interrupted. The API answers it with 400, asking
+    for narrower conditions or smaller pages.
+    """
+
 
-def create_connection():
-    database_logger.info(f"Creating connection to database, {db_path}")
-    return sqlite3.connect(db_path)
+def raise_if_busy(error: Exception):
+    """
+    Re-raises SQLite's lock timeouts as `DatabaseBusyError`, so they aren't reported as bad requests.
+    """
+    if isinstance(error, sqlite3.OperationalError) and str(error).startswith(("database is locked",
+                                                                                 "database table is locked")):
+        raise DatabaseBusyError(str(error)) from error
+
+
+def create_connection(profile: str = None):
+    """
+    Opens a connection to the database, tuned by `profile`, `config.STORAGE_PROFILE` by default.
+    """
+    database_logger.debug("Creating connection to database, %s", db_path)
+    start = time.perf_counter()
+    conn = sqlite3.connect(db_path)
+    apply_profile(conn, profile)
+    # Reads compressed `review_content` values of the split layout
+    conn.create_function("decompress_text", 1, decompress_text, deterministic=True)
+    DB_CONNECTION_WAIT.labels().observe(time.perf_counter() - start)
+    return conn
+
+
+@contextmanager
+def statement_deadline(conn, timeout_ms: float = None):
+    """
+    Interrupts the statements run on `conn` within the block once they have taken more than `timeout_ms`
+    altogether, `config.QUERY_TIMEOUT_MS` by default. Fetching rows counts towards the deadline too.
+
+    Raises:
+        QueryTimeoutError: A statement was interrupted.
+    """
+    timeout_ms = config.QUERY_TIMEOUT_MS if timeout_ms is None else timeout_ms
+    if timeout_ms <= 0:
+        yield
+        return
+    deadline = time.monotonic() + timeout_ms / 1000
+    # A true return value makes SQLite abort the running statement with "interrupted"
+    conn.set_progress_handler(lambda: time.monotonic() > deadline, DEADLINE_CHECK_INSTRUCTIONS)
+    try:
+        yield
+    except sqlite3.OperationalError as error:
+        if str(error) != "interrupted":
+            raise
+        raise QueryTimeoutError(f"The query took longer than {timeout_ms:g} ms") from error
+    finally:
+        conn.set_progress_handler(None, 0)
+
+
+def enable_wal() -> str:
+    """
+    Switches the database file to write-ahead logging, so readers in other worker processes don't block on a
+    writer. The journal mode is stored in the file, so this only needs to run once.
+
+    Returns:
+        str: The journal mode now in effect.
+    """
+    conn = create_connection()
+    try:
+        journal_mode = conn.execute("PRAGMA journal_mode=WAL;").fetchone()[0]
+    finally:
+        conn.close()
+    database_logger.info("Database journal mode is %s", journal_mode)
+    return journal_mode
 
 
 def drop_table():
     conn = create_connection()
     cursor = conn.cursor()
-    database_logger.info(f"Dropping table via SQL \n---{DROP_TABLE_SQL};\n---")
+    database_logger.info("Dropping table via SQL \n---%s;\n---", DROP_TABLE_SQL)
     cursor.execute("""
         {DROP_TABLE_SQL};
     """)
@@ -43,10 +150,33 @@ def drop_table():
 
 
 def create_table():
+    # Imported here, the change log module builds on the helpers above
+    from app.database.change_log import create_change_log
+    from app.database.data_version import create_data_versions
+    conn = create_connection()
+    # Only takes effect on a new, empty file. Lets maintenance give the pages freed by deletes back to the OS
+    # a few at a time, see `app/database/maintenance.py`
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL;")
+    create_change_log(conn)
+    create_data_versions(conn)
+    conn.commit()
+    conn.close()
+    if config.STORAGE_LAYOUT == "partitioned":
+        # Imported here, the partitions module builds on the helpers above
+        from app.database.partitions import create_partitioned_layout
+        create_partitioned_layout()
+        return
+    if config.STORAGE_LAYOUT == "split":
+        from app.database.split_layout import create_split_layout
+        create_split_layout()
+        return
     conn = create_connection()
     cursor = conn.cursor()
-    database_logger.info(f"Creating table via SQL \n---{CREATE_TABLE_SQL}\n---")
+    database_logger.info("Creating table via SQL \n---%s\n---", CREATE_TABLE_SQL)
     cursor.execute(CREATE_TABLE_SQL)
+    for create_index_sql in CREATE_INDEXES_SQL:
+        database_logger.info("Creating index via SQL `%s`", create_index_sql)
+        cursor.execute(create_index_sql)
     conn.commit()
     conn.close()
 
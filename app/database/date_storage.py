@@ -0,0 +1,65 @@
+from datetime import date, datetime, timedelta
+
+from app import config
+
+"""
+This module converts `review_date` values between their API representation (ISO-8601 dates) and the
+representation stored in SQLite, as selected by `config.REVIEW_DATE_STORAGE`.
+"""
+
+EPOCH = date(1970, 1, 1)
+
+
+def uses_epoch_days() -> bool:
+    return config.REVIEW_DATE_STORAGE == "epoch_days"
+
+
+def to_storage_date(value):
+    """
+    Converts a date value into the form stored in the `review_date` column.
+
+    Args:
+        value (Union[date, datetime, str, None]): A date, datetime or ISO-8601 date string.
+
+    Returns:
+        The value unchanged in "iso" mode, otherwise the number of days since 1970-01-01.
+
+    Raises:
+        ValueError: If the value is not a date, datetime or string, or a string value is not a valid ISO-8601
+            date in "epoch_days" mode.
+    """
+    if value is None:
+        return value
+    if not isinstance(value, (str, date)):
+        raise ValueError(f"review_date must be an ISO-8601 date, got {type(value).__name__} {value!r}")
+    if not uses_epoch_days():
+        return value
+    if isinstance(value, str):
+        value = date.fromisoformat(value)
+    if isinstance(value, datetime):
+        value = value.date()
+    return (value - EPOCH).days
+
+
+def from_storage_date(value):
+    """
+    Converts a stored `review_date` value back into an ISO-8601 date string.
+
+    Args:
+        value: The raw value read from the `review_date` column.
+
+    Returns:
+        The value unchanged in "iso" mode, otherwise the ISO-8601 date string.
+    """
+    if value is None or not uses_epoch_days():
+        return value
+    return (EPOCH + timedelta(days=value)).isoformat()
+
+
+def review_date_sql_expression(column: str = "review_date") -> str:
+    """
+    Returns an SQL expression rendering the `review_date` column as ISO-8601 text, for text matching.
+    """
+    if uses_epoch_days():
+        return f"date({column} * 86400, 'unixepoch')"
+    return column
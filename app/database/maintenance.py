@@ -0,0 +1,162 @@
+import time
+from typing import Callable, Dict, List, Optional
+
+from app import config
+from app.database.change_log import ensure_change_log, prune_change_log
+from app.database.database import create_connection
+from app.database.database_logger import database_logger
+from app.database.statistics import analyze
+from app.monitoring.metrics import MAINTENANCE_DURATION, MAINTENANCE_RUNS
+
+"""
+This module runs the periodic database maintenance:
+
+    - "optimize" - `PRAGMA optimize`, which refreshes the statistics SQLite finds stale
+    - "analyze"  - a full refresh of the statistics, see `statistics.py`
+    - "vacuum"   - gives up to `config.MAINTENANCE_VACUUM_PAGES` pages freed by deletes back to the file system.
+                   Needs `auto_vacuum = INCREMENTAL`, which `create_table` sets on new databases. Older files
+                   have to be converted once with `VACUUM`
+    - "prune"    - deletes the expired change log entries
+
+Each task runs at most once per `config.MAINTENANCE_<TASK>_INTERVAL` seconds, 0 disabling it. The last run of
+each task is recorded in `maintenance_runs`, and a task is claimed there before it runs, so only one of the
+worker processes sharing the file runs it.
+"""
+
+MAINTENANCE_TABLE = "maintenance_runs"
+MAINTENANCE_TABLE_SQL = f"""
+CREATE TABLE IF NOT EXISTS {MAINTENANCE_TABLE} (
+            task TEXT PRIMARY KEY,
+            last_run REAL NOT NULL,
+            status TEXT,
+            seconds REAL,
+            detail TEXT
+        );"""
+# `PRAGMA auto_vacuum` reports INCREMENTAL as 2
+AUTO_VACUUM_INCREMENTAL = 2
+
+
+def optimize(conn) -> str:
+    conn.execute("PRAGMA optimize;")
+    return "optimized"
+
+
+def refresh_statistics(conn) -> str:
+    analyze(conn)
+    return "analyzed"
+
+
+def incremental_vacuum(conn) -> str:
+    """
+    Releases free pages at the end of the file, at most `config.MAINTENANCE_VACUUM_PAGES`, 0 meaning all.
+    """
+    if conn.execute("PRAGMA auto_vacuum;").fetchone()[0] != AUTO_VACUUM_INCREMENTAL:
+        return "skipped, auto_vacuum is not INCREMENTAL, run VACUUM once to convert the file"
+    free_pages = conn.execute("PRAGMA freelist_count;").fetchone()[0]
+    if free_pages:
+        # Each step of the statement releases one page, and `execute` only steps it once, `executescript`
+        # runs it to completion
+        conn.executescript(f"PRAGMA incremental_vacuum({int(config.MAINTENANCE_VACUUM_PAGES)});")
+    remaining_pages = conn.execute("PRAGMA freelist_count;").fetchone()[0]
+    return f"released {free_pages - remaining_pages} of {free_pages} free pages"
+
+
+def prune(conn) -> str:
+    ensure_change_log(conn)
+    deleted = prune_change_log(conn)
+    conn.commit()
+    return f"pruned {deleted} change log entries"
+
+
+TASKS: Dict[str, Callable] = {
+    "optimize": optimize,
+    "analyze": refresh_statistics,
+    "vacuum": incremental_vacuum,
+    "prune": prune,
+}
+
+
+def task_interval(task: str) -> float:
+    return getattr(config, f"MAINTENANCE_{task.upper()}_INTERVAL")
+
+
+def claim_task(conn, task: str, interval: float) -> bool:
+    """
+    Records that `task` starts now, unless it already ran in the last `interval` seconds.
+
+    Returns:
+        bool: Whether this process should run the task.
+    """
+    now = time.time()
+    claimed = conn.execute(
+        f"INSERT INTO {MAINTENANCE_TABLE} (task, last_run, status) VALUES (?, ?, 'running') "
+        f"ON CONFLICT (task) DO UPDATE SET last_run = excluded.last_run, status = 'running' "
+        f"WHERE {MAINTENANCE_TABLE}.last_run <= ?;", [task, now, now - interval]).rowcount == 1
+    conn.commit()
+    return claimed
+
+
+def run_due_tasks(force: bool = False, keep_going: Optional[Callable[[], bool]] = None) -> Dict[str, dict]:
+    """
+    Runs the tasks whose interval has elapsed since their last run.
+
+    Args:
+        force (bool): Run every task now, including the disabled ones.
+        keep_going (Callable[[], bool]): Checked before each task, the remaining tasks are left for later once
+            it returns False.
+
+    Returns:
+        Dict[str, dict]: The status, duration and outcome of each task run.
+    """
+    results = {}
+    conn = create_connection()
+    try:
+        conn.execute(MAINTENANCE_TABLE_SQL)
+        for task, function in TASKS.items():
+            if keep_going is not None and not keep_going():
+                database_logger.info("Maintenance interrupted by new activity, %s left for later", task)
+                break
+            interval = task_interval(task)
+            if not force and interval <= 0:
+                continue
+            if not claim_task(conn, task, 0 if force else interval):
+                continue
+            start = time.perf_counter()
+            try:
+                status, detail = "completed", function(conn)
+            except Exception as error:
+                conn.rollback()
+                status, detail = "failed", str(error)
+                database_logger.error("Maintenance task %s failed: %s", task, error)
+            seconds = time.perf_counter() - start
+            conn.execute(f"UPDATE {MAINTENANCE_TABLE} SET status = ?, seconds = ?, detail = ? WHERE task = ?;",
+                         [status, seconds, detail, task])
+            conn.commit()
+            MAINTENANCE_RUNS.labels(task, status).inc()
+            MAINTENANCE_DURATION.labels(task).observe(seconds)
+            database_logger.info("Maintenance task %s %s in %.3fs: %s", task, status, seconds, detail)
+            results[task] = {"status": status, "seconds": round(seconds, 4), "detail": detail}
+    finally:
+        conn.close()
+    return results
+
+
+def maintenance_status() -> List[dict]:
+    """
+    Returns the interval and the last run of each task.
+    """
+    conn = create_connection()
+    try:
+        conn.execute(MAINTENANCE_TABLE_SQL)
+        conn.commit()
+        runs = {row[0]: row for row in conn.execute(
+            f"SELECT task, last_run, status, seconds, detail FROM {MAINTENANCE_TABLE};").fetchall()}
+    finally:
+        conn.close()
+    status = []
+    for task in TASKS:
+        _, last_run, last_status, seconds, detail = runs.get(task, (task, None, None, None, None))
+        status.append({"task": task, "interval_seconds": task_interval(task),
+                       "last_run": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(last_run)) if last_run else None,
+                       "status": last_status, "seconds": seconds, "detail": detail})
+    return status
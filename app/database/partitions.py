@@ -0,0 +1,315 @@
+import argparse
+import numbers
+import re
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from app import config
+from app.database.change_log import DELETE, log_matching
+from app.database.database import REVIEW_COLUMNS, create_connection, create_indexes_sql, create_table_sql
+from app.database.database_logger import database_logger
+from app.database.date_storage import EPOCH
+from app.models.models import Condition
+
+"""
+This module implements the "partitioned" storage layout (`config.STORAGE_LAYOUT`). Reviews are stored in one
+table per month of `review_date`, e.g. `reviews_2024_03`, plus `reviews_undated` for rows without a date.
+`reviews` is a view over all of them, so reads keep working unchanged, while:
+
+    - selects with a `range` or `equals` condition on `review_date` only read the months they can match
+    - inserts and the data loader write each row to the table of its month
+    - old data is removed by dropping whole months, instead of a DELETE over the whole table
+
+Ids stay unique across partitions, they are allocated from the `review_id_sequence` table.
+"""
+
+PARTITION_PREFIX = "reviews_"
+UNDATED = "undated"
+PARTITION_NAME_PATTERN = re.compile(r"^reviews_(\d{4})_(\d{2})$")
+ID_SEQUENCE_SQL = """
+CREATE TABLE IF NOT EXISTS review_id_sequence (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            next_id INTEGER NOT NULL
+        );"""
+
+
+def uses_partitions() -> bool:
+    return config.STORAGE_LAYOUT == "partitioned"
+
+
+def month_key(value) -> str:
+    """
+    Returns the partition key, `YYYY_MM` or "undated", of a `review_date` value in any of the forms it is
+    handled in: a date, an ISO-8601 string or an epoch-day integer.
+    """
+    if value is None:
+        return UNDATED
+    if isinstance(value, numbers.Integral):
+        value = EPOCH + timedelta(days=int(value))
+    elif isinstance(value, str):
+        try:
+            value = date.fromisoformat(value[:10])
+        except ValueError:
+            return UNDATED
+    if isinstance(value, (date, datetime)):
+        return f"{value.year:04d}_{value.month:02d}"
+    return UNDATED
+
+
+def partition_name(key: str) -> str:
+    return f"{PARTITION_PREFIX}{key}"
+
+
+def partition_month(name: str) -> Optional[Tuple[date, date]]:
+    """
+    Returns the first and last day of a partition's month, or None for the undated partition.
+    """
+    match = PARTITION_NAME_PATTERN.match(name)
+    if match is None:
+        return None
+    first_day = date(int(match.group(1)), int(match.group(2)), 1)
+    next_month = date(first_day.year + first_day.month // 12, first_day.month % 12 + 1, 1)
+    return first_day, next_month - timedelta(days=1)
+
+
+def list_partitions(conn) -> List[str]:
+    """
+    Returns the names of the partition tables, oldest month first and the undated partition last.
+    """
+    names = [row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'reviews\\_%' ESCAPE '\\';")]
+    months = sorted(name for name in names if PARTITION_NAME_PATTERN.match(name))
+    return months + [name for name in names if name == partition_name(UNDATED)]
+
+
+def refresh_view(conn, partitions: List[str]):
+    """
+    Recreates the `reviews` view as the union of `partitions`.
+    """
+    conn.execute("DROP VIEW IF EXISTS reviews;")
+    conn.execute(f"CREATE VIEW reviews AS {union_sql(partitions)};")
+
+
+def union_sql(partitions: List[str]) -> str:
+    columns = ", ".join(REVIEW_COLUMNS)
+    if not partitions:
+        # An empty result with the columns of the table
+        return f"SELECT {columns} FROM (SELECT {', '.join(f'NULL AS {c}' for c in REVIEW_COLUMNS)}) WHERE 0"
+    return " UNION ALL ".join(f"SELECT {columns} FROM {partition}" for partition in partitions)
+
+
+def ensure_partition(conn, key: str) -> str:
+    """
+    Creates the partition for `key`, and adds it to the `reviews` view, unless it exists.
+
+    Returns:
+        str: The partition table name.
+    """
+    name = partition_name(key)
+    existing = list_partitions(conn)
+    if name not in existing:
+        database_logger.info("Creating partition %s", name)
+        conn.execute(create_table_sql(name))
+        for create_index_sql in create_indexes_sql(name):
+            conn.execute(create_index_sql)
+        refresh_view(conn, sorted(existing + [name], key=partition_sort_key))
+    return name
+
+
+def partition_sort_key(name: str):
+    return (name == partition_name(UNDATED), name)
+
+
+def create_partitioned_layout():
+    """
+    Creates the id sequence and the `reviews` view over the existing partitions.
+    """
+    conn = create_connection()
+    try:
+        conn.execute(ID_SEQUENCE_SQL)
+        conn.execute("INSERT OR IGNORE INTO review_id_sequence (id, next_id) VALUES (1, 1);")
+        refresh_view(conn, list_partitions(conn))
+        conn.commit()
+    finally:
+        conn.close()
+    database_logger.info("Created partitioned `reviews` layout")
+
+
+def allocate_ids(conn, count: int) -> List[int]:
+    """
+    Reserves `count` consecutive review ids. Must run inside the caller's write transaction.
+    """
+    if count <= 0:
+        return []
+    next_id = conn.execute("UPDATE review_id_sequence SET next_id = next_id + ? WHERE id = 1 RETURNING next_id;",
+                           [count]).fetchone()[0]
+    return list(range(next_id - count, next_id))
+
+
+def review_date_bounds(conditions: List[Condition]) -> Optional[Tuple[date, date]]:
+    """
+    Returns the narrowest date range the conditions on `review_date` allow, or None when they don't restrict
+    `review_date` (or a value can't be read as a date, then nothing is pruned). `or` groups are not looked into.
+    """
+    low, high = None, None
+    for condition in conditions or []:
+        if condition.column != "review_date":
+            continue
+        bounds = []
+        try:
+            # Like the WHERE clause, `range` overrides `contains`, which overrides `equals`
+            if condition.range is not None:
+                bounds.append([date.fromisoformat(value[:10]) for value in condition.range])
+            elif condition.contains is None and condition.equals is not None:
+                bounds.append([date.fromisoformat(condition.equals[:10])] * 2)
+            if condition.in_:
+                days = [date.fromisoformat(value[:10]) for value in condition.in_]
+                bounds.append([min(days), max(days)])
+            # Compared by day, so a bound excluding its own day still allows the rest of that month
+            for operator in ("gt", "gte"):
+                if getattr(condition, operator) is not None:
+                    bounds.append([date.fromisoformat(getattr(condition, operator)[:10]), date.max])
+            for operator in ("lt", "lte"):
+                if getattr(condition, operator) is not None:
+                    bounds.append([date.min, date.fromisoformat(getattr(condition, operator)[:10])])
+        except (TypeError, ValueError):
+            return None
+        for start, end in bounds:
+            low = start if low is None else max(low, start)
+            high = end if high is None else min(high, end)
+    if low is None:
+        return None
+    return low, high
+
+
+def prune_partitions(partitions: List[str], conditions: List[Condition]) -> List[str]:
+    """
+    Returns the partitions that can hold rows matching `conditions`.
+    """
+    bounds = review_date_bounds(conditions)
+    if bounds is None:
+        return partitions
+    low, high = bounds
+    pruned = []
+    for partition in partitions:
+        month = partition_month(partition)
+        # Rows without a date never match a date condition
+        if month is not None and month[0] <= high and month[1] >= low:
+            pruned.append(partition)
+    return pruned
+
+
+def partition_source(partitions: List[str]) -> str:
+    """
+    Returns the FROM clause source reading only `partitions`, aliased as `reviews`.
+    """
+    if len(partitions) == 1:
+        return f"{partitions[0]} AS reviews"
+    return f"({union_sql(partitions)}) AS reviews"
+
+
+def write_tables(conn, conditions: List[Condition] = None) -> List[str]:
+    """
+    Returns the tables a delete or update matching `conditions` has to run against.
+    """
+    if not uses_partitions():
+        return ["reviews"]
+    return prune_partitions(list_partitions(conn), conditions)
+
+
+def update_rows(conn, conditions: List[Condition], where_clause: str, where_params: list,
+                assignments: Dict[str, object]) -> int:
+    """
+    Updates the rows of the partitions matching the WHERE clause. When `review_date` changes, rows whose
+    new month differs from their partition are moved to the partition of the new month.
+
+    Args:
+        conn (sqlite3.Connection): The connection, the caller commits.
+        conditions (List[Condition]): The conditions, used to prune partitions.
+        where_clause (str): The WHERE clause built from the conditions.
+        where_params (list): Its parameters.
+        assignments (Dict[str, object]): The columns to set, with their values converted for storage.
+
+    Returns:
+        int: The number of rows updated.
+    """
+    tables = write_tables(conn, conditions)
+    where_sql = f" WHERE {where_clause}" if where_clause else ""
+    set_clause = ", ".join(f"{column} = ?" for column in assignments)
+    set_params = list(assignments.values())
+
+    if "review_date" not in assignments:
+        return sum(conn.execute(f"UPDATE {table} SET {set_clause}{where_sql}", set_params + where_params).rowcount
+                   for table in tables)
+
+    destination = ensure_partition(conn, month_key(assignments["review_date"]))
+    rows_updated = 0
+    # Update in place first, so rows moved in below aren't updated twice
+    if destination in tables:
+        rows_updated += conn.execute(f"UPDATE {destination} SET {set_clause}{where_sql}",
+                                     set_params + where_params).rowcount
+    select_columns = ", ".join("?" if column in assignments else column for column in REVIEW_COLUMNS)
+    select_params = [assignments[column] for column in REVIEW_COLUMNS if column in assignments]
+    for table in tables:
+        if table == destination:
+            continue
+        rows_updated += conn.execute(
+            f"INSERT INTO {destination} ({', '.join(REVIEW_COLUMNS)}) SELECT {select_columns} FROM {table}{where_sql}",
+            select_params + where_params).rowcount
+        conn.execute(f"DELETE FROM {table}{where_sql}", where_params)
+    return rows_updated
+
+
+def drop_partition(conn, name: str):
+    """
+    Drops one partition and removes it from the `reviews` view.
+    """
+    log_matching(conn, DELETE, table=name)
+    remaining = [partition for partition in list_partitions(conn) if partition != name]
+    refresh_view(conn, remaining)
+    conn.execute(f"DROP TABLE IF EXISTS {name};")
+    database_logger.info("Dropped partition %s", name)
+
+
+def drop_partitions_before(month: str) -> List[str]:
+    """
+    Drops every partition of a month before `month` (`YYYY-MM`), e.g. for retention.
+
+    Returns:
+        List[str]: The dropped partitions.
+    """
+    cutoff = date.fromisoformat(f"{month}-01")
+    conn = create_connection()
+    try:
+        dropped = [partition for partition in list_partitions(conn)
+                   if partition_month(partition) is not None and partition_month(partition)[1] < cutoff]
+        for partition in dropped:
+            drop_partition(conn, partition)
+        conn.commit()
+    finally:
+        conn.close()
+    return dropped
+
+
+def partition_row_counts() -> Dict[str, int]:
+    conn = create_connection()
+    try:
+        return {partition: conn.execute(f"SELECT COUNT(*) FROM {partition}").fetchone()[0]
+                for partition in list_partitions(conn)}
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the monthly partitions of the reviews table.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("list", help="List the partitions with their row counts")
+    drop_parser = subparsers.add_parser("drop", help="Drop the partitions of every month before a month")
+    drop_parser.add_argument("--before", required=True, help="First month to keep, as YYYY-MM")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        for partition, rows in partition_row_counts().items():
+            print(f"{partition:<20} {rows:>12,}")
+    else:
+        print(f"Dropped: {', '.join(drop_partitions_before(args.before)) or 'nothing'}")
@@ -0,0 +1,258 @@
+import itertools
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import List
+
+from app.database.change_log import TRUNCATE, ensure_change_log, latest_seq, oldest_seq, read_change_entries
+from app.database.data_version import DATA_VERSION_TABLE, ensure_data_versions
+from app.database.database import create_connection
+from app.database.database_logger import database_logger
+from app.database.partitions import list_partitions, uses_partitions
+from app.database.split_layout import CONTENT_TABLE, uses_split_layout
+from app.database.text_compression import decompress_text
+from app.monitoring.metrics import READ_REPLICA_SEQ, READ_REPLICA_SYNCS
+
+"""
+This module keeps an in-memory copy of the database for `config.READ_REPLICA`, which selects are served from
+so they never touch the disk or wait on the writer's locks. Writes still go to the file.
+
+The copy is taken at startup with the sqlite3 backup API, indexes included, and brought up to date from the
+change log: every insert, update and delete logs the ids of the reviews it changed, so syncing re-reads those
+reviews from the file and replaces them in the copy, along with the data version. A truncate entry empties the
+copy's review tables before the entries after it are applied. Writes of this process sync
+straight after their commit, so its clients read their own writes. Writes of other worker processes and of the
+`load_data` CLI are picked up every `config.READ_REPLICA_SYNC_INTERVAL` seconds. A schema change, e.g. a new partition, or a gap in the
+change log after pruning, reloads the whole copy.
+
+The copy is a shared-cache in-memory database, so every thread's connection sees the same data. Readers use
+`read_uncommitted`, and so don't take the table locks that would make them fail while a sync is applied. Syncs
+replace each changed row in a single statement, so a reader sees every review either as it was or as it is,
+though not necessarily all the reviews of a sync at once. A transaction doesn't isolate such readers from a
+sync, so reads made of several statements that must agree use `create_snapshot_connection`, which holds syncs
+off until they finish.
+"""
+
+# Reviews read from the file per statement while syncing
+SYNC_BATCH = 10000
+
+
+class ReadReplica:
+    """
+    The in-memory copy of the database file of this process.
+    """
+
+    def __init__(self):
+        self.generation = itertools.count(1)
+        self.uri = None
+        # Keeps the in-memory database alive between requests
+        self.anchor = None
+        self.last_seq = 0
+        self.schema_version = None
+        # Serializes loads and syncs
+        self.sync_lock = threading.Lock()
+        # Held while connecting, so a reload can't free the database a reader is about to open
+        self.swap_lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        return self.anchor is not None
+
+    def connect(self):
+        """
+        Opens a read connection to the copy.
+        """
+        with self.swap_lock:
+            conn = sqlite3.connect(self.uri, uri=True)
+        conn.execute("PRAGMA read_uncommitted = 1;")
+        conn.create_function("decompress_text", 1, decompress_text, deterministic=True)
+        return conn
+
+    def load(self):
+        """
+        Copies the database file into a new in-memory database and switches reads over to it.
+        """
+        with self.sync_lock:
+            self.reload()
+
+    def reload(self):
+        disk = create_connection()
+        try:
+            ensure_change_log(disk)
+            ensure_data_versions(disk)
+            disk.commit()
+            # Read before the copy is taken, changes made in between are applied again by the next sync
+            last_seq = latest_seq(disk)
+            schema_version = disk.execute("PRAGMA schema_version;").fetchone()[0]
+            uri = f"file:reviews_replica_{os.getpid()}_{next(self.generation)}?mode=memory&cache=shared"
+            anchor = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            disk.backup(anchor)
+        finally:
+            disk.close()
+        with self.swap_lock:
+            previous, self.anchor, self.uri = self.anchor, anchor, uri
+        if previous is not None:
+            # Freed once the readers still using it close their connections
+            previous.close()
+        self.last_seq, self.schema_version = last_seq, schema_version
+        READ_REPLICA_SYNCS.labels("reload").inc()
+        READ_REPLICA_SEQ.labels().set(last_seq)
+        database_logger.info("Loaded the read replica %s, up to change %s", uri, last_seq)
+
+    def sync(self) -> int:
+        """
+        Applies the changes logged since the last sync.
+
+        Returns:
+            int: The number of reviews re-read from the file.
+        """
+        if not self.active:
+            return 0
+        with self.sync_lock:
+            disk = create_connection()
+            try:
+                ensure_change_log(disk)
+                oldest = oldest_seq(disk)
+                # A new partition or index, or entries pruned before this copy read them
+                outdated = disk.execute("PRAGMA schema_version;").fetchone()[0] != self.schema_version or \
+                    (oldest is not None and oldest > self.last_seq + 1)
+                synced = 0 if outdated else self.catch_up(disk)
+            finally:
+                disk.close()
+            if outdated:
+                self.reload()
+            return synced
+
+    def catch_up(self, disk) -> int:
+        # Read before the log, every write it counts is then applied, and the ETags built from it never claim
+        # a newer version than the copy holds
+        versions = disk.execute(f"SELECT * FROM {DATA_VERSION_TABLE};").fetchall()
+        synced = 0
+        while True:
+            entries = read_change_entries(disk, self.last_seq, SYNC_BATCH)
+            if not entries:
+                break
+            truncates = [position for position, entry in enumerate(entries) if entry[2] == TRUNCATE]
+            if truncates:
+                # The reviews changed before the last truncate are gone, whatever their entries say
+                self.truncate(disk)
+                entries_after = entries[truncates[-1] + 1:]
+            else:
+                entries_after = entries
+            synced += self.apply(disk, sorted({entry[1] for entry in entries_after}))
+            self.last_seq = entries[-1][0]
+        replica = self.connect()
+        try:
+            replica.executemany(f"INSERT OR REPLACE INTO {DATA_VERSION_TABLE} VALUES (?, ?, ?);", versions)
+            replica.commit()
+        finally:
+            replica.close()
+        READ_REPLICA_SEQ.labels().set(self.last_seq)
+        if synced:
+            READ_REPLICA_SYNCS.labels("incremental").inc()
+            database_logger.debug("Synced %s reviews into the read replica, up to change %s", synced,
+                                  self.last_seq)
+        return synced
+
+    def truncate(self, disk):
+        """
+        Deletes every review from the copy.
+        """
+        replica = self.connect()
+        try:
+            for table in review_tables(disk):
+                replica.execute(f"DELETE FROM {table};")
+            replica.commit()
+        finally:
+            replica.close()
+
+    def apply(self, disk, review_ids: List[int]) -> int:
+        """
+        Replaces the rows of `review_ids` in the copy with their current version in the file.
+        """
+        if not review_ids:
+            return 0
+        ids_json = json.dumps(review_ids)
+        # The rows of every table are read from the same snapshot
+        disk.execute("BEGIN;")
+        rows = {table: disk.execute(f"SELECT * FROM {table} WHERE id IN (SELECT value FROM json_each(?));",
+                                    [ids_json]).fetchall() for table in review_tables(disk)}
+        disk.rollback()
+        replica = self.connect()
+        try:
+            for table, table_rows in rows.items():
+                if table_rows:
+                    placeholders = ", ".join("?" * len(table_rows[0]))
+                    replica.executemany(f"INSERT OR REPLACE INTO {table} VALUES ({placeholders});", table_rows)
+                # The reviews deleted since, or moved to another partition
+                replica.execute(f"DELETE FROM {table} WHERE id IN (SELECT value FROM json_each(?)) "
+                                f"AND id NOT IN (SELECT value FROM json_each(?));",
+                                [ids_json, json.dumps([row[0] for row in table_rows])])
+            replica.commit()
+        finally:
+            replica.close()
+        return len(review_ids)
+
+    def close(self):
+        with self.swap_lock:
+            if self.anchor is not None:
+                self.anchor.close()
+            self.anchor = self.uri = None
+
+
+def review_tables(conn) -> List[str]:
+    """
+    Returns the tables holding review rows, keyed by the review id, in the storage layout in use.
+    """
+    if uses_partitions():
+        return list_partitions(conn)
+    if uses_split_layout():
+        return ["reviews", CONTENT_TABLE]
+    return ["reviews"]
+
+
+REPLICA = ReadReplica()
+
+
+def create_read_connection():
+    """
+    Opens a connection for reads: to the in-memory copy when the read replica is loaded, to the file otherwise.
+    """
+    return REPLICA.connect() if REPLICA.active else create_connection()
+
+
+@contextmanager
+def create_snapshot_connection():
+    """
+    Opens a connection for reads whose statements must all see the same data, run by the caller in one `BEGIN`
+    transaction. With the read replica loaded, syncs wait until the block ends, since a transaction doesn't
+    isolate its readers from them.
+    """
+    if not REPLICA.active:
+        conn = create_connection()
+        try:
+            yield conn
+        finally:
+            conn.close()
+        return
+    with REPLICA.sync_lock:
+        conn = REPLICA.connect() if REPLICA.active else create_connection()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+
+def sync_replica():
+    """
+    Brings the read replica up to date after a write of this process. The write is already committed, so a
+    failure is only logged, and the next sync catches up.
+    """
+    if not REPLICA.active:
+        return
+    try:
+        REPLICA.sync()
+    except sqlite3.Error as error:
+        database_logger.warning("Unable to sync the read replica: %s", error)
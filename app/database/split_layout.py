@@ -0,0 +1,156 @@
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app import config
+from app.database.database import REVIEW_COLUMNS, create_connection, create_indexes_sql, create_table_sql
+from app.database.database_logger import database_logger
+from app.database.text_compression import compress_text
+
+"""
+This module implements the "split" storage layout (`config.STORAGE_LAYOUT`). `review_content`, by far the
+widest column, is moved out of `reviews` into the `review_contents` side table, keyed by the review id:
+
+    - `reviews` keeps the narrow, frequently filtered columns, so scans and filtered selects read a fraction
+      of the pages, and more of the table fits in the page cache
+    - selects only join `review_contents` when `review_content` is requested, or all columns are
+    - conditions on `review_content` become `id IN (SELECT id FROM review_contents WHERE ...)`, so every
+      WHERE clause still runs against `reviews`
+    - long texts are stored compressed when `config.CONTENT_COMPRESSION` is on, see `text_compression.py`
+
+A trigger deletes the text of deleted reviews, so deletes only need to target `reviews`. Deleting every
+review bypasses it, see `truncate_split_tables`.
+"""
+
+CONTENT_TABLE = "review_contents"
+CONTENT_COLUMN = "review_content"
+CONTENT_TABLE_SQL = f"""
+CREATE TABLE IF NOT EXISTS {CONTENT_TABLE} (
+            id INTEGER PRIMARY KEY,
+            {CONTENT_COLUMN}
+        );"""
+DELETE_CONTENT_TRIGGER_SQL = f"""
+CREATE TRIGGER IF NOT EXISTS delete_review_content AFTER DELETE ON reviews
+        BEGIN
+            DELETE FROM {CONTENT_TABLE} WHERE id = old.id;
+        END;"""
+
+
+def uses_split_layout() -> bool:
+    return config.STORAGE_LAYOUT == "split"
+
+
+def create_split_layout():
+    """
+    Creates `reviews` without `review_content`, the `review_contents` side table and the trigger keeping
+    them in step.
+    """
+    conn = create_connection()
+    try:
+        conn.execute(create_table_sql("reviews", with_content=False))
+        for create_index_sql in create_indexes_sql("reviews"):
+            conn.execute(create_index_sql)
+        conn.execute(CONTENT_TABLE_SQL)
+        conn.execute(DELETE_CONTENT_TRIGGER_SQL)
+        conn.commit()
+    finally:
+        conn.close()
+    database_logger.info("Created split `reviews` layout, content stored in `%s`", CONTENT_TABLE)
+
+
+def needs_content(columns: Optional[List[str]]) -> bool:
+    """
+    Returns whether a select of `columns`, None meaning all of them, has to join the content table.
+    """
+    return not columns or CONTENT_COLUMN in columns
+
+
+def joined_source() -> str:
+    """
+    Returns the FROM clause source with every review column, the text joined in, aliased as `reviews`.
+    """
+    columns = ", ".join(f"decompress_text({CONTENT_TABLE}.{CONTENT_COLUMN}) AS {CONTENT_COLUMN}"
+                        if column == CONTENT_COLUMN else f"reviews.{column}" for column in REVIEW_COLUMNS)
+    return f"(SELECT {columns} FROM reviews LEFT JOIN {CONTENT_TABLE} ON {CONTENT_TABLE}.id = reviews.id) AS reviews"
+
+
+def content_expression() -> str:
+    return f"decompress_text({CONTENT_COLUMN})"
+
+
+def content_condition(clause: str) -> str:
+    """
+    Wraps a condition on the text, e.g. `decompress_text(review_content) LIKE ?`, into one on `reviews`.
+    """
+    return f"id IN (SELECT id FROM {CONTENT_TABLE} WHERE {clause})"
+
+
+def write_contents(conn, rows: Iterable[Tuple[int, Optional[str]]]):
+    """
+    Stores the text of each `(id, review_content)`. The caller commits.
+    """
+    conn.executemany(f"INSERT OR REPLACE INTO {CONTENT_TABLE} (id, {CONTENT_COLUMN}) VALUES (?, ?)",
+                     ((review_id, compress_text(content)) for review_id, content in rows))
+
+
+def truncate_split_tables(conn) -> int:
+    """
+    Deletes every review and its text. A trigger on `reviews` turns off SQLite's truncate optimization, so the
+    texts are deleted first and the trigger is dropped for the delete of `reviews`, then created again. Both
+    tables are then emptied without visiting their rows. The caller commits, which also keeps the trigger.
+
+    Returns:
+        int: The number of reviews deleted.
+    """
+    conn.execute(f"DELETE FROM {CONTENT_TABLE};")
+    # After a statement that opened the transaction, so the schema change is part of it
+    conn.execute("DROP TRIGGER IF EXISTS delete_review_content;")
+    rows_deleted = conn.execute("DELETE FROM reviews;").rowcount
+    conn.execute(DELETE_CONTENT_TRIGGER_SQL)
+    return rows_deleted
+
+
+def update_split_rows(conn, where_clause: str, where_params: list, assignments: Dict[str, object]) -> int:
+    """
+    Updates the rows matching the WHERE clause, setting the text in `review_contents` and the other columns
+    in `reviews`.
+
+    Args:
+        conn (sqlite3.Connection): The connection, the caller commits.
+        where_clause (str): The WHERE clause, on `reviews`.
+        where_params (list): Its parameters.
+        assignments (Dict[str, object]): The columns to set, with their values converted for storage.
+
+    Returns:
+        int: The number of rows updated.
+    """
+    where_sql = f" WHERE {where_clause}" if where_clause else ""
+    rows_updated = 0
+    if CONTENT_COLUMN in assignments:
+        # Before `reviews`, whose update may change which rows the WHERE clause matches
+        rows_updated = conn.execute(
+            f"UPDATE {CONTENT_TABLE} SET {CONTENT_COLUMN} = ? WHERE id IN (SELECT id FROM reviews{where_sql})",
+            [compress_text(assignments[CONTENT_COLUMN])] + where_params).rowcount
+    other_columns = [column for column in assignments if column != CONTENT_COLUMN]
+    if other_columns:
+        set_clause = ", ".join(f"{column} = ?" for column in other_columns)
+        rows_updated = conn.execute(f"UPDATE reviews SET {set_clause}{where_sql}",
+                                    [assignments[column] for column in other_columns] + where_params).rowcount
+    return rows_updated
+
+
+def update_split_rows_by_id(conn, columns: Sequence[str], rows: List[list]) -> int:
+    """
+    Applies per-review values, each row holding the values of `columns` followed by the review id.
+
+    Returns:
+        int: The number of reviews updated.
+    """
+    content_position = columns.index(CONTENT_COLUMN)
+    rows_updated = conn.executemany(f"UPDATE {CONTENT_TABLE} SET {CONTENT_COLUMN} = ? WHERE id = ?",
+                                    [(compress_text(row[content_position]), row[-1]) for row in rows]).rowcount
+    other_positions = [position for position, column in enumerate(columns) if column != CONTENT_COLUMN]
+    if other_positions:
+        set_clause = ", ".join(f"{columns[position]} = ?" for position in other_positions)
+        rows_updated = conn.executemany(f"UPDATE reviews SET {set_clause} WHERE id = ?",
+                                        [[row[position] for position in other_positions] + [row[-1]]
+                                         for row in rows]).rowcount
+    return rows_updated
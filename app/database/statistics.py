@@ -0,0 +1,61 @@
+from typing import Optional
+
+from app import config
+from app.database.database import create_connection
+from app.database.database_logger import database_logger
+
+"""
+This module maintains and reads the table statistics SQLite keeps in `sqlite_stat1`, which `ANALYZE` fills
+with the number of rows of each table and the average number of rows per distinct value of each index.
+They are used for cheap estimated counts, without reading the table.
+"""
+
+
+def analyze(conn=None):
+    """
+    Refreshes the table statistics. `config.ANALYZE_ROW_LIMIT` caps the rows sampled per index, which keeps
+    this fast on large tables at the cost of approximate figures.
+    """
+    own_connection = conn is None
+    conn = conn or create_connection()
+    try:
+        conn.execute(f"PRAGMA analysis_limit = {int(config.ANALYZE_ROW_LIMIT)};")
+        conn.execute("ANALYZE;")
+        conn.commit()
+        database_logger.info("Refreshed table statistics")
+    finally:
+        if own_connection:
+            conn.close()
+
+
+def has_statistics(conn) -> bool:
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1';").fetchone() \
+        is not None
+
+
+def table_row_estimate(conn, table: str) -> Optional[int]:
+    """
+    Returns the row count of `table` recorded by the last `ANALYZE`, or None when it was never analyzed.
+    """
+    if not has_statistics(conn):
+        return None
+    row = conn.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = ? LIMIT 1;", [table]).fetchone()
+    return int(row[0].split()[0]) if row else None
+
+
+def equality_row_estimate(conn, table: str, column: str) -> Optional[int]:
+    """
+    Returns the average number of rows sharing one value of `column`, from the statistics of an index
+    whose first column is `column`. None when there is no such index or it was never analyzed.
+    """
+    if column == "id":
+        return 1
+    if not has_statistics(conn):
+        return None
+    for index_name, stat in conn.execute("SELECT idx, stat FROM sqlite_stat1 WHERE tbl = ? AND idx IS NOT NULL;",
+                                         [table]).fetchall():
+        first_column = conn.execute(f"PRAGMA index_info('{index_name}');").fetchone()
+        if first_column is not None and first_column[2] == column:
+            figures = stat.split()
+            return int(figures[1]) if len(figures) > 1 else None
+    return None
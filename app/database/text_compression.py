@@ -0,0 +1,35 @@
+import zlib
+
+from app import config
+
+"""
+This module compresses the long review texts stored by the split layout. Values are compressed with zlib only
+when it pays off, and are then stored as a BLOB, so shorter texts stay plain TEXT and both can be told apart
+when reading. SQL reads the texts back through the `decompress_text` function registered on every connection.
+"""
+
+# Shorter texts barely compress, zlib's header and checksum would outweigh the savings
+COMPRESSION_MIN_BYTES = 128
+COMPRESSION_LEVEL = 6
+
+
+def compress_text(text):
+    """
+    Returns `text` as zlib-compressed bytes when compression is enabled and makes it smaller, otherwise unchanged.
+    """
+    if not isinstance(text, str) or not config.CONTENT_COMPRESSION:
+        return text
+    encoded = text.encode("utf-8")
+    if len(encoded) < COMPRESSION_MIN_BYTES:
+        return text
+    compressed = zlib.compress(encoded, COMPRESSION_LEVEL)
+    return compressed if len(compressed) < len(encoded) else text
+
+
+def decompress_text(value):
+    """
+    Returns the text stored by `compress_text`, compressed or not.
+    """
+    if isinstance(value, bytes):
+        return zlib.decompress(value).decode("utf-8")
+    return value
@@ -0,0 +1,84 @@
+import sqlite3
+
+from app import config
+from app.database.database_logger import database_logger
+
+"""
+This module holds the SQLite tuning profiles selected with `config.STORAGE_PROFILE`. A profile sets the journal
+mode, the synchronous level, the page cache size, memory-mapped I/O and where temporary tables live:
+
+    - "default"     - SQLite's own settings, the server still switches the file to WAL
+    - "read_heavy"  - WAL, a large page cache and a large memory map, so selects are served from memory
+    - "write_heavy" - WAL with `synchronous = NORMAL`, which only syncs at checkpoints, and fewer checkpoints
+    - "bulk_load"   - an in-memory rollback journal and no syncing, for offline loads with nothing else
+                      connected. A crash during the load can corrupt the file, so keep a copy to reload from
+
+Only WAL is stored in the database file, every other setting applies to one connection, so the profile is
+applied to each connection as it is opened.
+"""
+
+PROFILES = {
+    "default": {},
+    "read_heavy": {
+        "journal_mode": "wal",
+        "synchronous": "NORMAL",
+        # Negative sizes are in KiB
+        "cache_size": -64 * 1024,
+        "mmap_size": 1024 * 2 ** 20,
+        "temp_store": "MEMORY",
+    },
+    "write_heavy": {
+        "journal_mode": "wal",
+        "synchronous": "NORMAL",
+        "cache_size": -32 * 1024,
+        "mmap_size": 256 * 2 ** 20,
+        "temp_store": "MEMORY",
+        "wal_autocheckpoint": 10000,
+    },
+    "bulk_load": {
+        "journal_mode": "memory",
+        "synchronous": "OFF",
+        "cache_size": -256 * 1024,
+        "mmap_size": 0,
+        "temp_store": "MEMORY",
+    },
+}
+CONNECTION_PRAGMAS = ("synchronous", "cache_size", "mmap_size", "temp_store", "wal_autocheckpoint")
+
+
+def profile_settings(profile: str = None) -> dict:
+    """
+    Returns the settings of `profile`, `config.STORAGE_PROFILE` by default.
+
+    Raises:
+        ValueError: The profile doesn't exist.
+    """
+    profile = profile or config.STORAGE_PROFILE
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown storage profile `{profile}`, expected one of {list(PROFILES)}")
+    return PROFILES[profile]
+
+
+def apply_profile(conn, profile: str = None):
+    """
+    Applies the settings of `profile`, `config.STORAGE_PROFILE` by default, to a newly opened connection.
+    """
+    settings = profile_settings(profile)
+    journal_mode = settings.get("journal_mode")
+    if journal_mode and conn.execute("PRAGMA journal_mode;").fetchone()[0] != journal_mode:
+        try:
+            # Leaving WAL needs the file to itself, it fails while other connections are open
+            conn.execute(f"PRAGMA journal_mode = {journal_mode};")
+        except sqlite3.OperationalError as error:
+            database_logger.warning("Unable to switch the journal mode to %s: %s", journal_mode, error)
+    for pragma in CONNECTION_PRAGMAS:
+        if pragma in settings:
+            conn.execute(f"PRAGMA {pragma} = {settings[pragma]};")
+
+
+def connection_settings(conn) -> dict:
+    """
+    Returns the journal mode and the connection settings in effect on `conn`.
+    """
+    return {pragma: conn.execute(f"PRAGMA {pragma};").fetchone()[0]
+            for pragma in ("journal_mode",) + CONNECTION_PRAGMAS}
@@ -0,0 +1,153 @@
+import json
+import threading
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+from app import config
+from app.crud.update import UPDATABLE_COLUMNS
+from app.crud.utils import build_set_clause, build_where_clause
+from app.database.change_log import log_matching
+from app.database.database import create_connection
+from app.database.database_logger import database_logger
+from app.database.partitions import update_rows, uses_partitions, write_tables
+from app.database.read_replica import sync_replica
+from app.database.split_layout import update_split_rows, uses_split_layout
+from app.jobs.registry import CANCELLED, COMPLETED, FAILED, JOBS, Job
+from app.models.models import ColumnToUpdate, Condition
+from app.monitoring.metrics import observe_query
+
+"""
+This module runs large deletes and updates as background jobs. A job first resolves the ids of the matching
+rows, then deletes or updates them `config.JOB_BATCH_SIZE` ids at a time, committing and pausing between
+batches. Each batch holds the write lock only briefly, so other writers are interleaved instead of waiting
+for one long statement. Progress is recorded on the job in `app.jobs.registry.JOBS`.
+"""
+
+executor = None
+executor_lock = threading.Lock()
+
+
+def job_executor() -> ThreadPoolExecutor:
+    global executor
+    with executor_lock:
+        if executor is None:
+            executor = ThreadPoolExecutor(max_workers=config.JOB_WORKERS, thread_name_prefix="mutation-job")
+    return executor
+
+
+def resolve_ids(conn, where_clause: str, params: list) -> array:
+    """
+    Returns the ids of the rows matching the WHERE clause, in id order, as a compact array.
+    """
+    select_ids = "SELECT id FROM reviews" + (f" WHERE {where_clause}" if where_clause else "") + " ORDER BY id"
+    with observe_query("select", select_ids, params, conn) as query:
+        ids = array("q", (row[0] for row in conn.execute(select_ids, params)))
+        query.rows = len(ids)
+    return ids
+
+
+def run_batches(job: Job, where_clause: str, where_params: list, apply_batch):
+    """
+    Resolves the matching ids and calls `apply_batch(conn, ids_json)` once per batch of ids, where `ids_json`
+    is the batch as a JSON array, for `id IN (SELECT value FROM json_each(?))`. It returns the rows changed.
+    """
+    conn = create_connection()
+    try:
+        ids = resolve_ids(conn, where_clause, where_params)
+        job.start(len(ids))
+        database_logger.info("Job %s: %s %s rows in batches of %s", job.id, job.kind, len(ids),
+                             config.JOB_BATCH_SIZE)
+        for start in range(0, len(ids), config.JOB_BATCH_SIZE):
+            if job.cancel_requested.is_set():
+                job.finish(CANCELLED)
+                database_logger.info("Job %s cancelled after %s rows", job.id, job.processed)
+                return
+            ids_json = json.dumps(ids[start:start + config.JOB_BATCH_SIZE].tolist())
+            with observe_query(job.kind) as query:
+                # Job kinds are the change log's operations
+                log_matching(conn, job.kind, "id IN (SELECT value FROM json_each(?))", [ids_json])
+                query.rows = apply_batch(conn, ids_json)
+                conn.commit()
+            sync_replica()
+            job.advance(query.rows)
+            # Give other writers a chance to take the write lock before the next batch
+            time.sleep(config.JOB_BATCH_PAUSE_MS / 1000)
+        job.finish(COMPLETED)
+        database_logger.info("Job %s completed, %s rows in %s batches", job.id, job.processed, job.batches)
+    except Exception as error:
+        # Nothing waits on the job's future, so every failure has to be recorded on the job itself
+        conn.rollback()
+        job.finish(FAILED, str(error))
+        database_logger.error("Job %s failed after %s rows: %s", job.id, job.processed, error)
+    finally:
+        conn.close()
+
+
+def execute_on_tables(conn, statement: str, params: list) -> int:
+    """
+    Runs `statement`, with `{table}` standing for the table, on `reviews` or on every partition.
+    """
+    return sum(conn.execute(statement.format(table=table), params).rowcount for table in write_tables(conn))
+
+
+def submit_delete_job(conditions: List[Condition]) -> Job:
+    """
+    Starts deleting the reviews matching `conditions` in the background. No conditions deletes every review.
+
+    Args:
+        conditions (List[Condition]): Conditions to identify the reviews to delete.
+
+    Returns:
+        Job: The job, to follow its progress.
+
+    Raises:
+        ValueError: If a condition value can't be compared with its column.
+    """
+    where_clause, where_params = build_where_clause(conditions or [])
+
+    def apply_batch(conn, ids_json: str) -> int:
+        return execute_on_tables(conn, "DELETE FROM {table} WHERE id IN (SELECT value FROM json_each(?))",
+                                 [ids_json])
+
+    job = JOBS.add(Job("delete", {"conditions": conditions or []}))
+    job_executor().submit(run_batches, job, where_clause, where_params, apply_batch)
+    return job
+
+
+def submit_update_job(conditions: List[Condition], columns_to_update: List[ColumnToUpdate]) -> Job:
+    """
+    Starts updating the reviews matching `conditions` in the background.
+
+    Args:
+        conditions (List[Condition]): Conditions to identify the reviews to update.
+        columns_to_update (List[ColumnToUpdate]): The columns to update and their new values.
+
+    Returns:
+        Job: The job, to follow its progress.
+
+    Raises:
+        ValueError: If a column can't be updated or a value can't be stored.
+    """
+    unknown_columns = [column.column_name for column in columns_to_update
+                       if column.column_name not in UPDATABLE_COLUMNS]
+    if not columns_to_update or unknown_columns:
+        raise ValueError(f"Columns can't be updated: {unknown_columns}")
+    where_clause, where_params = build_where_clause(conditions)
+    set_clause, set_params = build_set_clause(columns_to_update)
+
+    assignments = dict(zip((column.column_name for column in columns_to_update), set_params))
+
+    def apply_batch(conn, ids_json: str) -> int:
+        if uses_partitions():
+            # Handles rows moving to another month's partition when `review_date` changes
+            return update_rows(conn, None, "id IN (SELECT value FROM json_each(?))", [ids_json], assignments)
+        if uses_split_layout():
+            return update_split_rows(conn, "id IN (SELECT value FROM json_each(?))", [ids_json], assignments)
+        return execute_on_tables(conn, f"UPDATE {{table}} SET {set_clause} WHERE id IN "
+                                       f"(SELECT value FROM json_each(?))", set_params + [ids_json])
+
+    job = JOBS.add(Job("update", {"conditions": conditions, "columns_to_update": columns_to_update}))
+    job_executor().submit(run_batches, job, where_clause, where_params, apply_batch)
+    return job
@@ -0,0 +1,126 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import List, Optional
+
+from app import config
+
+"""
+This module keeps track of background jobs so their progress can be queried through the API. Jobs live in
+memory of the worker process that runs them, and only the most recent `config.JOB_HISTORY_SIZE` finished
+jobs are kept.
+"""
+
+PENDING = "pending"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATUSES = (COMPLETED, FAILED, CANCELLED)
+
+
+class Job:
+    """
+    The state and progress of one background job.
+
+    Args:
+        kind (str): What the job does, e.g. "delete" or "update".
+        description (dict): The request the job was created from, returned with its progress. It may hold
+            pydantic models, the API encodes them when responding.
+    """
+
+    def __init__(self, kind: str, description: dict = None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.description = description or {}
+        self.status = PENDING
+        self.total = None
+        self.processed = 0
+        self.batches = 0
+        self.error = None
+        # Figures specific to the kind of job, e.g. the rows accepted and rejected by a load
+        self.details = {}
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_requested = threading.Event()
+        self.lock = threading.Lock()
+
+    def start(self, total: Optional[int]):
+        """
+        Marks the job running. It can be called again once the total is known, keeping the first start time.
+        """
+        with self.lock:
+            self.status = RUNNING
+            self.total = total
+            self.started_at = self.started_at or time.time()
+
+    def advance(self, rows: int):
+        with self.lock:
+            self.processed += rows
+            self.batches += 1
+
+    def update_details(self, **details):
+        with self.lock:
+            self.details.update(details)
+
+    def finish(self, status: str, error: str = None):
+        with self.lock:
+            self.status = status
+            self.error = error
+            self.finished_at = time.time()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    def to_dict(self) -> dict:
+        with self.lock:
+            return {
+                "id": self.id,
+                "kind": self.kind,
+                "status": self.status,
+                "request": self.description,
+                "total": self.total,
+                "processed": self.processed,
+                "progress": round(self.processed / self.total, 4) if self.total else None,
+                "batches": self.batches,
+                "details": dict(self.details),
+                "error": self.error,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "elapsed_seconds": round((self.finished_at or time.time()) - self.started_at, 3)
+                if self.started_at else None,
+            }
+
+
+class JobRegistry:
+    """
+    Holds the jobs of this process, newest last, dropping the oldest finished jobs beyond `capacity`.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+
+    def add(self, job: Job) -> Job:
+        with self.lock:
+            self.jobs[job.id] = job
+            finished_ids = [job_id for job_id, existing in self.jobs.items() if existing.finished]
+            for job_id in finished_ids[:max(0, len(finished_ids) - self.capacity)]:
+                del self.jobs[job_id]
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def list(self) -> List[Job]:
+        with self.lock:
+            return list(reversed(self.jobs.values()))
+
+
+JOBS = JobRegistry(config.JOB_HISTORY_SIZE)
@@ -0,0 +1,89 @@
+import importlib.util
+import os
+import time
+
+from app import config
+from app.database.change_log import prune_change_log
+from app.database.database import create_connection
+from app.database.read_replica import sync_replica
+from app.database.statistics import analyze
+from app.data_loader.data_loader_logger import data_loader_logger
+from app.jobs.mutations import job_executor
+from app.jobs.registry import CANCELLED, COMPLETED, FAILED, JOBS, Job
+
+"""
+This module loads uploaded review files in the background, through the same pandas pipeline as the
+`load_data` CLI: the whole file is validated and cleaned with vectorized operations, then written in chunks
+of `config.UPLOAD_CHUNK_ROWS` rows, committing and pausing between chunks so API writers are interleaved.
+The job reports the rows read, accepted and rejected by the cleaning, and written so far.
+"""
+
+UPLOAD_FORMATS = ("csv", "parquet")
+PARQUET_ENGINES = ("pyarrow", "fastparquet")
+
+
+def parquet_supported() -> bool:
+    return any(importlib.util.find_spec(engine) is not None for engine in PARQUET_ENGINES)
+
+
+def submit_upload_job(path: str, file_format: str, size: int) -> Job:
+    """
+    Starts loading the uploaded file at `path` in the background. The file is deleted once the job ends.
+
+    Args:
+        path (str): The uploaded file.
+        file_format (str): "csv" or "parquet".
+        size (int): The size of the upload in bytes.
+
+    Returns:
+        Job: The job, to follow its progress.
+    """
+    job = JOBS.add(Job("load", {"format": file_format, "bytes": size}))
+    job_executor().submit(run_upload, job, path, file_format)
+    return job
+
+
+def run_upload(job: Job, path: str, file_format: str):
+    # Imported here, so the API starts without waiting for pandas to import
+    from app.data_loader.data_cleaning_and_transformation import (clean_and_transform_data,
+                                                                  convert_dates_for_storage, read_csv,
+                                                                  read_parquet,
+                                                                  validate_input_datastructure_and_types)
+    from app.data_loader.load_data import load_reviews
+
+    conn = None
+    try:
+        job.start(None)
+        df = read_parquet(path) if file_format == "parquet" else read_csv(path)
+        rows_read = len(df)
+        df = convert_dates_for_storage(clean_and_transform_data(validate_input_datastructure_and_types(df)))
+        job.start(len(df))
+        job.update_details(rows_read=rows_read, rows_accepted=len(df), rows_rejected=rows_read - len(df))
+        data_loader_logger.info("Job %s: loading %s of %s uploaded rows", job.id, len(df), rows_read)
+
+        conn = create_connection()
+        for start in range(0, len(df), config.UPLOAD_CHUNK_ROWS):
+            if job.cancel_requested.is_set():
+                job.finish(CANCELLED)
+                data_loader_logger.info("Job %s cancelled after %s rows", job.id, job.processed)
+                return
+            written = load_reviews(df.iloc[start:start + config.UPLOAD_CHUNK_ROWS], conn)
+            conn.commit()
+            sync_replica()
+            job.advance(written)
+            time.sleep(config.JOB_BATCH_PAUSE_MS / 1000)
+        prune_change_log(conn)
+        conn.commit()
+        analyze(conn)
+        job.finish(COMPLETED)
+        data_loader_logger.info("Job %s completed, %s rows loaded", job.id, job.processed)
+    except Exception as error:
+        # Nothing waits on the job's future, so every failure has to be recorded on the job itself
+        if conn is not None:
+            conn.rollback()
+        job.finish(FAILED, str(error))
+        data_loader_logger.error("Job %s failed after %s rows: %s", job.id, job.processed, error)
+    finally:
+        if conn is not None:
+            conn.close()
+        os.remove(path)
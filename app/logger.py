@@ -1,19 +1,224 @@
+import atexit
+import json
 import logging
 import os
+import queue
+import random
+import threading
+from logging.handlers import QueueHandler, QueueListener
 
-file_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-                                   '%Y-%m-%d %H:%M:%S')
+from app import config
 
+"""
+This module configures logging for the application.
 
-def setup_logging():
-    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    logs_dir = os.path.join(base_dir, 'logs')
+Each component logger (`api`, `database`, `data_loader`) writes to its own file under `logs/`. By default the
+component loggers only put records on a bounded in-memory queue, and a single background thread formats and
+writes them. Call sites should use lazy %-style arguments (`logger.info("Loaded %s rows", n)`) so the message
+is only built on the writer thread, and not at all when the record is filtered out or sampled away.
+"""
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+LOG_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+file_formatter = logging.Formatter(LOG_FORMAT, LOG_DATE_FORMAT)
 
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+logs_dir = os.path.join(base_dir, 'logs')
+
+
+def setup_logging():
     # Create logs directory if it doesn't exist
     if not os.path.exists(logs_dir):
         os.makedirs(logs_dir)
 
     # Set up basic configuration for logging
     logging.basicConfig(level=logging.INFO,
-                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-                        datefmt='%Y-%m-%d %H:%M:%S')
+                        format=LOG_FORMAT,
+                        datefmt=LOG_DATE_FORMAT)
+
+
+def truncate_message(message: str, max_chars: int) -> str:
+    """
+    Caps a log message at `max_chars` characters, noting how much was cut.
+    """
+    if max_chars <= 0 or len(message) <= max_chars:
+        return message
+    return f"{message[:max_chars]}... [truncated {len(message) - max_chars} chars]"
+
+
+class TruncatingFormatter(logging.Formatter):
+    """
+    A text formatter that caps the size of the rendered message.
+    """
+
+    def __init__(self, fmt=LOG_FORMAT, datefmt=LOG_DATE_FORMAT, max_message_chars=None):
+        super().__init__(fmt, datefmt)
+        self.max_message_chars = max_message_chars
+
+    def format(self, record: logging.LogRecord) -> str:
+        max_chars = self.max_message_chars if self.max_message_chars is not None else config.LOG_MAX_MESSAGE_CHARS
+        message = record.getMessage()
+        truncated = truncate_message(message, max_chars)
+        if truncated is not message:
+            # Format a copy so other handlers still see the full record
+            record = logging.makeLogRecord({**record.__dict__, "msg": truncated, "args": None})
+        return super().format(record)
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """
+    Formats each record as a single JSON object, for structured log processing.
+    """
+
+    def __init__(self, datefmt=LOG_DATE_FORMAT, max_message_chars=None):
+        super().__init__(datefmt=datefmt)
+        self.max_message_chars = max_message_chars
+
+    def format(self, record: logging.LogRecord) -> str:
+        max_chars = self.max_message_chars if self.max_message_chars is not None else config.LOG_MAX_MESSAGE_CHARS
+        entry = {
+            "time": self.formatTime(record, self.datefmt),
+            "logger": record.name,
+            "level": record.levelname,
+            "message": truncate_message(record.getMessage(), max_chars),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+def build_formatter() -> logging.Formatter:
+    if config.LOG_FORMAT == "json":
+        return JsonLinesFormatter()
+    return TruncatingFormatter()
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps only a fraction of DEBUG and INFO records. WARNING and above always pass.
+
+    Args:
+        sample_rate (float): Fraction of records to keep, between 0 and 1.
+    """
+
+    def __init__(self, sample_rate: float):
+        super().__init__()
+        self.sample_rate = sample_rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or self.sample_rate >= 1:
+            return True
+        return random.random() < self.sample_rate
+
+
+class LazyQueueHandler(QueueHandler):
+    """
+    Puts records on the logging queue without formatting them and never blocks the caller.
+
+    The standard `QueueHandler` renders the message on the calling thread. Here the record is passed as-is
+    and rendered by the writer thread, so arguments should not be mutated after they are logged.
+    Records are dropped when the queue is full.
+    """
+
+    dropped_records = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LazyQueueHandler.dropped_records += 1
+
+
+class LoggerDispatcher(logging.Handler):
+    """
+    Runs on the writer thread and hands each record to the handlers registered for its logger.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.handlers_by_logger = {}
+
+    def add_handler(self, logger_name: str, handler: logging.Handler):
+        self.handlers_by_logger.setdefault(logger_name, []).append(handler)
+
+    def emit(self, record: logging.LogRecord):
+        for handler in self.handlers_by_logger.get(record.name, ()):
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+
+log_queue = queue.Queue(maxsize=config.LOG_QUEUE_SIZE)
+dispatcher = LoggerDispatcher()
+listener = None
+listener_lock = threading.Lock()
+
+
+def start_listener():
+    """
+    Starts the background writer thread, once per process.
+    """
+    global listener
+    with listener_lock:
+        if listener is None:
+            listener = QueueListener(log_queue, dispatcher)
+            listener.start()
+            atexit.register(stop_listener)
+
+
+def stop_listener():
+    """
+    Flushes all queued records and stops the background writer thread.
+    """
+    global listener
+    with listener_lock:
+        if listener is not None:
+            listener.stop()
+            listener = None
+
+
+def create_logger(name: str, log_file_name: str, level: int) -> logging.Logger:
+    """
+    Creates a component logger writing to `logs/<log_file_name>` and, optionally, the console.
+
+    Args:
+        name (str): The logger name.
+        log_file_name (str): The file name of the log under the `logs/` directory.
+        level (int): The minimum level of records to keep.
+
+    Returns:
+        logging.Logger: The configured logger.
+    """
+    setup_logging()
+
+    logger = logging.getLogger(name)
+    logger.setLevel(level)
+    if logger.handlers:
+        return logger
+
+    formatter = build_formatter()
+    output_handlers = [logging.FileHandler(os.path.join(logs_dir, log_file_name), encoding="utf-8")]
+    if config.LOG_TO_CONSOLE:
+        output_handlers.append(logging.StreamHandler())
+    for handler in output_handlers:
+        handler.setFormatter(formatter)
+
+    if config.LOG_ASYNC:
+        for handler in output_handlers:
+            dispatcher.add_handler(name, handler)
+        front_handler = LazyQueueHandler(log_queue)
+        start_listener()
+        handlers = [front_handler]
+    else:
+        handlers = output_handlers
+
+    for handler in handlers:
+        if config.LOG_SAMPLE_RATE < 1:
+            handler.addFilter(SamplingFilter(config.LOG_SAMPLE_RATE))
+        logger.addHandler(handler)
+    # Console output is handled above, so records don't also go through the root logger synchronously
+    logger.propagate = False
+    return logger
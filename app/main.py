@@ -1,5 +1,4 @@
 from app.database.database import create_table
-from app.data_loader.load_data import load_data
 import uvicorn
 
 
@@ -7,8 +6,9 @@ def initialize_and_load_data(csv_file_path=None):
     # Initialize the database
     create_table()
 
-    # Optionally, load data
+    # Optionally, load data. The loader pulls in pandas, so it is only imported when needed
     if csv_file_path:
+        from app.data_loader.load_data import load_data
         load_data("reviews", csv_file_path)
 
 
@@ -1,8 +1,9 @@
 from typing import List, Optional, Union
-from pydantic import BaseModel, Field, EmailStr, validator
-from country_converter import convert
+from pydantic import BaseModel, ConfigDict, Field, EmailStr, model_validator, validator
 from datetime import date
 
+from app.countries.lookup import convert_country
+
 """
 This module defines models representing various data structures used for user input validation in the API.
 It includes models for a review, conditions for querying data, columns for updates, and overall query input.
@@ -46,7 +47,7 @@ class Review(BaseModel):
         Raises:
             ValueError: If the country name is not found in the conversion list.
         """
-        standardized_country = convert(names=v, to='short_name')
+        standardized_country = convert_country(v, to='short_name')
         if standardized_country == 'not found':
             raise ValueError(f'Invalid country: {v}')
         return standardized_country
@@ -68,26 +69,67 @@ class Review(BaseModel):
         """
         country = values.get('country', None)
         if country:
-            iso3_code = convert(names=country, to='ISO3')
+            iso3_code = convert_country(country, to='ISO3')
             if iso3_code == 'not found':
                 raise ValueError(f'Invalid country for code: {country}')
             return iso3_code
         return v
 
+# The operators a condition on a column may set
+OPERATORS = ("equals", "contains", "range", "in_", "gt", "gte", "lt", "lte")
+
+
 class Condition(BaseModel):
     """
-    Represents a condition used in querying the database.
+    Represents a condition used in querying the database. The operators set on a condition must all hold,
+    except that `range` overrides `contains`, which overrides `equals`.
 
     Attributes:
-        column (str): The column on which the condition is applied.
+        column (Optional[str]): The column on which the condition is applied, only left out by an `or` group.
         equals (Optional[str]): The exact value the column should match.
         contains (Optional[str]): A substring the column should contain.
         range (Optional[List[str]]): A range (start and end) of values for the column.
+        in_ (Optional[List[Union[str, int]]]): Values the column should match one of, sent as `in`.
+        gt, gte, lt, lte (Optional[Union[str, int]]): Bounds the column should be greater than (or equal to)
+            or less than (or equal to).
+        or_ (Optional[List[List[Condition]]]): Groups of conditions, sent as `or`, at least one of which must
+            hold. The conditions of a group must all hold.
     """
-    column: str
+    model_config = ConfigDict(populate_by_name=True)
+
+    column: Optional[str] = None
     equals: Optional[str] = None
     contains: Optional[str] = None
     range: Optional[List[str]] = None
+    in_: Optional[List[Union[str, int]]] = Field(None, alias="in")
+    gt: Optional[Union[str, int]] = None
+    gte: Optional[Union[str, int]] = None
+    lt: Optional[Union[str, int]] = None
+    lte: Optional[Union[str, int]] = None
+    or_: Optional[List[List["Condition"]]] = Field(None, alias="or")
+
+    @model_validator(mode="after")
+    def check_column(self):
+        """
+        Requires a column and an operator, unless the condition is only an `or` group, which needs at least one
+        group of at least one condition. A condition without an operator, an empty group or an empty list would
+        otherwise match every row, or none.
+        """
+        if self.or_ is not None:
+            if self.column is not None:
+                raise ValueError("an `or` group takes no column, put the column in the conditions of its groups")
+            if not self.or_ or not all(self.or_):
+                raise ValueError("an `or` needs at least one group, and each group at least one condition")
+            return self
+        if self.column is None:
+            raise ValueError("column is required")
+        if all(getattr(self, operator) is None for operator in OPERATORS):
+            raise ValueError(f"a condition needs an operator, one of {', '.join(OPERATORS)}")
+        if self.in_ is not None and not self.in_:
+            raise ValueError("`in` needs at least one value")
+        if self.range is not None and len(self.range) != 2:
+            raise ValueError("`range` needs a start and an end")
+        return self
 
 class ColumnToUpdate(BaseModel):
     """
@@ -100,6 +142,17 @@ class ColumnToUpdate(BaseModel):
     column_name: str
     column_value: Union[str, int, EmailStr, date]
 
+class ReviewUpdate(BaseModel):
+    """
+    Represents the changes to apply to a single review in a batch update.
+
+    Attributes:
+        id (int): The id of the review to update.
+        changes (List[ColumnToUpdate]): The columns to update on that review and their new values.
+    """
+    id: int
+    changes: List[ColumnToUpdate]
+
 class QueryInput(BaseModel):
     """
     Represents an input structure for database queries.
@@ -108,12 +161,14 @@ class QueryInput(BaseModel):
         table (str): The name of the table to query.
         columns (Optional[List[str]]): A list of columns to retrieve.
         conditions (List[Condition]): Conditions to filter the query results.
-        limit (Optional[int]): The maximum number of results to return.
+        limit (Optional[int]): The maximum number of results to return, the API caps it.
+        offset (Optional[int]): The number of matching rows to skip, to page through the results.
     """
     table: str
     columns: Optional[List[str]] = None
     conditions: List[Condition] = []
     limit: Optional[int] = Field(None, ge=1)  # Must be greater than or equal to 1
+    offset: Optional[int] = Field(None, ge=0)
 
 
 
@@ -127,5 +182,5 @@ if __name__ == "__main__":
         country="USA",
         review_date=date(2023, 3, 3)
     )
-    Condition(column="hello")
+    Condition(column="hello", equals="world")
     breakpoint()
@@ -0,0 +1,260 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+
+from app.monitoring.slow_queries import is_slow, record_slow_query
+
+"""
+This module provides a small in-process metrics registry and renders it in the Prometheus text exposition
+format for the `/metrics` endpoint. Counters, gauges and histograms are labelled and thread safe, so they can
+be updated from the threadpool workers running the CRUD functions.
+"""
+
+DEFAULT_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ROW_COUNT_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000, 1000000)
+
+
+def format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def format_labels(label_names: Tuple[str, ...], label_values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{escape_label_value(value)}"' for name, value in zip(label_names, label_values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def escape_label_value(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Metric:
+    """
+    Base class for a named metric with a fixed set of label names.
+    """
+    metric_type = "untyped"
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.lock = threading.Lock()
+        self.children: Dict[Tuple[str, ...], object] = {}
+
+    def labels(self, *label_values):
+        if len(label_values) != len(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}, got {label_values}")
+        key = tuple(str(value) for value in label_values)
+        with self.lock:
+            child = self.children.get(key)
+            if child is None:
+                child = self.children[key] = self.new_child()
+            return child
+
+    def new_child(self):
+        raise NotImplementedError
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class ValueChild:
+    def __init__(self):
+        self.value = 0.0
+        self.lock = threading.Lock()
+
+    def inc(self, amount: float = 1):
+        with self.lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1):
+        with self.lock:
+            self.value -= amount
+
+    def set(self, value: float):
+        with self.lock:
+            self.value = value
+
+
+class Counter(Metric):
+    metric_type = "counter"
+
+    def new_child(self):
+        return ValueChild()
+
+    def samples(self) -> List[str]:
+        with self.lock:
+            children = list(self.children.items())
+        return [f"{self.name}{format_labels(self.label_names, key)} {format_value(child.value)}"
+                for key, child in children]
+
+
+class Gauge(Counter):
+    metric_type = "gauge"
+
+
+class HistogramChild:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self.lock:
+            self.count += 1
+            self.sum += value
+            for i, upper_bound in enumerate(self.buckets):
+                if value <= upper_bound:
+                    self.bucket_counts[i] += 1
+                    break
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+
+class Histogram(Metric):
+    metric_type = "histogram"
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_LATENCY_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def new_child(self):
+        return HistogramChild(self.buckets)
+
+    def samples(self) -> List[str]:
+        lines = []
+        with self.lock:
+            children = list(self.children.items())
+        for key, child in children:
+            with child.lock:
+                bucket_counts, count, total = list(child.bucket_counts), child.count, child.sum
+            cumulative = 0
+            for upper_bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                labels = format_labels(self.label_names, key, f'le="{format_value(upper_bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(self.label_names, key)} {format_value(total)}")
+            lines.append(f"{self.name}_count{format_labels(self.label_names, key)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self.metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_DURATION = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template and status code.",
+    ("method", "route", "status")))
+DB_QUERY_DURATION = REGISTRY.register(Histogram(
+    "db_query_duration_seconds", "SQL execution time, including fetching the results, by operation.",
+    ("operation",)))
+DB_QUERY_ROWS = REGISTRY.register(Histogram(
+    "db_query_rows", "Rows returned or affected per SQL operation.", ("operation",), buckets=ROW_COUNT_BUCKETS))
+DB_CONNECTION_WAIT = REGISTRY.register(Histogram(
+    "db_connection_wait_seconds", "Time spent acquiring a database connection."))
+DB_ERRORS = REGISTRY.register(Counter(
+    "db_errors_total", "SQLite errors by operation and error message.", ("operation", "error")))
+THREADPOOL_TASKS_RUNNING = REGISTRY.register(Gauge(
+    "threadpool_tasks_running", "Tasks currently running in the worker threadpool."))
+THREADPOOL_TASKS_WAITING = REGISTRY.register(Gauge(
+    "threadpool_tasks_waiting", "Tasks queued for a free worker thread."))
+ADMISSION_LIMIT = REGISTRY.register(Gauge(
+    "admission_limit", "Configured concurrent requests and queue size per admission pool.", ("pool", "setting")))
+ADMISSION_IN_FLIGHT = REGISTRY.register(Gauge(
+    "admission_in_flight", "Requests admitted and running per admission pool.", ("pool",)))
+ADMISSION_QUEUED = REGISTRY.register(Gauge(
+    "admission_queued", "Requests waiting to be admitted per admission pool.", ("pool",)))
+ADMISSION_QUEUE_WAIT = REGISTRY.register(Histogram(
+    "admission_queue_wait_seconds", "Time requests waited to be admitted, or until they timed out.", ("pool",)))
+ADMISSION_REJECTED = REGISTRY.register(Counter(
+    "admission_rejected_total", "Requests shed by admission control, by pool, endpoint and reason.",
+    ("pool", "endpoint", "reason")))
+READ_REPLICA_SYNCS = REGISTRY.register(Counter(
+    "read_replica_syncs_total", "Read replica syncs, by kind: incremental or a full reload.", ("kind",)))
+READ_REPLICA_SEQ = REGISTRY.register(Gauge(
+    "read_replica_seq", "The last change log entry applied to the read replica."))
+MAINTENANCE_RUNS = REGISTRY.register(Counter(
+    "maintenance_runs_total", "Database maintenance tasks run, by task and status.", ("task", "status")))
+MAINTENANCE_DURATION = REGISTRY.register(Histogram(
+    "maintenance_duration_seconds", "Time spent on each database maintenance task.", ("task",)))
+
+
+class QueryObservation:
+    """
+    Collects the details of one SQL operation inside `observe_query`.
+    """
+
+    def __init__(self, operation: str):
+        self.operation = operation
+        self.rows = None
+
+
+def error_label(error: Exception) -> str:
+    # Keep the label set small, e.g. "database is locked" or "no such column"
+    message = str(error).split(":")[0].strip()
+    return message[:60] or type(error).__name__
+
+
+@contextmanager
+def observe_query(operation: str, sql: str = None, params=None, connection=None):
+    """
+    Times an SQL operation and records its rows returned or affected, set via `observation.rows`.
+    When the statement is given and runs longer than the slow-query threshold it is added to the
+    slow-query log, with its query plan captured on `connection`.
+
+    Args:
+        operation (str): The kind of operation, e.g. "select" or "update".
+        sql (Optional[str]): The statement being executed.
+        params: The parameters bound to the statement.
+        connection (Optional[sqlite3.Connection]): The connection executing the statement.
+
+    Yields:
+        QueryObservation: The observation to record the row count on.
+    """
+    observation = QueryObservation(operation)
+    start = time.perf_counter()
+    failed = False
+    try:
+        yield observation
+    except Exception as error:
+        failed = True
+        DB_ERRORS.labels(operation, error_label(error)).inc()
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        DB_QUERY_DURATION.labels(operation).observe(duration)
+        if observation.rows is not None:
+            DB_QUERY_ROWS.labels(operation).observe(observation.rows)
+        if sql is not None and not failed and is_slow(duration):
+            record_slow_query(operation, sql, params, duration, observation.rows, connection)
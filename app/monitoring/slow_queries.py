@@ -0,0 +1,117 @@
+import re
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from typing import List
+
+from app import config
+from app.database.database_logger import database_logger
+
+"""
+This module keeps a bounded, in-memory log of slow SQL statements together with their `EXPLAIN QUERY PLAN`
+output, so full table scans and missing indexes can be spotted from real traffic.
+"""
+
+
+def normalize_sql(sql: str) -> str:
+    """
+    Collapses whitespace and replaces inline literals with `?` so similar statements look the same.
+    """
+    normalized = re.sub(r"'(?:[^']|'')*'", "?", sql)
+    normalized = re.sub(r"\b\d+(?:\.\d+)?\b", "?", normalized)
+    return re.sub(r"\s+", " ", normalized).strip()
+
+
+def parameter_shape(params) -> List[str]:
+    """
+    Describes the bound parameters by type only, so no user data is kept in the log.
+    """
+    return [type(param).__name__ for param in params or []]
+
+
+def explain_query_plan(connection, sql: str, params) -> List[str]:
+    """
+    Runs `EXPLAIN QUERY PLAN` for a statement on the connection that executed it.
+
+    Returns:
+        List[str]: One line per plan step, indented by its depth in the plan tree.
+    """
+    rows = connection.execute(f"EXPLAIN QUERY PLAN {sql}", params or []).fetchall()
+    depths = {0: -1}
+    lines = []
+    for step_id, parent_id, _, detail in rows:
+        depths[step_id] = depths.get(parent_id, -1) + 1
+        lines.append("  " * depths[step_id] + detail)
+    return lines
+
+
+def uses_full_scan(query_plan: List[str]) -> bool:
+    # "SCAN reviews" walks the whole table, "SCAN reviews USING COVERING INDEX ..." only an index
+    return any(line.strip().startswith("SCAN") and "USING" not in line for line in query_plan)
+
+
+class SlowQueryLog:
+    """
+    A thread safe ring buffer of slow query records, the oldest records are discarded first.
+
+    Args:
+        capacity (int): The maximum number of records kept.
+    """
+
+    def __init__(self, capacity: int):
+        self.records = deque(maxlen=capacity)
+        self.lock = threading.Lock()
+
+    def add(self, record: dict):
+        with self.lock:
+            self.records.append(record)
+
+    def entries(self) -> List[dict]:
+        # Newest first
+        with self.lock:
+            return list(reversed(self.records))
+
+    def clear(self):
+        with self.lock:
+            self.records.clear()
+
+
+SLOW_QUERY_LOG = SlowQueryLog(config.SLOW_QUERY_LOG_SIZE)
+
+
+def is_slow(duration_seconds: float) -> bool:
+    threshold_ms = config.SLOW_QUERY_THRESHOLD_MS
+    return threshold_ms >= 0 and duration_seconds * 1000 >= threshold_ms
+
+
+def record_slow_query(operation: str, sql: str, params, duration_seconds: float, rows, connection=None):
+    """
+    Adds a slow statement to the slow-query log, capturing its query plan when the connection is available.
+
+    Args:
+        operation (str): The kind of operation, e.g. "select" or "update".
+        sql (str): The statement as executed.
+        params: The parameters bound to the statement.
+        duration_seconds (float): The execution time.
+        rows (Optional[int]): Rows returned or affected.
+        connection (Optional[sqlite3.Connection]): The connection that ran the statement.
+    """
+    query_plan = []
+    if connection is not None:
+        try:
+            query_plan = explain_query_plan(connection, sql, params)
+        except Exception as error:
+            database_logger.warning("Unable to capture query plan for slow query: %s", error)
+
+    record = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "operation": operation,
+        "duration_ms": round(duration_seconds * 1000, 3),
+        "rows": rows,
+        "sql": normalize_sql(sql),
+        "parameter_shape": parameter_shape(params),
+        "query_plan": query_plan,
+        "full_scan": uses_full_scan(query_plan),
+    }
+    SLOW_QUERY_LOG.add(record)
+    database_logger.warning("Slow %s query took %.1f ms: %s", operation, record["duration_ms"], record["sql"])
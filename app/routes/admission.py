@@ -0,0 +1,125 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+
+from app import config
+from app.monitoring.metrics import (ADMISSION_IN_FLIGHT, ADMISSION_LIMIT, ADMISSION_QUEUE_WAIT, ADMISSION_QUEUED,
+                                    ADMISSION_REJECTED)
+from app.routes.routes_logger import api_logger
+
+"""
+This module sheds load before it reaches the threadpool. Each endpoint runs its database work through an
+admission pool, "read" or "write", which lets a fixed number of requests run at once and queues a bounded
+number of others. A request that finds the queue full, or that waits longer than the queue timeout, is
+rejected straight away with `Retry-After`, instead of waiting behind every other request in the threadpool.
+The pools are per worker process and live on the event loop, so they need no locking.
+"""
+
+
+class AdmissionPool:
+    """
+    Admits requests of one kind, first come first served, up to the `ADMISSION_<POOL>_*` settings.
+
+    Args:
+        name (str): The pool, "read" or "write".
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.active = 0
+        self.waiters = deque()
+
+    def setting(self, suffix: str):
+        return getattr(config, f"ADMISSION_{self.name.upper()}_{suffix}")
+
+    @asynccontextmanager
+    async def admit(self, endpoint: str):
+        """
+        Holds a slot of the pool for the duration of the block.
+
+        Raises:
+            HTTPException: 429 when the queue is full, 503 when no slot freed up within the queue timeout.
+        """
+        if not config.ADMISSION_CONTROL:
+            yield
+            return
+        start = time.perf_counter()
+        await self.acquire(endpoint)
+        ADMISSION_QUEUE_WAIT.labels(self.name).observe(time.perf_counter() - start)
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def acquire(self, endpoint: str):
+        if self.active < self.setting("LIMIT") and not self.waiters:
+            self.active += 1
+            self.record()
+            return
+        if len(self.waiters) >= self.setting("QUEUE"):
+            self.reject(endpoint, "queue_full", 429)
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        self.record()
+        try:
+            # A released slot is handed straight to the waiter, see `release`
+            await asyncio.wait_for(waiter, self.setting("QUEUE_TIMEOUT_MS") / 1000)
+        except asyncio.TimeoutError:
+            self.remove_waiter(waiter)
+            ADMISSION_QUEUE_WAIT.labels(self.name).observe(self.setting("QUEUE_TIMEOUT_MS") / 1000)
+            self.reject(endpoint, "queue_timeout", 503)
+        except asyncio.CancelledError:
+            # The client went away, give back the slot if it was handed over in the meantime
+            self.remove_waiter(waiter)
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+
+    def release(self):
+        while self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                self.record()
+                return
+        self.active -= 1
+        self.record()
+
+    def remove_waiter(self, waiter):
+        if waiter in self.waiters:
+            self.waiters.remove(waiter)
+        self.record()
+
+    def reject(self, endpoint: str, reason: str, status_code: int):
+        ADMISSION_REJECTED.labels(self.name, endpoint, reason).inc()
+        api_logger.warning("Shed %s request to %s: %s (%s running, %s queued)", self.name, endpoint, reason,
+                           self.active, len(self.waiters))
+        raise HTTPException(status_code=status_code, detail=f"The server is busy ({reason}), retry later.",
+                            headers={"Retry-After": str(config.ADMISSION_RETRY_AFTER)})
+
+    def record(self):
+        ADMISSION_IN_FLIGHT.labels(self.name).set(self.active)
+        ADMISSION_QUEUED.labels(self.name).set(len(self.waiters))
+
+
+READS = AdmissionPool("read")
+WRITES = AdmissionPool("write")
+
+
+async def run_admitted(pool: AdmissionPool, endpoint: str, func, *args):
+    """
+    Runs `func(*args)` in the threadpool once `pool` admits the request.
+    """
+    async with pool.admit(endpoint):
+        return await run_in_threadpool(func, *args)
+
+
+def record_limits():
+    for pool in (READS, WRITES):
+        ADMISSION_LIMIT.labels(pool.name, "limit").set(pool.setting("LIMIT"))
+        ADMISSION_LIMIT.labels(pool.name, "queue").set(pool.setting("QUEUE"))
+        ADMISSION_LIMIT.labels(pool.name, "queue_timeout_ms").set(pool.setting("QUEUE_TIMEOUT_MS"))
@@ -1,22 +1,137 @@
-from fastapi import FastAPI, HTTPException, status, Body
+from fastapi import FastAPI, HTTPException, Request, status, Body, Header, Query
+from fastapi.encoders import jsonable_encoder
 from starlette.concurrency import run_in_threadpool  # Allows synchronous code to run async by using threads
-from fastapi.responses import JSONResponse
-from typing import List
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from anyio.to_thread import current_default_thread_limiter
+from contextlib import asynccontextmanager
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+import anyio
+from typing import List, Literal, Optional
 
 from app.crud.create import insert_reviews
-from app.crud.read import run_select_query
-from app.crud.update import update_review
+from app.crud.read import (RowLimitExceeded, apply_row_cap, read_changes, read_select_version, run_select_batch,
+                           run_select_query, run_select_query_with_total)
+from app.crud.update import update_review, update_reviews_batch
 from app.crud.delete import delete_reviews
+from app.database.database import DatabaseBusyError, QueryTimeoutError
+from app.database.maintenance import maintenance_status, run_due_tasks
+from app.database.read_replica import REPLICA
+from app.jobs.mutations import submit_delete_job, submit_update_job
+from app.jobs.registry import JOBS
+from app.jobs.uploads import UPLOAD_FORMATS, parquet_supported, submit_upload_job
 
+from app import config
+from app.monitoring.metrics import REGISTRY, THREADPOOL_TASKS_RUNNING, THREADPOOL_TASKS_WAITING
+from app.monitoring.slow_queries import SLOW_QUERY_LOG
+from app.routes.admission import READS, WRITES, record_limits, run_admitted
+from app.routes.maintenance import run_maintenance_loop, run_replica_sync_loop
+from app.routes.middleware import MetricsMiddleware
 from app.routes.routes_logger import api_logger
-from app.models.models import QueryInput, Review, Condition, ColumnToUpdate
+from app.models.models import QueryInput, Review, Condition, ColumnToUpdate, ReviewUpdate
+from app.warm_up import warm_up
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Uvicorn only starts serving once startup completes, so each worker is warm before its first request
+    if config.WARM_UP_ON_STARTUP:
+        await run_in_threadpool(warm_up)
+    background = []
+    if config.READ_REPLICA and not config.CHANGE_LOG:
+        api_logger.warning("READ_REPLICA needs CHANGE_LOG to stay current, serving reads from the database file")
+    elif config.READ_REPLICA:
+        await run_in_threadpool(REPLICA.load)
+        background.append(asyncio.create_task(run_replica_sync_loop()))
+    if config.MAINTENANCE:
+        background.append(asyncio.create_task(run_maintenance_loop()))
+    yield
+    for task in background:
+        task.cancel()
+    REPLICA.close()
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
+
+
+@app.exception_handler(DatabaseBusyError)
+async def database_busy(request: Request, error: DatabaseBusyError):
+    # Another connection held the lock for longer than SQLite waits, the request can be retried
+    api_logger.warning("Database busy for %s %s: %s", request.method, request.url.path, error)
+    return JSONResponse(content={"detail": "The database is busy, retry later."},
+                        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                        headers={"Retry-After": str(config.ADMISSION_RETRY_AFTER)})
+
+
+@app.exception_handler(RowLimitExceeded)
+async def row_limit_exceeded(request: Request, error: RowLimitExceeded):
+    return JSONResponse(content={"detail": str(error), "max_limit": config.SELECT_MAX_LIMIT},
+                        status_code=status.HTTP_400_BAD_REQUEST)
 
 
-app = FastAPI()
+@app.exception_handler(QueryTimeoutError)
+async def query_timeout(request: Request, error: QueryTimeoutError):
+    # Retrying the same query would time out again, the caller has to ask for less
+    api_logger.warning("Query interrupted for %s %s: %s", request.method, request.url.path, error)
+    return JSONResponse(content={"detail": f"{error}, narrow the conditions or page through the results with a "
+                                           f"smaller `limit` and `offset`.",
+                                 "timeout_ms": config.QUERY_TIMEOUT_MS},
+                        status_code=status.HTTP_400_BAD_REQUEST)
+
+
+def page_headers(query_input: QueryInput, results) -> dict:
+    """
+    Returns the `X-Next-Offset` header pointing at the next page when the page came back full. A select without
+    a `limit` returns every matching row or is rejected, so it has no next page.
+    """
+    if query_input.limit is None or len(results) < query_input.limit:
+        return {}
+    return {"X-Next-Offset": str((query_input.offset or 0) + query_input.limit)}
+
+
+async def select_etag(query_inputs: List[QueryInput], count: Optional[str] = None) -> Optional[str]:
+    """
+    Returns the ETag of the results of `query_inputs`: a hash of the data version of the reviews, of the queries
+    and of the row cap applied to those without a `limit`. The version is read before the queries run, so the results are at
+    least as recent as their tag.
+
+    Returns:
+        Optional[str]: The ETag, or None when ETags are disabled, a query reads another table than `reviews`, or
+        the version couldn't be read.
+    """
+    if not config.SELECT_ETAGS or any(query_input.table != "reviews" for query_input in query_inputs):
+        return None
+    version = await run_in_threadpool(read_select_version)
+    if version is None:
+        return None
+    key = json.dumps({"version": version, "count": count, "default_limit": config.SELECT_DEFAULT_LIMIT,
+                      "queries": [query_input.model_dump(mode="json", exclude_none=True)
+                                  for query_input in query_inputs]}, sort_keys=True)
+    return f'"{hashlib.sha256(key.encode()).hexdigest()[:32]}"'
+
+
+def etag_matches(etag: Optional[str], if_none_match: Optional[str]) -> bool:
+    if etag is None or not if_none_match:
+        return False
+    # Weak tags compare equal to the strong ones, as If-None-Match requires
+    tags = {tag[2:] if tag.startswith("W/") else tag for tag in (tag.strip() for tag in if_none_match.split(","))}
+    return "*" in tags or etag in tags
+
+
+def etag_headers(etag: Optional[str]) -> dict:
+    # no-cache lets clients keep the response, but makes them check it is current before using it
+    return {"ETag": etag, "Cache-Control": "no-cache"} if etag else {}
 
 
 @app.post("/reviews/select")
-async def run_query(query_input: QueryInput = Body(...)):
+async def run_query(query_input: QueryInput = Body(...), count: Optional[Literal["exact", "estimated"]] = Query(None),
+                    if_none_match: Optional[str] = Header(None)):
     """
     Select reviews from the database based on specified query parameters.
 
@@ -30,18 +145,94 @@ async def run_query(query_input: QueryInput = Body(...)):
             ],
             "limit": "4"}'
 
+    Selects without a `limit` matching more than `SELECT_DEFAULT_LIMIT` rows, a `limit` above `SELECT_MAX_LIMIT`
+    and a query running longer than `QUERY_TIMEOUT_MS` are all rejected with 400. A full page
+    carries an `X-Next-Offset` header, the `offset` of the next page.
+
+    Responses carry an `ETag`. Sent back in `If-None-Match` while the reviews are unchanged, it is answered with
+    304 and no body, without running the query.
+
     Args:
         query_input (QueryInput): Query parameters for selecting reviews.
+        count (str): Also return the number of rows matching the conditions, ignoring the limit, in the
+            `X-Total-Count` header. "exact" counts them, "estimated" reads it from the table statistics where
+            it can. `X-Total-Count-Type` tells which one was returned.
+        if_none_match (str): The `ETag` of a response the client already has.
 
     Returns:
         JSONResponse: A response containing the selected reviews or an error message.
     """
-    api_logger.info(f"POST request /reviews/select activated with body {query_input}")
-    results = await run_in_threadpool(run_select_query, query_input)
+    api_logger.info("POST request /reviews/select activated with body %s", query_input)
+    apply_row_cap(query_input)
+    etag = await select_etag([query_input], count)
+    if etag_matches(etag, if_none_match):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=etag_headers(etag))
+    if count is None:
+        results = await run_admitted(READS, "select", run_select_query, query_input)
+    else:
+        results = await run_admitted(READS, "select", run_select_query_with_total, query_input, count)
     if results == "Error":
-        api_logger.error(f"An error occurred selecting rows from table, see database.log for detail")
+        api_logger.error("An error occurred selecting rows from table, see database.log for detail")
         raise HTTPException(status_code=400, detail="Unable to run select query, see database.log for details.")
-    return JSONResponse(content=results, status_code=status.HTTP_200_OK)
+    if count is None:
+        return JSONResponse(content=results, status_code=status.HTTP_200_OK,
+                            headers={**page_headers(query_input, results), **etag_headers(etag)})
+    results, total, estimated = results
+    return JSONResponse(content=results, status_code=status.HTTP_200_OK,
+                        headers={"X-Total-Count": str(total),
+                                 "X-Total-Count-Type": "estimated" if estimated else "exact",
+                                 **page_headers(query_input, results), **etag_headers(etag)})
+
+
+@app.post("/reviews/select/batch")
+async def run_query_batch(query_inputs: List[QueryInput] = Body(...), if_none_match: Optional[str] = Header(None)):
+    """
+    Run several selects in one request, on one connection and in one read transaction, so they all see the same
+    snapshot of the data.
+
+    Example curl command:
+    curl -X POST http://127.0.0.1:8000/reviews/select/batch \
+         -H "Content-Type: application/json" \
+         -d '[{"table": "reviews", "columns": ["id", "review_title"], "limit": 10},
+              {"table": "reviews", "conditions": [{"column": "country", "equals": "Canada"}], "limit": 3}]'
+
+    Each query behaves as it would sent to `/reviews/select`. At most `SELECT_BATCH_MAX_QUERIES` queries are
+    accepted, more are rejected with 400, as is the whole batch when one of its queries is rejected for its
+    row cap. The response carries an `ETag` as `/reviews/select` does.
+
+    Args:
+        query_inputs (List[QueryInput]): The queries to run.
+        if_none_match (str): The `ETag` of a response the client already has.
+
+    Returns:
+        JSONResponse: The `results` of the queries keyed by their index in the request, the `next_offsets` of the
+        queries whose page came back full, and the `errors` of the queries that failed.
+    """
+    api_logger.info("POST request /reviews/select/batch activated with %s queries", len(query_inputs))
+    if len(query_inputs) > config.SELECT_BATCH_MAX_QUERIES:
+        raise HTTPException(status_code=400, detail=f"At most {config.SELECT_BATCH_MAX_QUERIES} queries are "
+                                                    f"accepted in one batch, split the request.")
+    for query_input in query_inputs:
+        apply_row_cap(query_input)
+    etag = await select_etag(query_inputs)
+    if etag_matches(etag, if_none_match):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=etag_headers(etag))
+    results = await run_admitted(READS, "select_batch", run_select_batch, query_inputs)
+    if results == "Error":
+        api_logger.error("An error occurred running a batch of selects, see database.log for detail")
+        raise HTTPException(status_code=400, detail="Unable to run select queries, see database.log for details.")
+    content = {"results": {}, "next_offsets": {}, "errors": {}}
+    for index, query_results in results.items():
+        if query_results == "Error":
+            content["errors"][index] = "Unable to run select query, see database.log for details."
+            continue
+        content["results"][index] = query_results
+        next_page = page_headers(query_inputs[index], query_results)
+        if next_page:
+            content["next_offsets"][index] = int(next_page["X-Next-Offset"])
+    # A failed query may succeed on a retry, so its response isn't tagged
+    headers = {} if content["errors"] else etag_headers(etag)
+    return JSONResponse(content=content, status_code=status.HTTP_200_OK, headers=headers)
 
 
 @app.post("/reviews/insert")
@@ -60,25 +251,25 @@ async def insert_reviews_into_db(reviews: List[Review] = Body(...)):
     Returns:
         JSONResponse: A response containing the IDs of the inserted reviews or an error message.
     """
-    api_logger.info(f"POST request /reviews/insert activated with reviews {reviews}")
-    inserted_ids = await run_in_threadpool(insert_reviews, reviews)
+    api_logger.info("POST request /reviews/insert activated with %s reviews", len(reviews))
+    inserted_ids = await run_admitted(WRITES, "insert", insert_reviews, reviews)
     if not inserted_ids:
-        api_logger.error(f"An error occurred when trying to insert records into DB, see database.log")
+        api_logger.error("An error occurred when trying to insert records into DB, see database.log")
         raise HTTPException(status_code=400, detail="Unable to insert rows, see log for details.")
     return JSONResponse(content={"inserted_ids": inserted_ids}, status_code=status.HTTP_201_CREATED)
 
 @app.delete("/reviews/truncate")
 async def delete_all_reviews_from_db():
     api_logger.info("Deleting all records in table")
-    rows_deleted = await run_in_threadpool(delete_reviews)
+    rows_deleted = await run_admitted(WRITES, "truncate", delete_reviews)
     if rows_deleted == "Error":
-        api_logger.error(f"Unable to delete records from DB, see database.log")
+        api_logger.error("Unable to delete records from DB, see database.log")
         raise HTTPException(status_code=400, detail="Unable to delete rows, see log for details.")
     return JSONResponse(content={"num_deleted_rows": rows_deleted}, status_code=status.HTTP_201_CREATED)
 
 
 @app.delete("/reviews/delete")
-async def delete_reviews_from_db(conditions: List[Condition] = Body(...)):
+async def delete_reviews_from_db(conditions: List[Condition] = Body(...), background: bool = Query(False)):
     """
     Delete reviews from the database based on specified conditions.
 
@@ -89,21 +280,25 @@ async def delete_reviews_from_db(conditions: List[Condition] = Body(...)):
 
     Args:
         conditions (List[Condition]): Conditions to identify which reviews to delete.
+        background (bool): Delete in batches in a background job, and respond with the job straight away.
 
     Returns:
-        JSONResponse: A response indicating the number of rows deleted or an error message.
+        JSONResponse: A response indicating the number of rows deleted, the background job, or an error message.
     """
-    api_logger.info(f"DELETE request /reviews/select activated with conditions {conditions}")
-    num_rows_deleted = await run_in_threadpool(delete_reviews, conditions)
+    api_logger.info("DELETE request /reviews/delete activated with conditions %s", conditions)
+    if background:
+        return await start_job(submit_delete_job, conditions)
+    num_rows_deleted = await run_admitted(WRITES, "delete", delete_reviews, conditions)
     if not num_rows_deleted:
-        api_logger.error(f"Unable to delete records from DB, see database.log")
+        api_logger.error("Unable to delete records from DB, see database.log")
         raise HTTPException(status_code=400, detail="Unable to delete rows, see log for details.")
     return JSONResponse(content={"num_deleted_rows": num_rows_deleted}, status_code=status.HTTP_201_CREATED)
 
 
 @app.patch("/reviews/update")
 async def update_reviews_in_db(conditions: List[Condition] = Body(...),
-                               columns_to_update: List[ColumnToUpdate] = Body(...)):
+                               columns_to_update: List[ColumnToUpdate] = Body(...),
+                               background: bool = Query(False)):
     """
     Update reviews in the database based on specified conditions and update data.
 
@@ -115,20 +310,318 @@ async def update_reviews_in_db(conditions: List[Condition] = Body(...),
     Args:
         conditions (List[Condition]): Conditions to identify which reviews to update.
         columns_to_update (List[ColumnToUpdate]): Data for updating the reviews.
+        background (bool): Update in batches in a background job, and respond with the job straight away.
 
     Returns:
-        JSONResponse: A response indicating the number of rows updated or an error message.
+        JSONResponse: A response indicating the number of rows updated, the background job, or an error message.
     """
-    api_logger.info(f"PATCH request /reviews/update activated\n"
-                    f"conditions: {conditions}"
-                    f"columns_to_update: {columns_to_update}")
-    num_updated_rows = await run_in_threadpool(update_review, conditions, columns_to_update)
+    api_logger.info("PATCH request /reviews/update activated\nconditions: %s columns_to_update: %s",
+                    conditions, columns_to_update)
+    if background:
+        return await start_job(submit_update_job, conditions, columns_to_update)
+    num_updated_rows = await run_admitted(WRITES, "update", update_review, conditions, columns_to_update)
     if not num_updated_rows:
-        api_logger.error(f"Unable to update records in db from submitted params, see database.log for details")
+        api_logger.error("Unable to update records in db from submitted params, see database.log for details")
         raise HTTPException(status_code=400, detail="Unable to update rows, see log for details.")
     return JSONResponse(content={"num_updated_rows": num_updated_rows}, status_code=status.HTTP_201_CREATED)
 
 
+@app.patch("/reviews/update/batch")
+async def update_reviews_batch_in_db(updates: List[ReviewUpdate] = Body(...)):
+    """
+    Update many reviews, each with its own changes, in a single transaction.
+
+    Example curl command:
+    curl -X PATCH http://127.0.0.1:8000/reviews/update/batch \
+         -H "Content-Type: application/json" \
+         -d '[{"id": 1, "changes": [{"column_name": "review_title", "column_value": "Updated Title"}]},
+              {"id": 2, "changes": [{"column_name": "review_rating", "column_value": 2}]}]'
+
+    Args:
+        updates (List[ReviewUpdate]): The review ids and the changes to apply to each.
+
+    Returns:
+        JSONResponse: The number of rows updated and a result per item, or an error message.
+    """
+    api_logger.info("PATCH request /reviews/update/batch activated with %s items", len(updates))
+    results = await run_admitted(WRITES, "update_batch", update_reviews_batch, updates)
+    if results is None:
+        api_logger.error("Unable to apply the batch update, see database.log for details")
+        raise HTTPException(status_code=400, detail="Unable to update rows, see log for details.")
+    num_updated_rows = sum(1 for result in results if result["status"] == "updated")
+    return JSONResponse(content={"num_updated_rows": num_updated_rows, "results": results},
+                        status_code=status.HTTP_201_CREATED)
+
+
+@app.get("/reviews/changes")
+async def get_changes(request: Request, since: int = Query(0, ge=0), limit: int = Query(1000, ge=1, le=10000),
+                      wait: float = Query(0, ge=0), stream: bool = Query(False),
+                      last_event_id: Optional[int] = Header(None)):
+    """
+    Read the reviews inserted, updated or deleted after a position in the change log, to sync incrementally.
+
+    Example curl commands:
+    curl "http://127.0.0.1:8000/reviews/changes?since=0"
+    curl "http://127.0.0.1:8000/reviews/changes?since=1234&wait=30"
+    curl -N "http://127.0.0.1:8000/reviews/changes?since=1234&stream=true"
+
+    Args:
+        since (int): The `last_seq` of the previous response, 0 to read the log from the start.
+        limit (int): The maximum number of log entries per response.
+        wait (float): Long-poll: wait up to this many seconds (at most `CHANGE_FEED_MAX_WAIT`) for a change
+            when there is none yet.
+        stream (bool): Keep the connection open and send each change as a server-sent event, with the
+            `seq` as event id. A reconnecting client's `Last-Event-ID` header takes precedence over `since`.
+
+    Returns:
+        JSONResponse: The changes, the `last_seq` to continue from and whether `more` are waiting. 410 when
+        changes after `since` were pruned from the log, and the consumer has to resync from a full select.
+    """
+    if not config.CHANGE_LOG:
+        raise HTTPException(status_code=404, detail="The change log is disabled.")
+    if stream:
+        return StreamingResponse(stream_changes(request, since if last_event_id is None else last_event_id, limit),
+                                 media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+    deadline = time.monotonic() + min(wait, config.CHANGE_FEED_MAX_WAIT)
+    while True:
+        feed = await run_admitted(READS, "changes", read_changes, since, limit)
+        if feed == "Error":
+            raise HTTPException(status_code=400, detail="Unable to read changes, see database.log for details.")
+        if feed["expired"]:
+            raise HTTPException(status_code=410, detail={"message": "Changes after `since` have expired, resync in full.",
+                                                         "last_seq": feed["head"]})
+        if feed["changes"] or time.monotonic() >= deadline:
+            break
+        # Other worker processes write to the same file, so the log itself is polled
+        await asyncio.sleep(config.CHANGE_FEED_POLL_INTERVAL)
+    del feed["expired"], feed["head"]
+    return JSONResponse(content=feed, status_code=status.HTTP_200_OK)
+
+
+async def stream_changes(request: Request, since: int, limit: int):
+    """
+    Yields the changes after `since` as server-sent events until the client disconnects.
+    """
+    last_sent = time.monotonic()
+    while not await request.is_disconnected():
+        try:
+            feed = await run_admitted(READS, "changes", read_changes, since, limit)
+        except (DatabaseBusyError, HTTPException):
+            # Busy or shed, the stream is already open so try again on the next poll
+            await asyncio.sleep(config.CHANGE_FEED_POLL_INTERVAL)
+            continue
+        if feed == "Error" or feed["expired"]:
+            error = "expired" if feed != "Error" else "error"
+            yield f"event: error\ndata: {json.dumps({'error': error, 'since': since})}\n\n"
+            return
+        for change in feed["changes"]:
+            yield f"id: {change['seq']}\nevent: change\ndata: {json.dumps(change)}\n\n"
+        since = feed["last_seq"]
+        if feed["changes"]:
+            last_sent = time.monotonic()
+            if feed["more"]:
+                continue
+        elif time.monotonic() - last_sent >= 15:
+            # A comment keeps proxies from closing an idle connection
+            yield ": keep-alive\n\n"
+            last_sent = time.monotonic()
+        await asyncio.sleep(config.CHANGE_FEED_POLL_INTERVAL)
+
+
+@app.post("/reviews/upload")
+async def upload_reviews(request: Request, format: Optional[str] = Query(None)):
+    """
+    Load a CSV or Parquet file of reviews, in the layout of `data/reviews.csv`, in a background job.
+
+    The request body is the file itself, streamed to disk, not a multipart form. Rows are validated and cleaned
+    by the same vectorized pipeline as the `load_data` CLI, instead of one `Review` model per row.
+
+    Example curl command:
+    curl -X POST "http://127.0.0.1:8000/reviews/upload?format=csv" \
+         -H "Content-Type: text/csv" --data-binary @reviews.csv
+
+    Args:
+        format (str): "csv" or "parquet". Defaults to parquet for a parquet `Content-Type`, otherwise csv.
+
+    Returns:
+        JSONResponse: 202 with the job, at `/jobs/{id}`, which reports the rows read, accepted, rejected and
+        loaded, and the elapsed time.
+    """
+    content_type = request.headers.get("content-type", "")
+    file_format = format or ("parquet" if "parquet" in content_type else "csv")
+    if file_format not in UPLOAD_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format `{file_format}`, expected csv or parquet.")
+    if file_format == "parquet" and not parquet_supported():
+        raise HTTPException(status_code=415, detail="Parquet uploads need pyarrow or fastparquet installed.")
+    declared_size = int(request.headers.get("content-length") or 0)
+    if declared_size > config.UPLOAD_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"Uploads are limited to {config.UPLOAD_MAX_BYTES} bytes.")
+
+    descriptor, path = tempfile.mkstemp(prefix="reviews_upload_", suffix=f".{file_format}", dir=config.UPLOAD_DIR)
+    os.close(descriptor)
+    size = 0
+    try:
+        # Written through a worker thread chunk by chunk, the upload is never held in memory as a whole
+        async with await anyio.open_file(path, "wb") as upload_file:
+            async for chunk in request.stream():
+                size += len(chunk)
+                if size > config.UPLOAD_MAX_BYTES:
+                    raise HTTPException(status_code=413,
+                                        detail=f"Uploads are limited to {config.UPLOAD_MAX_BYTES} bytes.")
+                await upload_file.write(chunk)
+        if size == 0:
+            raise HTTPException(status_code=400, detail="The uploaded file is empty.")
+    except BaseException:
+        os.remove(path)
+        raise
+    api_logger.info("Received %s upload of %s bytes", file_format, size)
+    try:
+        return await start_job(submit_upload_job, path, file_format, size)
+    except HTTPException:
+        # Shed before the job started, the job would have deleted the file otherwise
+        os.remove(path)
+        raise
+
+
+async def start_job(submit, *args) -> JSONResponse:
+    try:
+        job = await run_admitted(WRITES, "start_job", submit, *args)
+    except ValueError as error:
+        api_logger.error("Unable to start background job: %s", error)
+        raise HTTPException(status_code=400, detail=f"Unable to start job: {error}")
+    api_logger.info("Started background %s job %s", job.kind, job.id)
+    return JSONResponse(content=jsonable_encoder(job.to_dict()), status_code=status.HTTP_202_ACCEPTED,
+                        headers={"Location": f"/jobs/{job.id}"})
+
+
+@app.get("/jobs")
+async def list_jobs():
+    """
+    List the background jobs of this worker, newest first.
+
+    Example curl command:
+    curl http://127.0.0.1:8000/jobs
+
+    Returns:
+        JSONResponse: The progress of each job.
+    """
+    return JSONResponse(content=jsonable_encoder([job.to_dict() for job in JOBS.list()]),
+                        status_code=status.HTTP_200_OK)
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """
+    Get the progress of a background job.
+
+    Example curl command:
+    curl http://127.0.0.1:8000/jobs/<job id>
+
+    Returns:
+        JSONResponse: The job's status, the rows processed so far and the total to process.
+    """
+    job = JOBS.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return JSONResponse(content=jsonable_encoder(job.to_dict()), status_code=status.HTTP_200_OK)
+
+
+@app.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    """
+    Stop a background job before its next batch. Batches already applied are kept.
+
+    Example curl command:
+    curl -X POST http://127.0.0.1:8000/jobs/<job id>/cancel
+    """
+    job = JOBS.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    job.cancel_requested.set()
+    return JSONResponse(content=jsonable_encoder(job.to_dict()), status_code=status.HTTP_202_ACCEPTED)
+
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Expose request, query and threadpool metrics in the Prometheus text format.
+
+    Example curl command:
+    curl http://127.0.0.1:8000/metrics
+
+    Returns:
+        PlainTextResponse: The current value of every metric.
+    """
+    # `run_in_threadpool` borrows from anyio's default limiter, its statistics give the queue depth
+    limiter_statistics = current_default_thread_limiter().statistics()
+    THREADPOOL_TASKS_RUNNING.labels().set(limiter_statistics.borrowed_tokens)
+    THREADPOOL_TASKS_WAITING.labels().set(limiter_statistics.tasks_waiting)
+    record_limits()
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/admin/slow-queries")
+async def list_slow_queries():
+    """
+    List the most recent slow SQL statements, newest first, with their query plans.
+
+    Example curl command:
+    curl http://127.0.0.1:8000/admin/slow-queries
+
+    Returns:
+        JSONResponse: The slow-query threshold and the recorded statements.
+    """
+    return JSONResponse(content={"threshold_ms": config.SLOW_QUERY_THRESHOLD_MS,
+                                 "queries": SLOW_QUERY_LOG.entries()},
+                        status_code=status.HTTP_200_OK)
+
+
+@app.delete("/admin/slow-queries")
+async def clear_slow_queries():
+    """
+    Clear the slow-query log.
+
+    Example curl command:
+    curl -X DELETE http://127.0.0.1:8000/admin/slow-queries
+    """
+    SLOW_QUERY_LOG.clear()
+    return JSONResponse(content={"cleared": True}, status_code=status.HTTP_200_OK)
+
+
+@app.get("/admin/maintenance")
+async def get_maintenance():
+    """
+    List the database maintenance tasks with their interval and last run.
+
+    Example curl command:
+    curl http://127.0.0.1:8000/admin/maintenance
+
+    Returns:
+        JSONResponse: The tasks, with when each last ran, its status, duration and outcome.
+    """
+    tasks = await run_admitted(READS, "maintenance", maintenance_status)
+    return JSONResponse(content={"tasks": tasks}, status_code=status.HTTP_200_OK)
+
+
+@app.post("/admin/maintenance")
+async def run_maintenance(force: bool = Query(False)):
+    """
+    Run the database maintenance tasks that are due now, instead of waiting for a quiet time.
+
+    Example curl command:
+    curl -X POST "http://127.0.0.1:8000/admin/maintenance?force=true"
+
+    Args:
+        force (bool): Run every task, whether it is due or not.
+
+    Returns:
+        JSONResponse: The outcome of each task run.
+    """
+    api_logger.info("POST request /admin/maintenance activated, force=%s", force)
+    results = await run_admitted(WRITES, "maintenance", run_due_tasks, force)
+    return JSONResponse(content={"tasks": results}, status_code=status.HTTP_200_OK)
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("app.routes.main:app", host="127.0.0.1", port=8000, reload=True)
@@ -0,0 +1,41 @@
+import asyncio
+
+from starlette.concurrency import run_in_threadpool
+
+from app import config
+from app.database.maintenance import run_due_tasks
+from app.database.read_replica import sync_replica
+from app.routes.middleware import ACTIVITY
+from app.routes.routes_logger import api_logger
+
+"""
+This module schedules the database maintenance of `app/database/maintenance.py` at quiet times. Each worker
+checks every `config.MAINTENANCE_CHECK_INTERVAL` seconds whether it has been idle for
+`config.MAINTENANCE_QUIET_SECONDS`, and if so runs the tasks that are due, stopping between tasks as soon as a
+request comes in. Only the worker processes' own traffic is seen, the tasks themselves are claimed in the
+database so each runs once across the workers.
+
+It also keeps the read replica (`config.READ_REPLICA`) in step with the writes of the other processes.
+"""
+
+
+def still_quiet() -> bool:
+    return ACTIVITY.quiet_for(config.MAINTENANCE_QUIET_SECONDS)
+
+
+async def run_maintenance_loop():
+    while True:
+        await asyncio.sleep(config.MAINTENANCE_CHECK_INTERVAL)
+        if not still_quiet():
+            continue
+        try:
+            await run_in_threadpool(run_due_tasks, False, still_quiet)
+        except Exception as error:
+            # Most likely a locked database, the tasks are tried again on the next quiet check
+            api_logger.warning("Scheduled maintenance failed: %s", error)
+
+
+async def run_replica_sync_loop():
+    while True:
+        await asyncio.sleep(config.READ_REPLICA_SYNC_INTERVAL)
+        await run_in_threadpool(sync_replica)
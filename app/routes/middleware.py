@@ -0,0 +1,92 @@
+import time
+from urllib.parse import parse_qs
+
+from app.monitoring.metrics import HTTP_REQUEST_DURATION
+
+"""
+This module contains the ASGI middleware wrapped around the FastAPI application.
+"""
+
+# Scraping the metrics doesn't count as activity, or maintenance would never find the worker quiet
+UNTRACKED_PATHS = ("/metrics",)
+# Nor do change feed streams and long polls, which stay open while the worker is idle
+CHANGE_FEED_PATH = "/reviews/changes"
+
+
+def is_tracked(scope) -> bool:
+    """
+    Returns whether a request counts as activity, see `RequestActivity`.
+    """
+    if scope["path"] in UNTRACKED_PATHS:
+        return False
+    if scope["path"] != CHANGE_FEED_PATH:
+        return True
+    params = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    if params.get("stream", ["false"])[-1].lower() in ("true", "1", "yes", "on"):
+        return False
+    try:
+        return float(params.get("wait", ["0"])[-1]) <= 0
+    except ValueError:
+        return True
+
+
+class RequestActivity:
+    """
+    Tracks the requests in flight in this worker and when the last one started or finished.
+    """
+
+    def __init__(self):
+        self.in_flight = 0
+        self.last_active = time.monotonic()
+
+    def started(self):
+        self.in_flight += 1
+        self.last_active = time.monotonic()
+
+    def finished(self):
+        self.in_flight -= 1
+        self.last_active = time.monotonic()
+
+    def quiet_for(self, seconds: float) -> bool:
+        return self.in_flight == 0 and time.monotonic() - self.last_active >= seconds
+
+
+ACTIVITY = RequestActivity()
+
+
+class MetricsMiddleware:
+    """
+    Records the latency of every HTTP request, labelled by method, route template and response status.
+
+    Requests that don't match a route are grouped under the "unmatched" route, so arbitrary paths can't
+    create new label values.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+        tracked = is_tracked(scope)
+        if tracked:
+            ACTIVITY.started()
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            if tracked:
+                ACTIVITY.finished()
+            # The router stores the matched route on the (shared) scope
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_REQUEST_DURATION.labels(scope["method"], route, status_code).observe(time.perf_counter() - start)
@@ -1,15 +1,5 @@
 import logging
-from app.logger import setup_logging, file_formatter
-import os
-
-setup_logging()
-
-base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
-
-api_logger = logging.getLogger('api')
-api_logger.setLevel(logging.INFO)  # Different level for API logs
-api_file_handler = logging.FileHandler(f'{base_dir}/logs/api.log')
-api_file_handler.setFormatter(file_formatter)
-api_logger.addHandler(api_file_handler)
+from app.logger import create_logger
 
+# Creating a specific logger for the API, writing to logs/api.log
+api_logger = create_logger('api', 'api.log', logging.INFO)  # Different level for API logs
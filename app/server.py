@@ -0,0 +1,57 @@
+import argparse
+
+import uvicorn
+
+from app import config
+from app.database.change_log import prune_change_log
+from app.database.database import create_connection, create_table, enable_wal
+from app.database.statistics import analyze
+from app.database.tuning import profile_settings
+
+"""
+This module is the production entry point of the API. It runs several uvicorn worker processes over the
+shared SQLite file, which is switched to WAL mode first so reads in one worker don't wait on writes in another,
+unless the storage profile (`config.STORAGE_PROFILE`) selects another journal mode.
+
+    python -m app.server --workers 4 --port 8000
+
+Each worker warms up before it accepts traffic (see `app/warm_up.py`). SIGTERM or SIGINT stops the server,
+waiting up to the graceful timeout for in-flight requests. The uvicorn version in Pipfile.lock doesn't restart
+workers that die or reload them on a signal, so deploys restart the server, under a process manager such as
+systemd that also restarts it if it exits.
+"""
+
+
+def prepare_database():
+    """
+    Creates the `reviews` table if needed, enables WAL mode, refreshes the table statistics and prunes the
+    change log, once, before any worker starts.
+    """
+    create_table()
+    if profile_settings().get("journal_mode", "wal") == "wal":
+        enable_wal()
+    analyze()
+    conn = create_connection()
+    try:
+        prune_change_log(conn)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def run_server(host: str, port: int, workers: int, graceful_timeout: float):
+    prepare_database()
+    uvicorn.run("app.routes.main:app", host=host, port=port, workers=workers,
+                timeout_graceful_shutdown=graceful_timeout, proxy_headers=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the reviews API with multiple worker processes.")
+    parser.add_argument("--host", default="0.0.0.0", help="Interface to bind")
+    parser.add_argument("--port", type=int, default=8000, help="Port to bind")
+    parser.add_argument("--workers", type=int, default=config.SERVER_WORKERS,
+                        help="Number of worker processes, defaults to SERVER_WORKERS or the CPU count")
+    parser.add_argument("--graceful-timeout", type=float, default=config.SERVER_GRACEFUL_TIMEOUT,
+                        help="Seconds to wait for in-flight requests when a worker stops")
+    args = parser.parse_args()
+    run_server(args.host, args.port, args.workers, args.graceful_timeout)
@@ -0,0 +1,90 @@
+import os
+import time
+
+from app import config
+from app.database import database
+from app.countries.lookup import country_lookup
+from app.routes.routes_logger import api_logger
+
+"""
+This module warms a server worker up before it accepts traffic, so the first requests after a deploy or a
+worker restart don't pay for cold caches.
+
+Connections are opened per request, so SQLite's own page cache doesn't outlive a request. What does carry
+over is the OS page cache, which is primed by reading the database file (and its WAL) once.
+"""
+
+# Names resolved during warm-up, so the country snapshot is loaded and the common names are memoised
+WARM_UP_COUNTRIES = ["United States", "United Kingdom", "Germany"]
+READ_CHUNK_BYTES = 2 ** 20
+
+
+def warm_database_connection():
+    """
+    Opens a connection and loads the schema, which also checks the `reviews` table is reachable.
+    """
+    conn = database.create_connection()
+    try:
+        conn.execute("SELECT name FROM sqlite_master WHERE type = 'table';").fetchall()
+    finally:
+        conn.close()
+
+
+def prime_page_cache(path: str, max_bytes: int) -> int:
+    """
+    Reads up to `max_bytes` of the database file and its write-ahead log, so later queries find their pages
+    in the OS page cache instead of on disk.
+
+    Args:
+        path (str): The database file.
+        max_bytes (int): The maximum number of bytes to read across the files.
+
+    Returns:
+        int: The number of bytes read.
+    """
+    bytes_read = 0
+    for file_path in (path, f"{path}-wal"):
+        if not os.path.exists(file_path):
+            continue
+        with open(file_path, "rb") as database_file:
+            while bytes_read < max_bytes:
+                chunk = database_file.read(min(READ_CHUNK_BYTES, max_bytes - bytes_read))
+                if not chunk:
+                    break
+                bytes_read += len(chunk)
+    return bytes_read
+
+
+def warm_country_lookup():
+    """
+    Loads the country snapshot used by the `Review` validators and resolves a few names with it.
+    """
+    lookup = country_lookup()
+    for name in WARM_UP_COUNTRIES:
+        lookup.convert(name, to='short_name')
+
+
+def warm_up() -> dict:
+    """
+    Runs every warm-up step and logs how long each one took. A failing step is logged and skipped, it never
+    stops the worker from starting.
+
+    Returns:
+        dict: The duration in seconds of each step that completed.
+    """
+    steps = [
+        ("database_connection", warm_database_connection),
+        ("page_cache", lambda: prime_page_cache(database.db_path, config.WARM_UP_MAX_BYTES)),
+        ("country_lookup", warm_country_lookup),
+    ]
+    durations = {}
+    for name, step in steps:
+        start = time.perf_counter()
+        try:
+            step()
+        except Exception as error:
+            api_logger.warning("Warm-up step %s failed: %s", name, error)
+            continue
+        durations[name] = round(time.perf_counter() - start, 4)
+    api_logger.info("Worker %s warmed up: %s", os.getpid(), durations)
+    return durations
@@ -0,0 +1,148 @@
+import argparse
+import random
+import statistics
+import sys
+import time
+
+# Imported first, it points the application at the benchmark database
+from benchmarks.common import change_flag, load_results, run_metadata, save_results
+
+from app.countries.lookup import EXCLUDE_PREFIX, country_lookup  # noqa: E402
+from benchmarks.generate_reviews import COUNTRY_VARIANTS, UNKNOWN_COUNTRIES  # noqa: E402
+
+"""
+This module benchmarks the country name matching behind `convert_country_names` and the `Review` validators
+on dirty, high-cardinality names, comparing the compiled `PatternMatcher` with running every country's
+regular expression in turn:
+
+    python -m benchmarks.bench_countries --names 100000
+    python -m benchmarks.bench_countries --compare benchmarks/results/countries_<commit>.json
+
+Names are built from the snapshot's country names, the variants of the review generator, and cities and
+junk, then dirtied with typos, odd casing, punctuation, accents and surrounding text, so nearly every name is
+distinct and the lookup's memo doesn't help. Both matchers run on every distinct name, without the memo, and
+the benchmark fails when any of their results differ.
+"""
+
+CITIES = ["London", "Paris", "New York", "Lagos", "Mumbai", "São Paulo", "Zürich", "Kraków", "İstanbul",
+          "Reykjavík", "Ho Chi Minh City", "Cape Town", "Buenos Aires", "Kyiv", "Ålesund"]
+JUNK = ["n/a", "-", "?", "none", "unknown", "test", "asdf", "null", "0", "123 Main Street", "my house",
+        "earth", "EU", "Europe", "Asia excluding China", "worldwide", "@@@", "ſtate", "Kingdom"]
+PREFIXES = ["", "", "", "Republic of ", "the ", "Kingdom of ", "Rep. ", "sent from ", "shipped to ", "  "]
+SUFFIXES = ["", "", "", " (the)", ", Republic of", " - EU", "!!", " excluding France", " / UK", ".", "  "]
+ACCENTS = {"a": "áàâå", "e": "éèê", "i": "íıİ", "o": "óöø", "u": "úü", "n": "ñ", "s": "ſß", "k": "K", "c": "ç"}
+
+
+def dirty_name(rng: random.Random, names: list) -> str:
+    """
+    Returns one of `names`, or a city or junk, with random typos, casing, accents and surrounding text.
+    """
+    draw = rng.random()
+    name = rng.choice(CITIES if draw < 0.1 else JUNK if draw < 0.15 else names)
+    chars = list(name)
+    for _ in range(rng.choice([0, 0, 1, 1, 2, 3])):
+        position = rng.randrange(len(chars) + 1)
+        edit = rng.random()
+        if edit < 0.3 and position < len(chars):
+            del chars[position]
+        elif edit < 0.6:
+            chars.insert(position, rng.choice("abcdefghijklmnopqrstuvwxyz .,-'"))
+        elif position < len(chars) and chars[position].lower() in ACCENTS:
+            chars[position] = rng.choice(ACCENTS[chars[position].lower()])
+        elif position < len(chars) - 1:
+            chars[position], chars[position + 1] = chars[position + 1], chars[position]
+    name = "".join(chars)
+    casing = rng.random()
+    name = name.upper() if casing < 0.15 else name.lower() if casing < 0.3 else name.title() if casing < 0.4 else name
+    return rng.choice(PREFIXES) + name + rng.choice(SUFFIXES)
+
+
+def dirty_names(count: int, seed: int = 0) -> list:
+    """
+    Returns `count` dirty country names, the same ones for the same count and seed.
+    """
+    rng = random.Random(seed)
+    lookup = country_lookup()
+    names = ([row["name_short"] for row in lookup.rows] + list(COUNTRY_VARIANTS) + UNKNOWN_COUNTRIES
+             + [variant for variants in COUNTRY_VARIANTS.values() for variant in variants])
+    return [dirty_name(rng, names) for _ in range(count)]
+
+
+def time_matcher(match, names: list, repeat: int):
+    """
+    Returns the median time of matching every name with `match`, and the results of the last run.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        results = [match(name) for name in names]
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), results
+
+
+def run_benchmarks(count: int, seed: int, repeat: int) -> dict:
+    lookup = country_lookup()
+    # What `CountryLookup.match` passes to the matchers, the ISO codes and numbers are dictionary lookups
+    names = sorted({part for part in (EXCLUDE_PREFIX.split(name)[0] for name in dirty_names(count, seed))
+                    if len(part) > 3 and not part.strip().isdigit()})
+    print(f"  {len(names)} distinct names longer than three characters out of {count}")
+    matcher = lookup.name_matcher
+    candidates = sum(len(matcher.candidates(name)) for name in names) / len(names)
+    matchers = []
+    results = {}
+    for name, match in [("scan", matcher.scan), ("compiled", matcher.search)]:
+        seconds, results[name] = time_matcher(match, names, repeat)
+        matchers.append({"name": name, "seconds": round(seconds, 4),
+                         "names_per_second": round(len(names) / seconds)})
+        print(f"  {name:<10} {seconds:9.3f} s  {matchers[-1]['names_per_second']:>10} names/s")
+    mismatches = [name for name, scanned, compiled in zip(names, results["scan"], results["compiled"])
+                  if scanned != compiled]
+    print(f"  {candidates:.1f} of {len(matcher.regexes)} expressions run per name, "
+          f"{results['compiled'].count([])} names unmatched, {len(mismatches)} mismatches")
+    return {**run_metadata("countries"), "names": count, "distinct_names": len(names), "seed": seed,
+            "repeat": repeat, "expressions_run_per_name": round(candidates, 2), "mismatches": mismatches[:20],
+            "matchers": matchers}
+
+
+def compare_results(baseline: dict, current: dict, threshold: float = 0.10) -> bool:
+    """
+    Prints the change in names matched per second between two result files.
+
+    Returns:
+        bool: True when any matcher got slower by more than `threshold`.
+    """
+    regressed = False
+    baseline_matchers = {matcher["name"]: matcher for matcher in baseline["matchers"]}
+    print(f"Comparing {baseline['git_commit']} (baseline) with {current['git_commit']}")
+    for matcher in current["matchers"]:
+        baseline_matcher = baseline_matchers.get(matcher["name"])
+        if baseline_matcher is None:
+            continue
+        before, after = baseline_matcher["names_per_second"], matcher["names_per_second"]
+        change, matcher_regressed = change_flag(before, after, threshold, higher_is_better=True)
+        regressed = regressed or matcher_regressed
+        flag = "  REGRESSION" if matcher_regressed else ""
+        print(f"  {matcher['name']:<10} {before:>10} -> {after:>10} names/s  {change:+7.1%}{flag}")
+    return regressed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark country name matching on dirty names.")
+    parser.add_argument("--names", type=int, default=50_000, help="Dirty names generated")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the generated names")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per matcher, the median is reported")
+    parser.add_argument("--label", default=None, help="Name of the results file, defaults to the git commit")
+    parser.add_argument("--compare", default=None, help="Results file of an earlier run to compare with")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Slowdown ratio reported as a regression when comparing")
+    args = parser.parse_args()
+
+    print(f"Matching {args.names} dirty country names, median of {args.repeat} runs")
+    results = run_benchmarks(args.names, args.seed, args.repeat)
+    save_results(results, args.label)
+
+    if results["mismatches"]:
+        print("The compiled matcher and the scan disagree on:", *results["mismatches"], sep="\n  ")
+        sys.exit(1)
+    if args.compare:
+        sys.exit(1 if compare_results(load_results(args.compare), results, args.threshold) else 0)
@@ -0,0 +1,169 @@
+import argparse
+import os
+import sys
+import time
+
+# Imported first, it points the application at the benchmark database
+from benchmarks.common import BENCH_DIR, change_flag, load_results, run_metadata, save_results
+
+import pandas as pd  # noqa: E402
+
+from app import config  # noqa: E402
+from app.data_loader.data_cleaning_and_transformation import (  # noqa: E402
+    read_csv, validate_input_datastructure_and_types, convert_country_names, standardize_reviewer_names,
+    validate_emails_and_ratings, convert_dates_for_storage, dataframe_memory_mb)
+from app.data_loader.load_data import write_reviews  # noqa: E402
+from app.data_loader.load_runs import PeakRssSampler  # noqa: E402
+from app.database import database  # noqa: E402
+from benchmarks.generate_reviews import (  # noqa: E402
+    add_generator_arguments, generator_options, parse_size, write_reviews_csv)
+
+"""
+This module benchmarks the data loader on synthetic review files.
+
+Each stage of `prepare_data_for_loading` and the final write performed by `load_data` is timed separately,
+with throughput, the peak resident memory seen during the stage and the memory held by the DataFrame it
+returns. `--compact-dtypes` runs the pipeline with `COMPACT_DTYPES` on, to compare the two modes. Results are saved as JSON under
+`benchmarks/results/` and can be compared with an earlier run to spot regressions:
+
+    python -m benchmarks.bench_loader --sizes 10k,1m
+    python -m benchmarks.bench_loader --sizes 10k --compare benchmarks/results/loader_<commit>.json
+    python -m benchmarks.bench_loader --sizes 1m --compact-dtypes --label loader_compact
+"""
+
+
+def run_stage(name: str, function, df, stages: list):
+    """
+    Runs one stage, records its timing, row counts, peak memory and DataFrame memory in `stages` and returns its
+    output.
+    """
+    rows_in = len(df) if isinstance(df, pd.DataFrame) else None
+    with PeakRssSampler() as sampler:
+        start = time.perf_counter()
+        output = function(df)
+        seconds = time.perf_counter() - start
+    rows_out = len(output) if isinstance(output, pd.DataFrame) else rows_in
+    rows = rows_in if rows_in is not None else rows_out
+    # Measured outside the timed section, it reads every string of the DataFrame
+    df_memory_mb = round(dataframe_memory_mb(output), 1) if isinstance(output, pd.DataFrame) else None
+    stages.append({
+        "name": name,
+        "seconds": round(seconds, 4),
+        "rows_in": rows_in,
+        "rows_out": rows_out,
+        "rows_per_second": round(rows / seconds) if rows and seconds else None,
+        "peak_rss_mb": round(sampler.peak / 2 ** 20, 1),
+        "df_memory_mb": df_memory_mb,
+    })
+    print(f"  {name:<45} {seconds:9.3f}s  {stages[-1]['rows_per_second'] or 0:>12,} rows/s  "
+          f"{stages[-1]['peak_rss_mb']:>9.1f} MB peak  {df_memory_mb or 0:>9.1f} MB DataFrame")
+    return output
+
+
+def write_to_database(df: pd.DataFrame) -> pd.DataFrame:
+    # The write performed by `load_data`
+    conn = database.create_connection()
+    try:
+        write_reviews(convert_dates_for_storage(df), conn)
+        conn.commit()
+    finally:
+        conn.close()
+    return df
+
+
+def benchmark_file(csv_file: str) -> list:
+    """
+    Runs the loader pipeline stage by stage on `csv_file`, into a freshly created `reviews` table.
+    """
+    if os.path.exists(database.db_path):
+        os.remove(database.db_path)
+    database.create_table()
+
+    stages = []
+    df = run_stage("read_csv", read_csv, csv_file, stages)
+    df = run_stage("validate_input_datastructure_and_types", validate_input_datastructure_and_types, df, stages)
+    df = run_stage("convert_country_names", convert_country_names, df, stages)
+    df = run_stage("standardize_reviewer_names", standardize_reviewer_names, df, stages)
+    df = run_stage("validate_emails_and_ratings", validate_emails_and_ratings, df, stages)
+    run_stage("load (to_sql)", write_to_database, df, stages)
+    return stages
+
+
+def run_benchmarks(sizes: list, seed: int, options: dict) -> dict:
+    runs = []
+    for size in sizes:
+        rows = parse_size(size)
+        option_key = "-".join(f"{value}" for value in options.values())
+        csv_file = os.path.join(BENCH_DIR, f"reviews_{rows}_{seed}_{option_key}.csv")
+        if not os.path.exists(csv_file):
+            print(f"Generating {rows:,} rows into {csv_file}")
+            write_reviews_csv(csv_file, rows, seed=seed, **options)
+
+        print(f"Benchmarking {rows:,} rows")
+        start = time.perf_counter()
+        stages = benchmark_file(csv_file)
+        total_seconds = time.perf_counter() - start
+        runs.append({
+            "size": size,
+            "rows": rows,
+            "total_seconds": round(total_seconds, 4),
+            "rows_per_second": round(rows / total_seconds),
+            "peak_rss_mb": max(stage["peak_rss_mb"] for stage in stages),
+            "stages": stages,
+        })
+        print(f"  {'total':<45} {total_seconds:9.3f}s  {runs[-1]['rows_per_second']:>12,} rows/s")
+
+    return {
+        **run_metadata("loader"),
+        "pandas": pd.__version__,
+        "compact_dtypes": config.COMPACT_DTYPES,
+        "generator": {"seed": seed, **options},
+        "runs": runs,
+    }
+
+
+def compare_results(baseline: dict, current: dict, threshold: float = 0.10) -> bool:
+    """
+    Prints the change in time per stage between two result files.
+
+    Returns:
+        bool: True when any stage or total got slower by more than `threshold`.
+    """
+    regressed = False
+    baseline_runs = {run["rows"]: run for run in baseline["runs"]}
+    print(f"Comparing {baseline['git_commit']} (baseline) with {current['git_commit']}")
+    for run in current["runs"]:
+        baseline_run = baseline_runs.get(run["rows"])
+        if baseline_run is None:
+            continue
+        baseline_stages = {stage["name"]: stage for stage in baseline_run["stages"]}
+        rows = [(stage["name"], baseline_stages[stage["name"]]["seconds"], stage["seconds"])
+                for stage in run["stages"] if stage["name"] in baseline_stages]
+        rows.append(("total", baseline_run["total_seconds"], run["total_seconds"]))
+        print(f"{run['rows']:,} rows")
+        for name, before, after in rows:
+            change, stage_regressed = change_flag(before, after, threshold)
+            regressed = regressed or stage_regressed
+            flag = "  REGRESSION" if stage_regressed else ""
+            print(f"  {name:<45} {before:9.3f}s -> {after:9.3f}s  {change:+7.1%}{flag}")
+    return regressed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the data loader on synthetic review files.")
+    parser.add_argument("--sizes", default="10k", help="Comma separated row counts, e.g. 10k,1m,10m")
+    parser.add_argument("--label", default=None, help="Name of the results file, defaults to the git commit")
+    parser.add_argument("--compare", default=None, help="Results file of an earlier run to compare with")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Slowdown ratio reported as a regression when comparing")
+    parser.add_argument("--compact-dtypes", action="store_true",
+                        help="Run the pipeline with categorical, Arrow-backed string and small integer dtypes")
+    add_generator_arguments(parser)
+    args = parser.parse_args()
+    config.COMPACT_DTYPES = config.COMPACT_DTYPES or args.compact_dtypes
+
+    results = run_benchmarks(args.sizes.split(","), args.seed, generator_options(args))
+    save_results(results, args.label)
+
+    if args.compare:
+        sys.exit(1 if compare_results(load_results(args.compare), results, args.threshold) else 0)
@@ -0,0 +1,120 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Imported first, it points the application at the benchmark database
+from benchmarks.common import change_flag, load_results, run_metadata, save_results
+
+"""
+This module measures how long the entry points take to start, in a fresh interpreter each time so nothing
+is already imported or cached:
+
+    python -m benchmarks.bench_startup --repeat 10
+    python -m benchmarks.bench_startup --compare benchmarks/results/startup_<commit>.json
+
+The time of an empty interpreter is measured too and subtracted, so the results show what the application
+adds. For each target the slowest imports, from `python -X importtime`, are listed to show where time goes.
+"""
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TARGETS = {
+    "api_import": "import app.routes.main",
+    "server_import": "import app.server",
+    "loader_import": "import app.data_loader.load_data",
+    "country_lookup": "from app.countries.lookup import convert_country; convert_country('United Kingdom')",
+    # Startup hooks, including the warm-up, and a first request through the ASGI interface
+    "api_first_request": (
+        "from fastapi.testclient import TestClient\n"
+        "from app.routes.main import app\n"
+        "with TestClient(app) as client:\n"
+        "    client.post('/reviews/select', json={'table': 'reviews', 'limit': 1})\n"),
+}
+BASELINE_CODE = "pass"
+
+
+def time_python(code: str) -> float:
+    """
+    Runs `code` in a new interpreter and returns its wall time in seconds.
+    """
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], cwd=PROJECT_DIR, check=True, stdout=subprocess.DEVNULL,
+                   stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def slowest_imports(code: str, top: int = 8) -> list:
+    """
+    Returns the modules imported directly by `code`'s imports with the largest cumulative import time.
+    """
+    output = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=PROJECT_DIR,
+                            capture_output=True, text=True, check=True).stderr
+    imports = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # `-X importtime` indents nested imports by two spaces per level, keep the first level below the
+        # target since deeper imports are included in their parent's time
+        if len(name) - len(name.lstrip()) == 3:
+            imports.append({"module": name.strip(), "ms": round(int(cumulative) / 1000, 1)})
+    return sorted(imports, key=lambda entry: entry["ms"], reverse=True)[:top]
+
+
+def run_benchmarks(repeat: int) -> dict:
+    baseline = statistics.median(time_python(BASELINE_CODE) for _ in range(repeat))
+    print(f"  {'empty interpreter':<20} {baseline * 1000:9.1f} ms")
+    targets = []
+    for name, code in TARGETS.items():
+        timings = [time_python(code) - baseline for _ in range(repeat)]
+        targets.append({
+            "name": name,
+            "median_ms": round(statistics.median(timings) * 1000, 1),
+            "min_ms": round(min(timings) * 1000, 1),
+            "slowest_imports": slowest_imports(code),
+        })
+        print(f"  {name:<20} {targets[-1]['median_ms']:9.1f} ms  (min {targets[-1]['min_ms']:.1f} ms)")
+    return {**run_metadata("startup"), "repeat": repeat, "interpreter_ms": round(baseline * 1000, 1),
+            "targets": targets}
+
+
+def compare_results(baseline: dict, current: dict, threshold: float = 0.10) -> bool:
+    """
+    Prints the change in median startup time per target between two result files.
+
+    Returns:
+        bool: True when any target got slower by more than `threshold`.
+    """
+    regressed = False
+    baseline_targets = {target["name"]: target for target in baseline["targets"]}
+    print(f"Comparing {baseline['git_commit']} (baseline) with {current['git_commit']}")
+    for target in current["targets"]:
+        baseline_target = baseline_targets.get(target["name"])
+        if baseline_target is None:
+            continue
+        before, after = baseline_target["median_ms"], target["median_ms"]
+        change, target_regressed = change_flag(before, after, threshold)
+        regressed = regressed or target_regressed
+        flag = "  REGRESSION" if target_regressed else ""
+        print(f"  {target['name']:<20} {before:9.1f} ms -> {after:9.1f} ms  {change:+7.1%}{flag}")
+    return regressed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark import and startup time of the entry points.")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters started per target")
+    parser.add_argument("--label", default=None, help="Name of the results file, defaults to the git commit")
+    parser.add_argument("--compare", default=None, help="Results file of an earlier run to compare with")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Slowdown ratio reported as a regression when comparing")
+    args = parser.parse_args()
+
+    print(f"Measuring startup time, median of {args.repeat} runs")
+    results = run_benchmarks(args.repeat)
+    save_results(results, args.label)
+
+    if args.compare:
+        sys.exit(1 if compare_results(load_results(args.compare), results, args.threshold) else 0)
@@ -0,0 +1,67 @@
+import json
+import os
+import platform
+import subprocess
+import tempfile
+from datetime import datetime, timezone
+
+"""
+This module holds helpers shared by the benchmarks. Importing it points the application at the benchmark
+database (`$BENCH_DIR/bench_reviews.db`) unless `REVIEWS_DB_PATH` is already set, so it must be imported
+before any `app` module.
+"""
+
+BENCH_DIR = os.environ.setdefault("BENCH_DIR", os.path.join(tempfile.gettempdir(), "reviews_benchmarks"))
+os.makedirs(BENCH_DIR, exist_ok=True)
+os.environ.setdefault("REVIEWS_DB_PATH", os.path.join(BENCH_DIR, "bench_reviews.db"))
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_metadata(benchmark: str) -> dict:
+    """
+    Returns the fields identifying a benchmark run, stored at the top of every results file.
+    """
+    from app import config
+    return {
+        "benchmark": benchmark,
+        "git_commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "storage_layout": config.STORAGE_LAYOUT,
+    }
+
+
+def save_results(results: dict, label: str = None) -> str:
+    """
+    Writes results to `benchmarks/results/<benchmark>_<label or git commit>.json`.
+    """
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    results_file = os.path.join(RESULTS_DIR, f"{results['benchmark']}_{label or results['git_commit']}.json")
+    with open(results_file, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {results_file}")
+    return results_file
+
+
+def load_results(results_file: str) -> dict:
+    with open(results_file) as f:
+        return json.load(f)
+
+
+def change_flag(before: float, after: float, threshold: float, higher_is_better: bool = False):
+    """
+    Returns the relative change between two measurements and whether it is a regression.
+    """
+    change = (after - before) / before if before else 0.0
+    regressed = change < -threshold if higher_is_better else change > threshold
+    return change, regressed
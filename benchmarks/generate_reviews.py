@@ -0,0 +1,200 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+"""
+This module generates reproducible synthetic review files with controllable data quality, in the same
+layout as `data/reviews.csv`, for benchmarking the data loader at scale.
+
+Files are written in chunks so multi-million row files never have to fit in memory. The output only depends
+on the row count, the seed, the chunk size and the quality options, so the same command always produces the
+same file.
+"""
+
+CSV_COLUMNS = ["Reviewer Name", "Review Title", "Review Rating", "Review Content", "Email Address", "Country",
+               "Review Date"]
+
+FIRST_NAMES = ["John", "Jane", "Emily", "Michael", "Sarah", "Amy", "Alex", "Peter", "Sophia", "Daniel", "Emma",
+               "Oliver", "Grace", "Liam", "Sophie", "Jake", "Ella", "Noah", "Maria", "Samuel", "Ava", "Lucas",
+               "Mia", "Ethan", "Zoe", "Mateo", "Hana", "Ravi", "Chen", "Fatima"]
+LAST_NAMES = ["Doe", "Smith", "Johnson", "Brown", "Williams", "Jones", "Lee", "Davis", "White", "Miller",
+              "Taylor", "Clark", "Harris", "Martinez", "Garcia", "Walters", "Nguyen", "Kim", "Patel", "Rossi",
+              "Müller", "Dubois", "Silva", "Kowalski", "Tanaka"]
+TITLES = ["Excellent Service", "Great Experience", "Good Service", "Disappointing", "Poor Communication",
+          "Fast Delivery", "Would Recommend", "Never Again", "Average", "Lovely Ambiance", "Best in Town",
+          "Terrible Support"]
+WORDS = ("the service was quick and friendly product arrived on time exactly as described packaging was a "
+         "bit damaged customer support resolved my issue would definitely order again delivery took longer "
+         "than expected quality exceeded my expectations price fair staff helpful website easy to use").split()
+
+# Canonical country names and the messier spellings seen in real review data, which country_converter
+# still resolves
+COUNTRY_VARIANTS = {
+    "United States": ["USA", "US", "United States of America", "U.S.A."],
+    "United Kingdom": ["UK", "U.K.", "Great Britain", "united kingdom", "GBR"],
+    "Canada": ["CAN", "canada", "CA"],
+    "Australia": ["AUS", "australia", "Commonwealth of Australia"],
+    "Germany": ["DEU", "germany", "DE"],
+    "France": ["FRA", "france", "French Republic"],
+    "Spain": ["ESP", "spain"],
+    "Italy": ["ITA", "Italia", "italy"],
+    "Netherlands": ["NLD", "The Netherlands"],
+    "Japan": ["JPN", "japan"],
+    "India": ["IND", "india"],
+    "Brazil": ["BRA", "brazil"],
+    "Mexico": ["MEX", "mexico"],
+    "Ireland": ["IRL", "Republic of Ireland"],
+    "South Korea": ["KOR", "Korea, Republic of", "Republic of Korea"],
+}
+# Values country_converter can't resolve: local-language names, cities and junk
+UNKNOWN_COUNTRIES = ["Deutschland", "España", "Nippon", "Brasil", "Eire", "Holland", "London", "Paris",
+                     "Atlantis", "N/A", "unknown", "-"]
+
+SIZE_PRESETS = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}
+
+
+def generate_chunk(rows: int, seed: int, country_messiness: float = 0.3, unknown_country_ratio: float = 0.01,
+                   invalid_email_ratio: float = 0.05, invalid_rating_ratio: float = 0.02,
+                   min_content_length: int = 50, max_content_length: int = 500) -> pd.DataFrame:
+    """
+    Generates one chunk of synthetic reviews.
+
+    Args:
+        rows (int): Number of rows to generate.
+        seed (int): Seed for the random generator.
+        country_messiness (float): Fraction of countries written as a messy variant, with random case and
+            surrounding whitespace, instead of the canonical name.
+        unknown_country_ratio (float): Fraction of countries that can't be resolved.
+        invalid_email_ratio (float): Fraction of email addresses that fail validation.
+        invalid_rating_ratio (float): Fraction of ratings that fail validation (negative).
+        min_content_length (int): Minimum length of the review content in characters.
+        max_content_length (int): Maximum length of the review content in characters.
+
+    Returns:
+        pd.DataFrame: The reviews, with the column names of `data/reviews.csv`.
+    """
+    rng = np.random.default_rng(seed)
+
+    first = np.array(FIRST_NAMES, dtype=object)[rng.integers(0, len(FIRST_NAMES), rows)]
+    last = np.array(LAST_NAMES, dtype=object)[rng.integers(0, len(LAST_NAMES), rows)]
+    reviewer_names = first + " " + last
+    # Some names arrive untrimmed and in lower case, which the loader standardises
+    messy_names = rng.random(rows) < 0.1
+    if messy_names.any():
+        reviewer_names[messy_names] = "  " + np.char.lower(reviewer_names[messy_names].astype(str)).astype(object)
+
+    emails = (np.char.lower(first.astype(str)).astype(object) + "." + np.char.lower(last.astype(str)).astype(object)
+              + rng.integers(1, 10_000, rows).astype(str).astype(object) + "@example.com")
+    invalid_emails = rng.random(rows) < invalid_email_ratio
+    if invalid_emails.any():
+        emails[invalid_emails] = np.char.replace(emails[invalid_emails].astype(str), "@", "_at_").astype(object)
+
+    ratings = rng.integers(1, 6, rows)
+    ratings[rng.random(rows) < invalid_rating_ratio] = -1
+
+    canonical_names = list(COUNTRY_VARIANTS)
+    country_index = rng.integers(0, len(canonical_names), rows)
+    countries = np.array(canonical_names, dtype=object)[country_index]
+    messy = rng.random(rows) < country_messiness
+    for i in np.flatnonzero(messy):
+        variants = COUNTRY_VARIANTS[countries[i]]
+        variant = variants[rng.integers(0, len(variants))]
+        if rng.random() < 0.3:
+            variant = variant.upper() if rng.random() < 0.5 else variant.lower()
+        countries[i] = " " * int(rng.integers(0, 3)) + variant + " " * int(rng.integers(0, 3))
+    unknown = rng.random(rows) < unknown_country_ratio
+    countries[unknown] = np.array(UNKNOWN_COUNTRIES, dtype=object)[rng.integers(0, len(UNKNOWN_COUNTRIES),
+                                                                               int(unknown.sum()))]
+
+    # Review content is sliced out of a long random text, which keeps generation vectorised
+    corpus = " ".join(np.array(WORDS)[rng.integers(0, len(WORDS), max(2000, max_content_length))])
+    lengths = rng.integers(min_content_length, max_content_length + 1, rows)
+    starts = rng.integers(0, max(1, len(corpus) - max_content_length), rows)
+    contents = [corpus[start:start + length].strip().capitalize() + "."
+                for start, length in zip(starts.tolist(), lengths.tolist())]
+
+    dates = (np.datetime64("2019-01-01") + rng.integers(0, 6 * 365, rows).astype("timedelta64[D]")).astype(str)
+
+    return pd.DataFrame({
+        "Reviewer Name": reviewer_names,
+        "Review Title": np.array(TITLES, dtype=object)[rng.integers(0, len(TITLES), rows)],
+        "Review Rating": ratings,
+        "Review Content": contents,
+        "Email Address": emails,
+        "Country": countries,
+        "Review Date": dates,
+    }, columns=CSV_COLUMNS)
+
+
+def write_reviews_csv(path: str, rows: int, seed: int = 42, chunk_size: int = 100_000, **options) -> str:
+    """
+    Writes `rows` synthetic reviews to a CSV file, one chunk at a time.
+
+    Args:
+        path (str): The output file.
+        rows (int): Total number of rows.
+        seed (int): Base seed, chunk `i` is generated with `seed + i`.
+        chunk_size (int): Rows generated per chunk.
+        **options: Data quality options passed to `generate_chunk`.
+
+    Returns:
+        str: The output file path.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    written = 0
+    chunk_index = 0
+    while written < rows:
+        chunk_rows = min(chunk_size, rows - written)
+        chunk = generate_chunk(chunk_rows, seed + chunk_index, **options)
+        chunk.to_csv(path, mode="w" if chunk_index == 0 else "a", header=chunk_index == 0, index=False)
+        written += chunk_rows
+        chunk_index += 1
+    return path
+
+
+def parse_size(size: str) -> int:
+    """
+    Parses a row count such as "10k", "1m", "10m" or "2500".
+    """
+    size = size.strip().lower()
+    if size in SIZE_PRESETS:
+        return SIZE_PRESETS[size]
+    multipliers = {"k": 1_000, "m": 1_000_000}
+    if size[-1] in multipliers:
+        return int(float(size[:-1]) * multipliers[size[-1]])
+    return int(size)
+
+
+def add_generator_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--country-messiness", type=float, default=0.3,
+                        help="Fraction of countries written as messy variants")
+    parser.add_argument("--unknown-country-ratio", type=float, default=0.01,
+                        help="Fraction of countries that can't be resolved")
+    parser.add_argument("--invalid-email-ratio", type=float, default=0.05, help="Fraction of invalid emails")
+    parser.add_argument("--invalid-rating-ratio", type=float, default=0.02, help="Fraction of invalid ratings")
+    parser.add_argument("--min-content-length", type=int, default=50, help="Minimum review content length")
+    parser.add_argument("--max-content-length", type=int, default=500, help="Maximum review content length")
+
+
+def generator_options(args: argparse.Namespace) -> dict:
+    return {
+        "country_messiness": args.country_messiness,
+        "unknown_country_ratio": args.unknown_country_ratio,
+        "invalid_email_ratio": args.invalid_email_ratio,
+        "invalid_rating_ratio": args.invalid_rating_ratio,
+        "min_content_length": args.min_content_length,
+        "max_content_length": args.max_content_length,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic reviews CSV file.")
+    parser.add_argument("--rows", required=True, help="Number of rows, e.g. 10k, 1m, 10m")
+    parser.add_argument("--out", required=True, help="Path of the CSV file to write")
+    add_generator_arguments(parser)
+    args = parser.parse_args()
+    write_reviews_csv(args.out, parse_size(args.rows), seed=args.seed, **generator_options(args))
+    print(f"Wrote {parse_size(args.rows)} rows to {args.out}")
@@ -0,0 +1,332 @@
+import argparse
+import asyncio
+import logging
+import math
+import os
+import random
+import shutil
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+
+# Imported first, it points the application at the benchmark database
+from benchmarks.common import BENCH_DIR, change_flag, load_results, run_metadata, save_results
+
+import httpx  # noqa: E402
+
+from app import config  # noqa: E402
+from app.database import database  # noqa: E402
+from benchmarks.generate_reviews import generate_chunk, parse_size, write_reviews_csv  # noqa: E402
+
+"""
+This module load tests the Reviews API with a configurable mix of select, insert, update and delete requests
+against a pre-seeded database, and reports requests/sec, p50/p95/p99 latency and error rates per endpoint.
+
+The app is driven in-process through its ASGI interface by default. With `--url` the requests go to a running
+server instead, and `--start-server` launches a local uvicorn on the seeded database:
+
+    python -m benchmarks.load_test --seed-rows 1m --mix select=80,insert=10,update=8,delete=2
+    python -m benchmarks.load_test --start-server --workers 4 --concurrency 64 --duration 60
+"""
+
+ENDPOINTS = {
+    "select": ("POST", "/reviews/select"),
+    "insert": ("POST", "/reviews/insert"),
+    "update": ("PATCH", "/reviews/update"),
+    "delete": ("DELETE", "/reviews/delete"),
+}
+
+
+def parse_mix(mix: str) -> dict:
+    """
+    Parses a traffic mix such as "select=70,insert=10,update=15,delete=5" into relative weights.
+    """
+    weights = {}
+    for part in mix.split(","):
+        endpoint, weight = part.split("=")
+        if endpoint.strip() not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint `{endpoint}` in mix, expected one of {list(ENDPOINTS)}")
+        weights[endpoint.strip()] = float(weight)
+    return weights
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    # Nearest-rank percentile
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(round(fraction * len(sorted_values), 9))
+    index = min(len(sorted_values) - 1, max(0, rank - 1))
+    return sorted_values[index]
+
+
+class RequestFactory:
+    """
+    Builds request bodies for each endpoint, targeting rows that exist in the seeded database.
+    """
+
+    def __init__(self, max_id: int, seed: int):
+        self.rng = random.Random(seed)
+        self.max_id = max_id
+        self.deleted_ids = set()
+        sample = generate_chunk(500, seed, country_messiness=0, unknown_country_ratio=0, invalid_email_ratio=0,
+                                invalid_rating_ratio=0, min_content_length=50, max_content_length=300)
+        sample.columns = [column.lower().replace(" ", "_") for column in sample.columns]
+        sample["reviewer_name"] = sample["reviewer_name"].str.strip().str.title()
+        self.sample_reviews = sample.to_dict("records")
+        self.countries = sorted(sample["country"].unique())
+
+    def existing_id(self) -> int:
+        for _ in range(10):
+            review_id = self.rng.randint(1, self.max_id)
+            if review_id not in self.deleted_ids:
+                return review_id
+        return review_id
+
+    def select(self) -> dict:
+        kind = self.rng.random()
+        if kind < 0.4:
+            conditions = [{"column": "id", "equals": str(self.existing_id())}]
+        elif kind < 0.7:
+            conditions = [{"column": "country", "equals": self.rng.choice(self.countries)}]
+        elif kind < 0.9:
+            year, month = self.rng.randint(2019, 2024), self.rng.randint(1, 12)
+            conditions = [{"column": "review_date", "range": [f"{year}-{month:02d}-01", f"{year}-{month:02d}-28"]}]
+        else:
+            conditions = [{"column": "reviewer_name", "contains": self.rng.choice(["Smith", "Lee", "Ava"])}]
+        return {"table": "reviews", "conditions": conditions, "limit": 50}
+
+    def insert(self) -> list:
+        return self.rng.sample(self.sample_reviews, self.rng.randint(1, 5))
+
+    def update(self) -> dict:
+        return {"conditions": [{"column": "id", "equals": str(self.existing_id())}],
+                "columns_to_update": [{"column_name": "review_title",
+                                       "column_value": f"Updated {self.rng.randint(0, 10 ** 6)}"}]}
+
+    def delete(self) -> list:
+        review_id = self.existing_id()
+        self.deleted_ids.add(review_id)
+        return [{"column": "id", "equals": str(review_id)}]
+
+    def build(self, endpoint: str):
+        method, path = ENDPOINTS[endpoint]
+        return method, path, getattr(self, endpoint)()
+
+
+def classify_error(response: httpx.Response):
+    """
+    Returns None for a successful response, otherwise a short error class such as "database is locked".
+    """
+    if response.status_code < 400:
+        return None
+    # Requests shed by admission control, see `app/routes/admission.py`
+    if response.status_code == 429:
+        return "shed: queue full"
+    if response.status_code == 503 and "queue_timeout" in response.text:
+        return "shed: queue timeout"
+    if "locked" in response.text.lower() or "database is busy" in response.text.lower():
+        return "database is locked"
+    return f"http_{response.status_code}"
+
+
+class LoadTestStats:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(Counter)
+
+    def record(self, endpoint: str, seconds: float, error):
+        self.latencies[endpoint].append(seconds)
+        if error:
+            self.errors[endpoint][error] += 1
+
+    def summary(self, elapsed: float) -> dict:
+        endpoints = {}
+        for endpoint, latencies in sorted(self.latencies.items()):
+            latencies = sorted(latencies)
+            error_count = sum(self.errors[endpoint].values())
+            endpoints[endpoint] = {
+                "requests": len(latencies),
+                "requests_per_second": round(len(latencies) / elapsed, 1),
+                "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+                "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+                "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+                "error_rate": round(error_count / len(latencies), 4),
+                "errors": dict(self.errors[endpoint]),
+            }
+        total = sum(len(latencies) for latencies in self.latencies.values())
+        return {"elapsed_seconds": round(elapsed, 2), "requests": total,
+                "requests_per_second": round(total / elapsed, 1), "endpoints": endpoints}
+
+
+async def worker(client: httpx.AsyncClient, factory: RequestFactory, weights: dict, deadline: float,
+                 stats: LoadTestStats):
+    endpoints, endpoint_weights = list(weights), list(weights.values())
+    while time.perf_counter() < deadline:
+        endpoint = factory.rng.choices(endpoints, endpoint_weights)[0]
+        method, path, body = factory.build(endpoint)
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, path, json=body)
+            error = classify_error(response)
+        except httpx.HTTPError as exc:
+            error = type(exc).__name__
+        stats.record(endpoint, time.perf_counter() - start, error)
+
+
+def db_error_counts() -> dict:
+    # SQLite errors seen by the in-process app, by operation and message
+    from app.monitoring.metrics import DB_ERRORS
+    return {" / ".join(key): child.value for key, child in DB_ERRORS.children.items()}
+
+
+async def run_load(client: httpx.AsyncClient, factory: RequestFactory, weights: dict, concurrency: int,
+                   duration: float) -> dict:
+    stats = LoadTestStats()
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*(worker(client, factory, weights, deadline, stats) for _ in range(concurrency)))
+    return stats.summary(time.perf_counter() - start)
+
+
+async def run_in_process(factory: RequestFactory, weights: dict, concurrency: int, duration: float) -> dict:
+    from app.routes.main import app
+
+    errors_before = db_error_counts()
+    # Run the app's startup and shutdown hooks as a server would
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest") as client:
+            summary = await run_load(client, factory, weights, concurrency, duration)
+    summary["db_errors"] = {key: count - errors_before.get(key, 0) for key, count in db_error_counts().items()
+                            if count - errors_before.get(key, 0)}
+    return summary
+
+
+async def run_against_url(url: str, factory: RequestFactory, weights: dict, concurrency: int,
+                          duration: float) -> dict:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as client:
+        return await run_load(client, factory, weights, concurrency, duration)
+
+
+def seed_database(rows: int, seed: int) -> int:
+    """
+    Fills the benchmark database with `rows` synthetic reviews through the loader, reusing a cached copy.
+
+    Returns:
+        int: The highest review id.
+    """
+    # Each storage layout has its own seeded copy, so layouts can be compared on the same data
+    seeded_copy = os.path.join(BENCH_DIR, f"loadtest_seed_{rows}_{seed}_{config.STORAGE_LAYOUT}.db")
+    if not os.path.exists(seeded_copy):
+        from app.data_loader.load_data import load_data
+        csv_file = os.path.join(BENCH_DIR, f"loadtest_seed_{rows}_{seed}.csv")
+        print(f"Seeding {rows:,} rows, this is done once and cached in {seeded_copy}")
+        write_reviews_csv(csv_file, rows, seed=seed)
+        if os.path.exists(database.db_path):
+            os.remove(database.db_path)
+        database.create_table()
+        load_data("reviews", csv_file)
+        shutil.copyfile(database.db_path, seeded_copy)
+    # Every run starts from the same data
+    shutil.copyfile(seeded_copy, database.db_path)
+    conn = database.create_connection()
+    try:
+        return conn.execute("SELECT MAX(id) FROM reviews").fetchone()[0] or 1
+    finally:
+        conn.close()
+
+
+def start_server(port: int, workers: int) -> subprocess.Popen:
+    command = [sys.executable, "-m", "uvicorn", "app.routes.main:app", "--port", str(port),
+               "--workers", str(workers), "--log-level", "warning"]
+    server = subprocess.Popen(command, env={**os.environ, "LOG_TO_CONSOLE": "false"})
+    for _ in range(100):
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/metrics", timeout=1)
+            return server
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("uvicorn did not start")
+
+
+def print_summary(summary: dict):
+    print(f"{summary['requests']:,} requests in {summary['elapsed_seconds']}s, "
+          f"{summary['requests_per_second']:,} requests/s")
+    print(f"  {'endpoint':<8} {'requests':>9} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>8}")
+    for endpoint, stats in summary["endpoints"].items():
+        print(f"  {endpoint:<8} {stats['requests']:>9,} {stats['requests_per_second']:>9,} {stats['p50_ms']:>9} "
+              f"{stats['p95_ms']:>9} {stats['p99_ms']:>9} {stats['error_rate']:>8.2%}  {stats['errors'] or ''}")
+    if summary.get("db_errors"):
+        print(f"  SQLite errors: {summary['db_errors']}")
+
+
+def compare_results(baseline: dict, current: dict, threshold: float = 0.10) -> bool:
+    """
+    Prints the change in throughput and tail latency per endpoint between two result files.
+
+    Returns:
+        bool: True when throughput dropped or p99 latency grew by more than `threshold`.
+    """
+    regressed = False
+    print(f"Comparing {baseline['git_commit']} (baseline) with {current['git_commit']}")
+    for endpoint, stats in current["summary"]["endpoints"].items():
+        before = baseline["summary"]["endpoints"].get(endpoint)
+        if before is None:
+            continue
+        for key, higher_is_better in (("requests_per_second", True), ("p50_ms", False), ("p99_ms", False)):
+            change, key_regressed = change_flag(before[key], stats[key], threshold, higher_is_better)
+            regressed = regressed or key_regressed
+            flag = "  REGRESSION" if key_regressed else ""
+            print(f"  {endpoint:<8} {key:<20} {before[key]:>10} -> {stats[key]:>10}  {change:+7.1%}{flag}")
+    return regressed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the Reviews API.")
+    parser.add_argument("--seed-rows", default="100k", help="Rows in the pre-seeded database, e.g. 100k, 1m")
+    parser.add_argument("--mix", default="select=70,insert=10,update=15,delete=5",
+                        help="Relative weights of each endpoint")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent clients")
+    parser.add_argument("--duration", type=float, default=30, help="Test duration in seconds")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for data and requests")
+    parser.add_argument("--url", default=None, help="Base URL of a running server, in-process when omitted")
+    parser.add_argument("--start-server", action="store_true", help="Start a local uvicorn on the seeded db")
+    parser.add_argument("--port", type=int, default=8765, help="Port for --start-server")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for --start-server")
+    parser.add_argument("--label", default=None, help="Name of the results file, defaults to the git commit")
+    parser.add_argument("--compare", default=None, help="Results file of an earlier run to compare with")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Change reported as a regression")
+    args = parser.parse_args()
+    # httpx logs every request at INFO
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    max_id = seed_database(parse_size(args.seed_rows), args.seed)
+    request_factory = RequestFactory(max_id, args.seed)
+    mix_weights = parse_mix(args.mix)
+
+    if args.start_server:
+        server_process = start_server(args.port, args.workers)
+        try:
+            load_summary = asyncio.run(run_against_url(f"http://127.0.0.1:{args.port}", request_factory,
+                                                       mix_weights, args.concurrency, args.duration))
+        finally:
+            server_process.terminate()
+            server_process.wait()
+        target = f"uvicorn x{args.workers}"
+    elif args.url:
+        load_summary = asyncio.run(run_against_url(args.url, request_factory, mix_weights, args.concurrency,
+                                                   args.duration))
+        target = args.url
+    else:
+        load_summary = asyncio.run(run_in_process(request_factory, mix_weights, args.concurrency, args.duration))
+        target = "in-process"
+
+    print_summary(load_summary)
+    results = {**run_metadata("loadtest"), "target": target, "seed_rows": parse_size(args.seed_rows),
+               "mix": mix_weights, "concurrency": args.concurrency, "summary": load_summary}
+    save_results(results, args.label)
+    if args.compare:
+        sys.exit(1 if compare_results(load_results(args.compare), results, args.threshold) else 0)
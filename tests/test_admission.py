@@ -0,0 +1,88 @@
+import asyncio
+import sqlite3
+
+import pytest
+from fastapi import HTTPException
+
+from app import config
+from app.database.database import DatabaseBusyError, raise_if_busy
+from app.routes import main
+from app.routes.admission import AdmissionPool
+
+
+@pytest.fixture
+def small_pool(monkeypatch):
+    monkeypatch.setattr(config, "ADMISSION_READ_LIMIT", 1)
+    monkeypatch.setattr(config, "ADMISSION_READ_QUEUE", 1)
+    monkeypatch.setattr(config, "ADMISSION_READ_QUEUE_TIMEOUT_MS", 50)
+    return AdmissionPool("read")
+
+
+def test_pool_queues_then_sheds(small_pool):
+    async def scenario():
+        outcomes = []
+
+        async def request(name, hold):
+            try:
+                async with small_pool.admit("select"):
+                    outcomes.append(f"{name} admitted")
+                    await asyncio.sleep(hold)
+            except HTTPException as error:
+                outcomes.append(f"{name} {error.status_code} retry after {error.headers['Retry-After']}")
+
+        first = asyncio.create_task(request("first", 0.2))
+        await asyncio.sleep(0)
+        queued = asyncio.create_task(request("queued", 0))
+        await asyncio.sleep(0)
+        await request("overflow", 0)
+        await asyncio.gather(first, queued)
+        # The slot is free again once the first request finished
+        await request("later", 0)
+        return outcomes
+
+    assert asyncio.run(scenario()) == ["first admitted", "overflow 429 retry after 1", "queued 503 retry after 1",
+                                       "later admitted"]
+    assert small_pool.active == 0 and not small_pool.waiters
+
+
+def test_released_slot_goes_to_the_next_waiter(small_pool, monkeypatch):
+    monkeypatch.setattr(config, "ADMISSION_READ_QUEUE_TIMEOUT_MS", 1000)
+
+    async def scenario():
+        order = []
+
+        async def request(name):
+            async with small_pool.admit("select"):
+                order.append(name)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(request("first"), request("second"))
+        return order
+
+    assert asyncio.run(scenario()) == ["first", "second"]
+    assert small_pool.active == 0
+
+
+def test_requests_are_shed_with_retry_after(test_client, monkeypatch):
+    monkeypatch.setattr(config, "ADMISSION_WRITE_LIMIT", 0)
+    monkeypatch.setattr(config, "ADMISSION_WRITE_QUEUE", 0)
+
+    response = test_client.delete("/reviews/truncate")
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+    assert 'admission_rejected_total{pool="write",endpoint="truncate",reason="queue_full"}' in \
+        test_client.get("/metrics").text
+
+
+def test_locked_database_is_reported_as_busy(test_client, monkeypatch):
+    with pytest.raises(DatabaseBusyError):
+        raise_if_busy(sqlite3.OperationalError("database is locked"))
+    raise_if_busy(sqlite3.OperationalError("no such column: x"))
+
+    def locked(*args):
+        raise DatabaseBusyError("database is locked")
+
+    monkeypatch.setattr(main, "run_select_query", locked)
+    response = test_client.post("/reviews/select", json={"table": "reviews"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
@@ -0,0 +1,79 @@
+import pytest
+
+from app import config
+from app.crud.create import insert_reviews
+from app.crud.delete import delete_reviews
+from app.crud.update import update_review
+from app.database import database
+from app.database.change_log import prune_change_log
+from app.models.models import ColumnToUpdate, Condition, Review
+from tests.test_integration_api_crud import sample_reviews
+
+
+@pytest.fixture
+def change_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "db_path", str(tmp_path / "reviews.db"))
+    monkeypatch.setattr(config, "CHANGE_FEED_POLL_INTERVAL", 0.01)
+    database.create_table()
+    assert insert_reviews([Review(**review) for review in sample_reviews]) == [1, 2, 3, 4, 5]
+
+
+def test_changes_merge_entries_per_review(change_db, test_client):
+    update_review([Condition(column="id", equals="2")], [ColumnToUpdate(column_name="review_rating", column_value=1)])
+    delete_reviews([Condition(column="id", equals="5")])
+
+    response = test_client.get("/reviews/changes?since=0")
+    assert response.status_code == 200
+    feed = response.json()
+    assert [(change["seq"], change["id"], change["operation"]) for change in feed["changes"]] == [
+        (1, 1, "insert"), (3, 3, "insert"), (4, 4, "insert"), (6, 2, "update"), (7, 5, "delete")]
+    assert feed["changes"][3]["review"]["review_rating"] == 1
+    assert feed["changes"][4]["review"] is None
+    assert feed["last_seq"] == 7 and feed["more"] is False
+
+    page = test_client.get("/reviews/changes?since=0&limit=2").json()
+    assert [change["id"] for change in page["changes"]] == [1, 2]
+    assert page["last_seq"] == 2 and page["more"] is True
+
+
+def test_truncate_is_logged_once(change_db, test_client):
+    delete_reviews([Condition(column="id", equals="1")])
+    delete_reviews()
+    assert insert_reviews([Review(**sample_reviews[1])]) == [1]
+
+    feed = test_client.get("/reviews/changes?since=0").json()
+
+    assert [(change["seq"], change["id"], change["operation"]) for change in feed["changes"]] == [
+        (7, None, "truncate"), (8, 1, "insert")]
+    assert feed["changes"][1]["review"]["reviewer_name"] == sample_reviews[1]["reviewer_name"]
+    conn = database.create_connection()
+    assert conn.execute("SELECT COUNT(*) FROM review_changes;").fetchone()[0] == 8
+    conn.close()
+
+
+def test_long_poll_returns_empty_after_waiting(change_db, test_client):
+    response = test_client.get("/reviews/changes?since=5&wait=0.05")
+
+    assert response.status_code == 200
+    assert response.json() == {"changes": [], "last_seq": 5, "more": False}
+
+
+def test_pruned_changes_expire(change_db, test_client):
+    conn = database.create_connection()
+    assert prune_change_log(conn, retention_days=-1) == 5
+    conn.commit()
+    conn.close()
+
+    response = test_client.get("/reviews/changes?since=0")
+    assert response.status_code == 410
+    assert response.json()["detail"]["last_seq"] == 5
+    assert test_client.get("/reviews/changes?since=5").status_code == 200
+
+
+def test_disabled_change_log(change_db, test_client, monkeypatch):
+    monkeypatch.setattr(config, "CHANGE_LOG", False)
+    delete_reviews()
+
+    assert test_client.get("/reviews/changes").status_code == 404
+    monkeypatch.setattr(config, "CHANGE_LOG", True)
+    assert test_client.get("/reviews/changes?since=5").json()["changes"] == []
@@ -0,0 +1,55 @@
+import itertools
+import json
+import logging
+
+import country_converter as coco
+import pytest
+
+from app.countries.build_snapshot import build_snapshot
+from app.countries.lookup import SNAPSHOT_PATH, convert_country, country_lookup
+from benchmarks.bench_countries import dirty_names
+from benchmarks.generate_reviews import COUNTRY_VARIANTS, UNKNOWN_COUNTRIES
+
+NAMES = (["UK", "uk", " UK ", "826", "4", "04", "gr", "EL", "ind", "Congo", "Korea", "Niger", "Nigeria",
+          "Guinea", "South Sudan", "Asia excluding China", "excluding France", ""]
+         + [variant for variants in COUNTRY_VARIANTS.values() for variant in variants] + list(COUNTRY_VARIANTS)
+         + UNKNOWN_COUNTRIES)
+
+
+@pytest.fixture(scope="module")
+def converter():
+    logging.getLogger("country_converter").setLevel(logging.ERROR)
+    return coco.CountryConverter()
+
+
+@pytest.mark.parametrize("to", ["short_name", "ISO3", "ISO2"])
+def test_lookup_matches_country_converter(converter, to):
+    for name in NAMES + converter.data.name_short.tolist() + converter.data.name_official.tolist():
+        assert convert_country(name, to=to) == converter.convert(name, to=to), name
+
+
+def test_compiled_matcher_matches_every_pattern_in_turn():
+    lookup = country_lookup()
+    names = NAMES + [row["name_short"] for row in lookup.rows] + dirty_names(3000, seed=7)
+    # Characters `re.IGNORECASE` matches with ASCII letters, inside names the literals are taken from
+    names += ["İndia", "ıreland", "ſwitzerland", "Kenya", "Pakiſtan", "Türkİye"]
+    codes = ["".join(pair) for pair in itertools.product("abcdefghijklmnopqrstuvwxyzıK", repeat=2)]
+
+    for matcher, matcher_names in [(lookup.name_matcher, names), (lookup.iso2_matcher, codes)]:
+        for name in matcher_names:
+            assert matcher.search(name) == matcher.scan(name), name
+
+
+def test_snapshot_is_current():
+    # Fails after a country_converter upgrade, run `python -m app.countries.build_snapshot`
+    with open(SNAPSHOT_PATH, encoding="utf-8") as snapshot_file:
+        shipped = json.load(snapshot_file)
+
+    assert shipped == json.loads(json.dumps(build_snapshot()))
+
+
+def test_not_found():
+    assert convert_country("Atlantis", to="short_name") == "not found"
+    assert convert_country("Atlantis", to="ISO3", not_found=None) == "Atlantis"
+    with pytest.raises(KeyError):
+        convert_country("Canada", to="continent")
@@ -0,0 +1,54 @@
+import pytest
+
+from app.crud.create import insert_reviews
+from app.database import database
+from app.database.statistics import analyze, equality_row_estimate, table_row_estimate
+from app.models.models import Review
+from tests.test_integration_api_crud import sample_reviews
+
+
+@pytest.fixture
+def count_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "db_path", str(tmp_path / "reviews.db"))
+    database.create_table()
+    assert insert_reviews([Review(**review) for review in sample_reviews])
+
+
+def select(test_client, count, conditions=()):
+    return test_client.post(f"/reviews/select?count={count}",
+                            json={"table": "reviews", "columns": ["id"], "conditions": list(conditions), "limit": 2})
+
+
+def test_exact_count_ignores_the_limit(count_db, test_client):
+    response = select(test_client, "exact", [{"column": "review_date", "range": ["2024-03-01", "2024-04-30"]}])
+
+    assert response.status_code == 200
+    assert len(response.json()) == 2
+    assert response.headers["X-Total-Count"] == "3"
+    assert response.headers["X-Total-Count-Type"] == "exact"
+
+
+def test_estimated_count_reads_table_statistics(count_db, test_client):
+    # Without statistics the exact count is returned
+    assert select(test_client, "estimated").headers["X-Total-Count-Type"] == "exact"
+    analyze()
+
+    response = select(test_client, "estimated")
+    assert response.headers["X-Total-Count"] == "5"
+    assert response.headers["X-Total-Count-Type"] == "estimated"
+    # A filter the statistics can't answer is counted exactly
+    response = select(test_client, "estimated", [{"column": "reviewer_name", "contains": "Je"}])
+    assert response.headers["X-Total-Count"] == "1"
+    assert response.headers["X-Total-Count-Type"] == "exact"
+
+
+def test_row_estimates(count_db):
+    conn = database.create_connection()
+    assert table_row_estimate(conn, "reviews") is None
+    analyze(conn)
+
+    assert table_row_estimate(conn, "reviews") == 5
+    assert equality_row_estimate(conn, "reviews", "id") == 1
+    assert equality_row_estimate(conn, "reviews", "review_date") == 2
+    assert equality_row_estimate(conn, "reviews", "review_content") is None
+    conn.close()
@@ -1,4 +1,6 @@
-from app.crud.utils import build_where_clause, build_select_query_
+import json
+
+from app.crud.utils import IN_LIST_PARAMS, build_where_clause, build_select_query_
 import pytest
 from app.models.models import Condition, QueryInput
 
@@ -71,3 +73,81 @@ def test_build_entire_select_query(query_input,
     )
     assert actual_base_query == expected_base_query
     assert actual_params == expected_params
+
+
+def test_build_where_clause_epoch_day_dates(monkeypatch):
+    """
+    In "epoch_days" storage mode dates are compared as integer days since 1970-01-01
+    and `contains` matches against the date rendered as ISO-8601 text
+    """
+    monkeypatch.setattr("app.config.REVIEW_DATE_STORAGE", "epoch_days")
+    conditions = [
+        Condition(column="review_date", range=["2024-01-01", "2024-01-31"]),
+        Condition(column="review_date", contains="2024-01"),
+        Condition(column="reviewer_name", equals="John Doe")
+    ]
+
+    actual_where_clause, actual_params = build_where_clause(conditions)
+
+    assert actual_where_clause == ("review_date BETWEEN ? AND ? AND "
+                                   "date(review_date * 86400, 'unixepoch') LIKE ? AND reviewer_name = ?")
+    assert actual_params == [19723, 19753, "%2024-01%", "John Doe"]
+
+
+def test_build_where_clause_epoch_day_invalid_date(monkeypatch):
+    monkeypatch.setattr("app.config.REVIEW_DATE_STORAGE", "epoch_days")
+    with pytest.raises(ValueError):
+        build_where_clause([Condition(column="review_date", equals="not a date")])
+
+
+def test_build_where_clause_in_comparisons_and_or_groups():
+    conditions = [
+        Condition(column="country", **{"in": ["Canada", "Australia"]}),
+        Condition(column="review_rating", gt=2, lte=4),
+        Condition(**{"or": [[Condition(column="reviewer_name", contains="John")],
+                            [Condition(column="review_rating", equals="5"), Condition(column="id", lt=10)]]}),
+    ]
+
+    actual_where_clause, actual_params = build_where_clause(conditions)
+
+    assert actual_where_clause == ("country IN (?, ?) AND review_rating > ? AND review_rating <= ? AND "
+                                   "(reviewer_name LIKE ? OR (review_rating = ? AND id < ?))")
+    assert actual_params == ["Canada", "Australia", 2, 4, "%John%", "5", 10]
+
+
+def test_build_where_clause_long_in_list_is_bound_as_json():
+    ids = list(range(IN_LIST_PARAMS + 1))
+
+    actual_where_clause, actual_params = build_where_clause([Condition(column="id", in_=ids)])
+
+    assert actual_where_clause == "id IN (SELECT value FROM json_each(?))"
+    assert json.loads(actual_params[0]) == ids
+
+
+def test_condition_requires_a_column_outside_or_groups():
+    with pytest.raises(ValueError):
+        Condition(gt=1)
+    with pytest.raises(ValueError):
+        Condition(column="id", **{"or": [[Condition(column="id", equals="1")]]})
+
+
+@pytest.mark.parametrize("fields", [
+    {"column": "id"},
+    {"column": "id", "in": []},
+    {"column": "review_date", "range": ["2024-01-01"]},
+    {"or": []},
+    {"or": [[Condition(column="id", equals="1")], []]},
+])
+def test_condition_rejects_conditions_matching_every_row_or_none(fields):
+    with pytest.raises(ValueError):
+        Condition(**fields)
+
+
+def test_build_where_clause_range_then_contains_then_equals():
+    actual_where_clause, actual_params = build_where_clause([
+        Condition(column="reviewer_name", contains="John", equals="John Doe"),
+        Condition(column="review_rating", range=["2", "4"], contains="3", equals="5", gt=1),
+    ])
+
+    assert actual_where_clause == "reviewer_name LIKE ? AND review_rating BETWEEN ? AND ? AND review_rating > ?"
+    assert actual_params == ["%John%", "2", "4", 1]
@@ -3,6 +3,10 @@ import pytest
 import pandas as pd
 import datetime as dt
 
+from app import config
+from app.data_loader.data_loader_logger import data_loader_logger
+from app.database.database import base_dir
+
 TEST_DF = pd.DataFrame(data={
     "Col 1": [1, 2, 3],
     "Col 2": ['Hello', 'World', "!"],
@@ -98,6 +102,20 @@ def test_validate_and_convert_dtype():
     assert actual_df['object_column'].dtype == expected_df['object_column'].dtype
 
 
+def test_validate_and_convert_dtype_datetime64():
+    """
+    Test `datetime64[ns]` conversion keeps a vectorised datetime column, unparseable values become NaT,
+    and converting it for "epoch_days" storage gives whole days since 1970-01-01
+    """
+    test_df = pd.DataFrame(data={"review_date": ["2024-02-23", "not a date", "1969-12-31"]})
+
+    actual_df = validate_and_convert_dtypes(test_df, {"review_date": "datetime64[ns]"})
+
+    assert actual_df["review_date"].dtype == "datetime64[ns]"
+    assert actual_df["review_date"].isna().tolist() == [False, True, False]
+    assert to_epoch_days(actual_df["review_date"]).tolist() == [19776, pd.NA, -1]
+
+
 def test_convert_col_names():
     # Desired outcome
     expected_df = pd.DataFrame(data={
@@ -116,3 +134,35 @@ def test_convert_col_names():
 
 def test_clean_and_transform_data():
     pass
+
+
+def test_prepare_data_for_loading_compact_dtypes(monkeypatch, caplog):
+    """
+    Compact mode gives categorical country columns, compact strings and small integer ratings, with the same
+    rows and values as the default mode, and reports the DataFrame memory after each stage
+    """
+    test_data_file = f"{base_dir.replace('app', '')}/tests/test_reviews.csv"
+    default_df = prepare_data_for_loading(test_data_file)
+    monkeypatch.setattr(config, "COMPACT_DTYPES", True)
+    monkeypatch.setattr(config, "REPORT_DATAFRAME_MEMORY", True)
+
+    with caplog.at_level("INFO", logger=data_loader_logger.name):
+        compact_df = prepare_data_for_loading(test_data_file)
+
+    assert isinstance(compact_df["country"].dtype, pd.CategoricalDtype)
+    assert isinstance(compact_df["country_code"].dtype, pd.CategoricalDtype)
+    assert isinstance(compact_df["review_content"].dtype, pd.StringDtype)
+    assert compact_df["review_rating"].dtype == "int8"
+    assert dataframe_memory_mb(compact_df) < dataframe_memory_mb(default_df)
+    for column in default_df.columns:
+        assert compact_df[column].astype(object).tolist() == default_df[column].astype(object).tolist(), column
+    reported_stages = [stage.__name__ for stage in PREPARATION_STAGES]
+    memory_messages = [record.getMessage() for record in caplog.records if "DataFrame memory" in record.getMessage()]
+    assert [stage for stage in reported_stages if any(stage in message for message in memory_messages)] \
+        == reported_stages
+
+
+def test_convert_column_dtype_small_int_rejects_missing_ratings():
+    with pytest.raises(InvalidColumnDtype):
+        convert_column_dtype(pd.Series([5, None, 3]), "small_int")
+    assert convert_column_dtype(pd.Series([5, 1, 3]), "small_int").dtype == "int8"
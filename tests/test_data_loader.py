@@ -1,10 +1,21 @@
+import json
+import os
+import sqlite3
 
+import pytest
+
+from app import config
+from app.data_loader import load_data as load_data_module
 from app.data_loader.data_cleaning_and_transformation import prepare_data_for_loading
+from app.data_loader.load_data import load_data
+from app.database import database
+from app.database.data_version import read_data_version
 from app.database.database import base_dir
 
+test_data_file = f"{base_dir.replace('app', '')}/tests/test_reviews.csv"
+
 
 def test_data_loading(test_db):
-    test_data_file = f"{base_dir.replace('app', '')}/tests/test_reviews.csv"
     df = prepare_data_for_loading(test_data_file)
     df.to_sql("reviews", test_db, if_exists='append', index=False)
 
@@ -15,3 +26,98 @@ def test_data_loading(test_db):
 
     expected_row_count = 16
     assert len(data) == expected_row_count
+
+
+@pytest.fixture
+def load_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "db_path", str(tmp_path / "reviews.db"))
+    database.create_table()
+
+
+def recorded_runs():
+    conn = sqlite3.connect(database.db_path)
+    runs = conn.execute("SELECT status, rows_loaded, stages, profile_path, error FROM load_runs ORDER BY id;").fetchall()
+    conn.close()
+    return runs
+
+
+def test_load_runs_record_each_stage(load_db, tmp_path):
+    run = load_data("reviews", test_data_file, profile=True, profile_dir=str(tmp_path / "profiles"))
+
+    [(status, rows_loaded, stages, profile_path, error)] = recorded_runs()
+    stages = json.loads(stages)
+    assert (status, rows_loaded, error) == ("completed", 16, None)
+    assert [stage["stage"] for stage in stages] == [
+        "read_csv", "convert_col_names", "convert_to_expected_dtypes", "convert_country_names",
+        "standardize_reviewer_names", "validate_emails_and_ratings", "convert_dates_for_storage", "to_sql", "analyze"]
+    validation = stages[5]
+    assert (validation["rows_in"], validation["rows_out"]) == (18, 16)
+    assert all(stage["wall_seconds"] >= 0 and stage["cpu_seconds"] >= 0 and stage["peak_rss_mb"] > 0
+               and "traced_peak_mb" in stage for stage in stages)
+    assert os.path.exists(profile_path) and os.path.exists(profile_path.replace(".prof", ".tracemalloc.txt"))
+    assert "validate_emails_and_ratings" in run.summary()
+
+
+def test_failed_load_is_recorded_without_its_rows(load_db, tmp_path):
+    bad_file = tmp_path / "reviews.csv"
+    bad_file.write_text("Reviewer Name,Review Title\nSomeone,Something\n")
+
+    with pytest.raises(Exception):
+        load_data("reviews", str(bad_file))
+
+    [(status, rows_loaded, stages, profile_path, error)] = recorded_runs()
+    assert status == "failed" and error
+    assert rows_loaded is None and profile_path is None
+    conn = sqlite3.connect(database.db_path)
+    assert conn.execute("SELECT COUNT(*) FROM reviews;").fetchone()[0] == 0
+    conn.close()
+
+
+@pytest.mark.parametrize("layout", ["single", "split", "partitioned"])
+def test_load_failing_after_the_write_keeps_no_rows(layout, tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "STORAGE_LAYOUT", layout)
+    monkeypatch.setattr(config, "CHANGE_LOG", True)
+    monkeypatch.setattr(database, "db_path", str(tmp_path / "reviews.db"))
+    database.create_table()
+
+    def fail(conn):
+        # The rows are written by now
+        assert conn.execute("SELECT COUNT(*) FROM reviews;").fetchone()[0] == 16
+        raise sqlite3.OperationalError("disk I/O error")
+
+    monkeypatch.setattr(load_data_module, "analyze", fail)
+    with pytest.raises(sqlite3.OperationalError):
+        load_data("reviews", test_data_file)
+
+    [(status, rows_loaded, stages, profile_path, error)] = recorded_runs()
+    assert (status, rows_loaded, error) == ("failed", None, "disk I/O error")
+    conn = sqlite3.connect(database.db_path)
+    assert conn.execute("SELECT COUNT(*) FROM reviews;").fetchone()[0] == 0
+    assert conn.execute("SELECT COUNT(*) FROM review_changes;").fetchone()[0] == 0
+    conn.close()
+
+
+def test_loaded_rows_are_logged_in_their_transaction(load_db, monkeypatch):
+    monkeypatch.setattr(config, "CHANGE_LOG", True)
+    conn = database.create_connection()
+    version = read_data_version(conn)
+    conn.close()
+
+    log_matching = load_data_module.log_matching
+
+    def fail(conn, *args):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(load_data_module, "log_matching", fail)
+    with pytest.raises(sqlite3.OperationalError):
+        load_data("reviews", test_data_file)
+    monkeypatch.setattr(load_data_module, "log_matching", log_matching)
+    conn = sqlite3.connect(database.db_path)
+    assert conn.execute("SELECT COUNT(*) FROM reviews;").fetchone()[0] == 0
+    conn.close()
+
+    load_data("reviews", test_data_file)
+    conn = database.create_connection()
+    assert conn.execute("SELECT COUNT(*) FROM review_changes WHERE operation = 'insert';").fetchone()[0] == 16
+    assert read_data_version(conn) != version
+    conn.close()
@@ -0,0 +1,92 @@
+import pytest
+
+from app.crud.create import insert_reviews
+from app.database import database
+from app.database.change_log import UPDATE, log_changes
+from app.database.read_replica import REPLICA
+from app.models.models import Review
+from app.routes import main
+from tests.test_integration_api_crud import sample_reviews
+
+QUERY = {"table": "reviews", "columns": ["id", "review_title"], "conditions": [{"column": "review_rating", "gte": 5}]}
+
+
+@pytest.fixture
+def etag_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "db_path", str(tmp_path / "reviews.db"))
+    database.create_table()
+    assert insert_reviews([Review(**review) for review in sample_reviews])
+
+
+def select(test_client, etag=None, query=QUERY):
+    headers = {"If-None-Match": etag} if etag else {}
+    return test_client.post("/reviews/select", json=query, headers=headers)
+
+
+def test_unchanged_results_are_answered_with_304(etag_db, test_client, monkeypatch):
+    first = select(test_client)
+    etag = first.headers["ETag"]
+
+    run_select_query = main.run_select_query
+
+    def fail(*args):
+        raise AssertionError("the query ran")
+
+    monkeypatch.setattr(main, "run_select_query", fail)
+    response = select(test_client, f'W/{etag}, "other"')
+
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+    # Another query, or the same one with a count, has its own tag
+    monkeypatch.setattr(main, "run_select_query", run_select_query)
+    assert select(test_client, etag, {**QUERY, "limit": 2}).status_code == 200
+    assert test_client.post("/reviews/select?count=exact", json=QUERY,
+                            headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_writes_change_the_etag(etag_db, test_client):
+    etags = [select(test_client).headers["ETag"]]
+
+    test_client.post("/reviews/insert", json=sample_reviews[:1])
+    etags.append(select(test_client).headers["ETag"])
+    test_client.patch("/reviews/update", json={"conditions": [{"column": "id", "equals": "2"}],
+                                               "columns_to_update": [{"column_name": "review_title",
+                                                                      "column_value": "Changed"}]})
+    etags.append(select(test_client).headers["ETag"])
+    test_client.request("DELETE", "/reviews/delete", json=[{"column": "id", "equals": "1"}])
+    etags.append(select(test_client).headers["ETag"])
+
+    assert len(set(etags)) == 4
+    response = select(test_client, etags[0])
+    assert response.status_code == 200
+    assert {"id": 2, "review_title": "Changed"} in response.json()
+
+
+def test_batch_responses_are_tagged(etag_db, test_client):
+    first = test_client.post("/reviews/select/batch", json=[QUERY, {"table": "reviews", "limit": 1}])
+
+    response = test_client.post("/reviews/select/batch", json=[QUERY, {"table": "reviews", "limit": 1}],
+                                headers={"If-None-Match": first.headers["ETag"]})
+
+    assert response.status_code == 304
+
+
+def test_replica_etag_follows_its_syncs(etag_db, test_client):
+    REPLICA.load()
+    try:
+        etag = select(test_client).headers["ETag"]
+        disk = database.create_connection()
+        disk.execute("UPDATE reviews SET review_title = 'Elsewhere' WHERE id = 2;")
+        log_changes(disk, [2], UPDATE)
+        disk.commit()
+        disk.close()
+
+        # The replica still holds the data the tag was given for
+        assert select(test_client, etag).status_code == 304
+        REPLICA.sync()
+        response = select(test_client, etag)
+        assert response.status_code == 200
+        assert {"id": 2, "review_title": "Elsewhere"} in response.json()
+    finally:
+        REPLICA.close()
@@ -0,0 +1,36 @@
+import pandas as pd
+
+from app.data_loader.data_cleaning_and_transformation import prepare_data_for_loading
+from benchmarks.generate_reviews import CSV_COLUMNS, generate_chunk, parse_size, write_reviews_csv
+
+
+def test_generate_chunk_is_reproducible():
+    pd.testing.assert_frame_equal(generate_chunk(200, seed=7), generate_chunk(200, seed=7))
+    assert not generate_chunk(200, seed=7).equals(generate_chunk(200, seed=8))
+
+
+def test_generate_chunk_controls_data_quality():
+    df = generate_chunk(2000, seed=1, country_messiness=0, unknown_country_ratio=0, invalid_email_ratio=0.5,
+                        invalid_rating_ratio=0, min_content_length=20, max_content_length=30)
+
+    assert list(df.columns) == CSV_COLUMNS
+    assert 0.4 < (~df["Email Address"].str.contains("@")).mean() < 0.6
+    assert (df["Review Rating"] >= 1).all()
+    assert df["Review Content"].str.len().between(10, 31).all()
+    # Without messiness every country is a canonical name
+    assert df["Country"].str.strip().eq(df["Country"]).all()
+
+
+def test_generated_file_runs_through_the_loader(tmp_path):
+    csv_file = write_reviews_csv(str(tmp_path / "reviews.csv"), rows=500, seed=3, chunk_size=200,
+                                 invalid_email_ratio=0.1, invalid_rating_ratio=0.1)
+
+    df = prepare_data_for_loading(csv_file)
+
+    assert 300 < len(df) < 500
+    assert (df["review_rating"] >= 0).all()
+
+
+def test_parse_size():
+    assert [parse_size(size) for size in ["10k", "1m", "10M", "2.5k", "123"]] == [10_000, 1_000_000,
+                                                                                 10_000_000, 2_500, 123]
@@ -1,3 +1,6 @@
+import pytest
+
+
 # Sample data for testing
 sample_reviews = [
     {
@@ -143,6 +146,35 @@ def test_update_specific_reviews(test_db, test_client):
     assert actual_updated_row == expected_updated_row
 
 
+def test_batch_update_reviews(test_db, test_client):
+    """
+    This test shows that a batch update applies different changes to each review and reports each item
+    """
+    test_client.delete("/reviews/truncate")
+    inserted_ids = test_client.post("/reviews/insert", json=sample_reviews[:3]).json()["inserted_ids"]
+    missing_id = max(inserted_ids) + 100
+
+    response = test_client.patch("/reviews/update/batch", json=[
+        {"id": inserted_ids[0], "changes": [{"column_name": "review_title", "column_value": "First"}]},
+        {"id": inserted_ids[1], "changes": [{"column_name": "review_title", "column_value": "Second"}]},
+        {"id": inserted_ids[2], "changes": [{"column_name": "review_rating", "column_value": 1},
+                                            {"column_name": "review_date", "column_value": "2024-01-02"}]},
+        {"id": missing_id, "changes": [{"column_name": "review_title", "column_value": "Missing"}]},
+        {"id": inserted_ids[0], "changes": [{"column_name": "id", "column_value": 99}]},
+    ])
+    assert response.status_code == 201
+    assert response.json()["num_updated_rows"] == 3
+    assert [result["status"] for result in response.json()["results"]] == [
+        "updated", "updated", "updated", "not_found", "invalid"]
+
+    d = {"table": "reviews", "columns": ["id", "review_title", "review_rating", "review_date"]}
+    rows = {row["id"]: row for row in test_client.post("/reviews/select", json=d).json()}
+    assert rows[inserted_ids[0]]["review_title"] == "First"
+    assert rows[inserted_ids[1]]["review_title"] == "Second"
+    assert rows[inserted_ids[2]]["review_rating"] == 1
+    assert rows[inserted_ids[2]]["review_date"] == "2024-01-02"
+
+
 def test_delete_specific_reviews(test_db, test_client):
     test_client.delete("/reviews/truncate")
     # Insert all rows into table
@@ -168,3 +200,67 @@ def test_delete_specific_reviews(test_db, test_client):
     response = test_client.post("reviews/select", json=d)
     assert len(response.json()) == 0
 
+
+
+def test_in_comparison_and_or_conditions(test_db, test_client):
+    test_client.delete("/reviews/truncate")
+    inserted_ids = test_client.post("/reviews/insert", json=sample_reviews).json()["inserted_ids"]
+
+    def selected_names(conditions):
+        response = test_client.post("/reviews/select", json={"table": "reviews", "columns": ["reviewer_name"],
+                                                              "conditions": conditions})
+        assert response.status_code == 200
+        return sorted(row["reviewer_name"] for row in response.json())
+
+    assert selected_names([{"column": "id", "in": inserted_ids[:2]}]) == ["Danny Walters", "Jeff Bezos"]
+    assert selected_names([{"column": "country", "in": ["Canada", "Australia"]},
+                           {"column": "review_rating", "gte": 5}]) == ["Maria Garcia"]
+    assert selected_names([{"column": "review_date", "gt": "2024-03-03", "lte": "2024-05-21"}]) == \
+        ["Alexa Johnson", "Samuel Lee"]
+    assert selected_names([{"or": [[{"column": "reviewer_name", "contains": "Jeff"}],
+                                   [{"column": "country", "equals": "United Kingdom"},
+                                    {"column": "review_rating", "lt": 5}]]}]) == ["Jeff Bezos", "Samuel Lee"]
+
+    # The same conditions drive updates and deletes
+    response = test_client.patch("/reviews/update", json={
+        "conditions": [{"column": "review_rating", "lt": 5}],
+        "columns_to_update": [{"column_name": "review_title", "column_value": "Four stars"}]})
+    assert response.json()["num_updated_rows"] == 2
+    response = test_client.request("DELETE", "/reviews/delete", json=[
+        {"or": [[{"column": "id", "in": inserted_ids[:1]}], [{"column": "review_title", "equals": "Four stars"}]]}])
+    assert response.json()["num_deleted_rows"] == 3
+    assert selected_names([]) == ["Jeff Bezos", "Maria Garcia"]
+
+
+@pytest.mark.parametrize("condition", [
+    {"or": [[{"column": "id", "equals": "999999"}], []]},
+    {"or": []},
+    {"column": "id", "in": []},
+    {"column": "id"},
+])
+def test_empty_conditions_are_rejected(test_db, test_client, condition):
+    response = test_client.post("/reviews/select", json={"table": "reviews", "conditions": [condition]})
+    assert response.status_code == 422
+    response = test_client.request("DELETE", "/reviews/delete", json=[condition])
+    assert response.status_code == 422
+
+
+@pytest.mark.parametrize("storage", ["iso", "epoch_days"])
+def test_numeric_review_dates_are_rejected(test_db, test_client, monkeypatch, storage):
+    monkeypatch.setattr("app.config.REVIEW_DATE_STORAGE", storage)
+    test_client.delete("/reviews/truncate")
+    inserted_ids = test_client.post("/reviews/insert", json=sample_reviews[:2]).json()["inserted_ids"]
+
+    for condition in [{"gt": 19000}, {"lte": 19000}, {"in": [19000, 19001]}]:
+        response = test_client.post("/reviews/select", json={"table": "reviews",
+                                                              "conditions": [{"column": "review_date", **condition}]})
+        assert response.status_code == 400, condition
+    response = test_client.patch("/reviews/update", json={
+        "conditions": [{"column": "id", "equals": str(inserted_ids[0])}],
+        "columns_to_update": [{"column_name": "review_date", "column_value": 19000}]})
+    assert response.status_code == 400
+    response = test_client.patch("/reviews/update/batch", json=[
+        {"id": inserted_ids[0], "changes": [{"column_name": "review_date", "column_value": 19000}]},
+        {"id": inserted_ids[1], "changes": [{"column_name": "review_title", "column_value": "Still applied"}]}])
+    assert response.status_code == 201
+    assert [result["status"] for result in response.json()["results"]] == ["invalid", "updated"]
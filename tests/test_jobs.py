@@ -0,0 +1,55 @@
+import time
+
+from app import config
+from tests.test_integration_api_crud import sample_reviews
+
+
+def wait_for_job(test_client, job_id: str, timeout: float = 5.0) -> dict:
+    deadline = time.monotonic() + timeout
+    while True:
+        job = test_client.get(f"/jobs/{job_id}").json()
+        if job["status"] not in ("pending", "running") or time.monotonic() > deadline:
+            return job
+        time.sleep(0.01)
+
+
+def test_background_delete_runs_in_batches(test_db, test_client, monkeypatch):
+    monkeypatch.setattr(config, "JOB_BATCH_SIZE", 2)
+    monkeypatch.setattr(config, "JOB_BATCH_PAUSE_MS", 0)
+    test_client.delete("/reviews/truncate")
+    test_client.post("/reviews/insert", json=sample_reviews)
+
+    response = test_client.request("DELETE", "/reviews/delete?background=true",
+                                   json=[{"column": "country", "contains": "United"}])
+    assert response.status_code == 202
+    assert response.headers["location"] == f"/jobs/{response.json()['id']}"
+
+    job = wait_for_job(test_client, response.json()["id"])
+    assert job["status"] == "completed"
+    assert (job["total"], job["processed"], job["batches"]) == (3, 3, 2)
+    remaining = test_client.post("/reviews/select", json={"table": "reviews", "columns": ["country"]}).json()
+    assert sorted(row["country"] for row in remaining) == ["Australia", "Canada"]
+
+
+def test_background_update(test_db, test_client, monkeypatch):
+    monkeypatch.setattr(config, "JOB_BATCH_PAUSE_MS", 0)
+    test_client.delete("/reviews/truncate")
+    test_client.post("/reviews/insert", json=sample_reviews)
+
+    response = test_client.patch("/reviews/update?background=true", json={
+        "conditions": [{"column": "review_rating", "equals": "4"}],
+        "columns_to_update": [{"column_name": "review_title", "column_value": "Four stars"}]})
+    job = wait_for_job(test_client, response.json()["id"])
+
+    assert job["status"] == "completed" and job["processed"] == 2
+    rows = test_client.post("/reviews/select", json={
+        "table": "reviews", "columns": ["review_title"],
+        "conditions": [{"column": "review_rating", "equals": "4"}]}).json()
+    assert [row["review_title"] for row in rows] == ["Four stars", "Four stars"]
+
+
+def test_background_update_rejects_unknown_columns(test_db, test_client):
+    response = test_client.patch("/reviews/update?background=true", json={
+        "conditions": [], "columns_to_update": [{"column_name": "id", "column_value": 1}]})
+    assert response.status_code == 400
+    assert test_client.get("/jobs/missing").status_code == 404
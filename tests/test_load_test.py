@@ -0,0 +1,37 @@
+import httpx
+import pytest
+
+from benchmarks.load_test import LoadTestStats, classify_error, parse_mix, percentile
+
+
+def test_parse_mix():
+    assert parse_mix("select=70, insert=10,update=15,delete=5") == {"select": 70, "insert": 10, "update": 15,
+                                                                     "delete": 5}
+    with pytest.raises(ValueError):
+        parse_mix("select=50,upsert=50")
+
+
+@pytest.mark.parametrize("fraction, expected", [(0.5, 50), (0.95, 95), (0.99, 99), (1.0, 100)])
+def test_percentile(fraction, expected):
+    assert percentile(list(range(1, 101)), fraction) == expected
+
+
+def test_classify_error():
+    assert classify_error(httpx.Response(200, json={})) is None
+    assert classify_error(httpx.Response(400, text="database is locked")) == "database is locked"
+    assert classify_error(httpx.Response(422, json={"detail": "invalid"})) == "http_422"
+
+
+def test_load_test_stats_summary():
+    stats = LoadTestStats()
+    for latency in (0.01, 0.02, 0.03, 0.04):
+        stats.record("select", latency, None)
+    stats.record("insert", 0.05, "database is locked")
+
+    summary = stats.summary(elapsed=2.0)
+
+    assert summary["requests"] == 5
+    assert summary["requests_per_second"] == 2.5
+    assert summary["endpoints"]["select"]["p50_ms"] == 20.0
+    assert summary["endpoints"]["insert"]["error_rate"] == 1.0
+    assert summary["endpoints"]["insert"]["errors"] == {"database is locked": 1}
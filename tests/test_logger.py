@@ -0,0 +1,68 @@
+import json
+import logging
+import queue
+
+import pytest
+
+from app.logger import (JsonLinesFormatter, LazyQueueHandler, SamplingFilter, TruncatingFormatter,
+                        truncate_message)
+
+
+def make_record(msg, args=(), level=logging.INFO):
+    return logging.LogRecord("test", level, __file__, 1, msg, args, None)
+
+
+@pytest.mark.parametrize("message, max_chars, expected", [
+    ("short", 10, "short"),
+    ("a" * 12, 10, "aaaaaaaaaa... [truncated 2 chars]"),
+    ("a" * 12, 0, "a" * 12),  # 0 disables the cap
+])
+def test_truncate_message(message, max_chars, expected):
+    assert truncate_message(message, max_chars) == expected
+
+
+def test_truncating_formatter_caps_message():
+    formatter = TruncatingFormatter(fmt="%(message)s", max_message_chars=5)
+    record = make_record("rows: %s", ("x" * 100,))
+
+    assert formatter.format(record) == "rows:... [truncated 101 chars]"
+    # The original record is left untouched for other handlers
+    assert record.getMessage() == "rows: " + "x" * 100
+
+
+def test_json_lines_formatter():
+    formatter = JsonLinesFormatter(max_message_chars=100)
+
+    line = formatter.format(make_record("Loaded %s rows into `%s`", (16, "reviews"), level=logging.WARNING))
+
+    entry = json.loads(line)
+    assert entry["logger"] == "test"
+    assert entry["level"] == "WARNING"
+    assert entry["message"] == "Loaded 16 rows into `reviews`"
+
+
+def test_sampling_filter_always_keeps_warnings():
+    sampling_filter = SamplingFilter(sample_rate=0)
+
+    assert not sampling_filter.filter(make_record("info", level=logging.INFO))
+    assert sampling_filter.filter(make_record("warning", level=logging.WARNING))
+
+
+def test_lazy_queue_handler_defers_formatting_and_drops_when_full():
+    class CountingArg:
+        calls = 0
+
+        def __str__(self):
+            CountingArg.calls += 1
+            return "arg"
+
+    log_queue = queue.Queue(maxsize=1)
+    handler = LazyQueueHandler(log_queue)
+    dropped_before = LazyQueueHandler.dropped_records
+
+    handler.handle(make_record("value %s", (CountingArg(),)))
+    handler.handle(make_record("value %s", (CountingArg(),)))
+
+    assert CountingArg.calls == 0  # Nothing is formatted on the calling thread
+    assert log_queue.get_nowait().getMessage() == "value arg"
+    assert LazyQueueHandler.dropped_records == dropped_before + 1
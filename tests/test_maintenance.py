@@ -0,0 +1,100 @@
+import threading
+import time
+
+import pytest
+
+from app import config
+from app.crud.create import insert_reviews
+from app.crud.delete import delete_reviews
+from app.database import database
+from app.database.maintenance import TASKS, run_due_tasks
+from app.database.tuning import apply_profile, connection_settings
+from app.models.models import Review
+from app.routes.middleware import ACTIVITY, is_tracked
+from tests.test_integration_api_crud import sample_reviews
+
+
+@pytest.fixture
+def maintenance_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "db_path", str(tmp_path / "reviews.db"))
+    database.create_table()
+    assert insert_reviews([Review(**review) for review in sample_reviews])
+
+
+def test_profiles_apply_connection_settings(maintenance_db, monkeypatch):
+    monkeypatch.setattr(config, "STORAGE_PROFILE", "read_heavy")
+    conn = database.create_connection()
+    settings = connection_settings(conn)
+    conn.close()
+    assert settings["journal_mode"] == "wal"
+    # NORMAL, KiB cache size, MEMORY
+    assert (settings["synchronous"], settings["cache_size"], settings["temp_store"]) == (1, -64 * 1024, 2)
+
+    # The bulk load profile leaves WAL, which is possible with no other connection open
+    conn = database.create_connection("bulk_load")
+    assert connection_settings(conn)["journal_mode"] == "memory"
+    assert connection_settings(conn)["synchronous"] == 0
+    conn.close()
+
+    conn = database.create_connection()
+    with pytest.raises(ValueError):
+        apply_profile(conn, "fastest")
+    conn.close()
+
+
+def test_due_tasks_run_once_per_interval(maintenance_db):
+    first_run = run_due_tasks()
+
+    assert set(first_run) == set(TASKS)
+    assert all(result["status"] == "completed" for result in first_run.values())
+    assert run_due_tasks() == {}
+    assert set(run_due_tasks(force=True)) == set(TASKS)
+
+
+def test_maintenance_stops_when_activity_resumes(maintenance_db):
+    checks = []
+
+    results = run_due_tasks(keep_going=lambda: checks.append(1) or len(checks) < 2)
+
+    assert list(results) == ["optimize"]
+
+
+def test_vacuum_releases_pages_freed_by_deletes(maintenance_db):
+    assert insert_reviews([Review(**{**review, "review_content": "x" * 20000})
+                           for review in sample_reviews * 20])
+    assert delete_reviews()
+    conn = database.create_connection()
+    assert conn.execute("PRAGMA freelist_count;").fetchone()[0] > 0
+    conn.close()
+
+    result = run_due_tasks(force=True)["vacuum"]
+
+    assert result["detail"].startswith("released")
+    conn = database.create_connection()
+    assert conn.execute("PRAGMA freelist_count;").fetchone()[0] == 0
+    conn.close()
+
+
+def test_maintenance_endpoints(maintenance_db, test_client):
+    response = test_client.post("/admin/maintenance?force=true")
+    assert response.status_code == 200
+    assert set(response.json()["tasks"]) == set(TASKS)
+
+    tasks = test_client.get("/admin/maintenance").json()["tasks"]
+    assert [task["task"] for task in tasks] == list(TASKS)
+    assert all(task["status"] == "completed" and task["last_run"] for task in tasks)
+
+
+def test_change_feed_streams_and_long_polls_are_not_activity(maintenance_db, test_client, monkeypatch):
+    monkeypatch.setattr(config, "CHANGE_FEED_POLL_INTERVAL", 0.01)
+    assert is_tracked({"path": "/reviews/changes", "query_string": b"since=3"})
+    assert is_tracked({"path": "/reviews/select", "query_string": b"stream=true"})
+    assert not is_tracked({"path": "/reviews/changes", "query_string": b"since=3&stream=true"})
+
+    poll = threading.Thread(target=test_client.get, args=("/reviews/changes?since=1000&wait=0.5",))
+    poll.start()
+    time.sleep(0.2)
+    try:
+        assert ACTIVITY.in_flight == 0
+    finally:
+        poll.join()
@@ -0,0 +1,39 @@
+from app.monitoring.metrics import Counter, Histogram
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("test_latency_seconds", "Test latency.", ("route",), buckets=(0.1, 1.0))
+    histogram.labels("/reviews/select").observe(0.05)
+    histogram.labels("/reviews/select").observe(0.5)
+    histogram.labels("/reviews/select").observe(5)
+
+    assert histogram.render().splitlines() == [
+        "# HELP test_latency_seconds Test latency.",
+        "# TYPE test_latency_seconds histogram",
+        'test_latency_seconds_bucket{route="/reviews/select",le="0.1"} 1',
+        'test_latency_seconds_bucket{route="/reviews/select",le="1"} 2',
+        'test_latency_seconds_bucket{route="/reviews/select",le="+Inf"} 3',
+        'test_latency_seconds_sum{route="/reviews/select"} 5.55',
+        'test_latency_seconds_count{route="/reviews/select"} 3',
+    ]
+
+
+def test_counter_escapes_label_values():
+    counter = Counter("test_errors_total", "Test errors.", ("error",))
+    counter.labels('no such column: "x"').inc()
+
+    assert counter.samples() == ['test_errors_total{error="no such column: \\"x\\""} 1']
+
+
+def test_metrics_endpoint_reports_routes_and_queries(test_db, test_client):
+    test_client.post("/reviews/select", json={"table": "reviews"})
+
+    response = test_client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert 'http_request_duration_seconds_count{method="POST",route="/reviews/select",status="200"}' in body
+    assert 'db_query_duration_seconds_count{operation="select"}' in body
+    assert "db_connection_wait_seconds_count" in body
+    assert "threadpool_tasks_waiting 0" in body
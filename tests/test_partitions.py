@@ -0,0 +1,89 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from app import config
+from app.crud.create import insert_reviews
+from app.crud.delete import delete_reviews
+from app.crud.read import run_select_query
+from app.crud.update import update_review
+from app.crud.utils import build_select_query
+from app.data_loader.load_data import write_reviews
+from app.database import database
+from app.database.partitions import drop_partitions_before, month_key, partition_row_counts
+from app.models.models import ColumnToUpdate, Condition, QueryInput, Review
+from tests.test_integration_api_crud import sample_reviews
+
+
+@pytest.fixture
+def partitioned_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "STORAGE_LAYOUT", "partitioned")
+    monkeypatch.setattr(database, "db_path", str(tmp_path / "reviews.db"))
+    database.create_table()
+    # Three months: 2024-03 (two reviews), 2024-04, 2024-05 and 2024-06
+    assert insert_reviews([Review(**review) for review in sample_reviews]) == [1, 2, 3, 4, 5]
+
+
+def select(columns, conditions=()):
+    results = run_select_query(QueryInput(table="reviews", columns=columns, conditions=list(conditions)))
+    return results or []
+
+
+def test_month_key():
+    assert month_key("2024-03-03") == "2024_03"
+    assert month_key(19785) == "2024_03"
+    assert month_key(None) == month_key("not a date") == "undated"
+
+
+def test_inserts_are_routed_to_monthly_partitions(partitioned_db):
+    assert partition_row_counts() == {"reviews_2024_03": 2, "reviews_2024_04": 1, "reviews_2024_05": 1,
+                                      "reviews_2024_06": 1}
+    assert [row["id"] for row in select(["id"])] == [1, 2, 3, 4, 5]
+
+
+def test_select_reads_only_matching_partitions(partitioned_db):
+    conn = sqlite3.connect(database.db_path)
+    partitions = [row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'reviews_2%' ORDER BY name")]
+    query, _ = build_select_query(QueryInput(table="reviews", conditions=[
+        Condition(column="review_date", range=["2024-04-01", "2024-05-31"])]), partitions)
+
+    assert "reviews_2024_04" in query and "reviews_2024_05" in query
+    assert "reviews_2024_03" not in query and "reviews_2024_06" not in query
+    rows = select(["reviewer_name"], [Condition(column="review_date", equals="2024-03-03")])
+    assert sorted(row["reviewer_name"] for row in rows) == ["Danny Walters", "Jeff Bezos"]
+    # `contains` overrides `equals`, so the month of `equals` doesn't prune
+    rows = select(["reviewer_name"], [Condition(column="review_date", contains="-05-", equals="2024-03-03")])
+    assert [row["reviewer_name"] for row in rows] == ["Samuel Lee"]
+
+
+def test_update_moves_rows_between_partitions(partitioned_db):
+    updated = update_review([Condition(column="reviewer_name", equals="Jeff Bezos")],
+                            [ColumnToUpdate(column_name="review_date", column_value="2024-06-01"),
+                             ColumnToUpdate(column_name="review_title", column_value="Moved")])
+
+    assert updated == 1
+    assert partition_row_counts()["reviews_2024_03"] == 1
+    assert partition_row_counts()["reviews_2024_06"] == 2
+    rows = select(["id", "review_title", "review_date"], [Condition(column="reviewer_name", equals="Jeff Bezos")])
+    assert rows == [{"id": 2, "review_title": "Moved", "review_date": "2024-06-01"}]
+
+
+def test_delete_and_drop_partitions(partitioned_db):
+    assert delete_reviews([Condition(column="review_date", range=["2024-06-01", "2024-06-30"])]) == 1
+    assert drop_partitions_before("2024-05") == ["reviews_2024_03", "reviews_2024_04"]
+    assert [row["review_date"] for row in select(["review_date"])] == ["2024-05-21"]
+    assert delete_reviews() == 1
+
+
+def test_loader_writes_to_partitions(partitioned_db):
+    df = pd.DataFrame({"reviewer_name": ["A", "B", "C"], "review_date": ["2023-12-31", None, "2024-03-10"]})
+    conn = database.create_connection()
+    assert write_reviews(df, conn) == 3
+    conn.commit()
+    conn.close()
+
+    counts = partition_row_counts()
+    assert counts["reviews_2023_12"] == 1 and counts["reviews_undated"] == 1 and counts["reviews_2024_03"] == 3
+    assert sorted(row["id"] for row in select(["id"])) == [1, 2, 3, 4, 5, 6, 7, 8]
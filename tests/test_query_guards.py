@@ -0,0 +1,91 @@
+import pytest
+
+from app import config
+from app.crud.create import insert_reviews
+from app.database import database
+from app.database.database import QueryTimeoutError, statement_deadline
+from app.models.models import Review
+from tests.test_integration_api_crud import sample_reviews
+
+SLOW_QUERY = "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) SELECT COUNT(*) FROM n WHERE i < 0;"
+
+
+@pytest.fixture
+def guarded_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "db_path", str(tmp_path / "reviews.db"))
+    database.create_table()
+    assert insert_reviews([Review(**review) for review in sample_reviews])
+
+
+def select(test_client, **query):
+    return test_client.post("/reviews/select", json={"table": "reviews", "columns": ["id"], **query})
+
+
+def test_selects_without_limit_matching_more_than_the_cap_are_rejected(guarded_db, test_client, monkeypatch):
+    monkeypatch.setattr(config, "SELECT_DEFAULT_LIMIT", 4)
+
+    response = select(test_client)
+    batch_response = test_client.post("/reviews/select/batch", json=[{"table": "reviews", "limit": 1},
+                                                                     {"table": "reviews"}])
+
+    assert response.status_code == 400
+    assert "offset" in response.json()["detail"]
+    assert batch_response.status_code == 400
+
+
+def test_selects_without_limit_under_the_cap_return_every_row(guarded_db, test_client, monkeypatch):
+    monkeypatch.setattr(config, "SELECT_DEFAULT_LIMIT", 5)
+
+    response = select(test_client)
+
+    assert response.json() == [{"id": 1}, {"id": 2}, {"id": 3}, {"id": 4}, {"id": 5}]
+    assert "X-Next-Offset" not in response.headers
+
+
+def test_selects_are_paginated(guarded_db, test_client):
+    first_page = select(test_client, limit=2)
+    second_page = select(test_client, limit=2, offset=int(first_page.headers["X-Next-Offset"]))
+    last_page = select(test_client, limit=2, offset=4)
+
+    assert first_page.json() == [{"id": 1}, {"id": 2}]
+    assert second_page.json() == [{"id": 3}, {"id": 4}]
+    assert second_page.headers["X-Next-Offset"] == "4"
+    assert last_page.json() == [{"id": 5}]
+    assert "X-Next-Offset" not in last_page.headers
+
+
+def test_limit_above_maximum_is_rejected(guarded_db, test_client, monkeypatch):
+    monkeypatch.setattr(config, "SELECT_MAX_LIMIT", 3)
+
+    response = select(test_client, limit=4)
+
+    assert response.status_code == 400
+    assert response.json()["max_limit"] == 3
+    assert "offset" in response.json()["detail"]
+    assert select(test_client, limit=3).status_code == 200
+
+
+def test_statement_deadline_interrupts_long_statements(guarded_db):
+    conn = database.create_connection()
+    with pytest.raises(QueryTimeoutError):
+        with statement_deadline(conn, timeout_ms=50):
+            conn.execute(SLOW_QUERY).fetchall()
+    # The handler is removed with the block, later statements run without a deadline
+    assert conn.execute("SELECT COUNT(*) FROM reviews;").fetchone()[0] == 5
+    conn.close()
+
+
+def test_slow_select_is_interrupted(guarded_db, test_client, monkeypatch):
+    conn = database.create_connection()
+    conn.execute("INSERT INTO reviews (reviewer_name, review_title) "
+                 "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 200000) "
+                 "SELECT 'Reviewer ' || i, 'Title ' || i FROM n;")
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr(config, "QUERY_TIMEOUT_MS", 1)
+
+    response = test_client.post("/reviews/select?count=exact",
+                                json={"table": "reviews", "conditions": [{"column": "review_title", "contains": "x"}]})
+
+    assert response.status_code == 400
+    assert "limit" in response.json()["detail"]
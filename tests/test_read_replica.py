@@ -0,0 +1,137 @@
+import sqlite3
+import threading
+
+import pytest
+
+from app import config
+from app.crud.create import insert_reviews
+from app.crud import read
+from app.crud.delete import delete_reviews
+from app.crud.read import run_select_query
+from app.crud.update import update_review
+from app.database import database
+from app.database.change_log import log_changes, log_truncate
+from app.database.read_replica import REPLICA, create_read_connection
+from app.models.models import ColumnToUpdate, Condition, QueryInput, Review
+from tests.test_integration_api_crud import sample_reviews
+
+
+@pytest.fixture(params=["single", "split"])
+def replica_db(request, tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "STORAGE_LAYOUT", request.param)
+    monkeypatch.setattr(database, "db_path", str(tmp_path / "reviews.db"))
+    database.create_table()
+    assert insert_reviews([Review(**review) for review in sample_reviews])
+    REPLICA.load()
+    yield
+    REPLICA.close()
+
+
+def titles():
+    return {row["id"]: row["review_title"]
+            for row in run_select_query(QueryInput(table="reviews", columns=["id", "review_title"])) or []}
+
+
+def test_selects_are_served_from_the_replica(replica_db):
+    conn = create_read_connection()
+    assert conn.execute("PRAGMA database_list;").fetchone()[2] == ""
+    conn.close()
+
+    # Changes to the file that were not logged are not seen
+    disk = sqlite3.connect(database.db_path)
+    disk.execute("UPDATE reviews SET review_title = 'Unlogged' WHERE id = 1;")
+    disk.commit()
+    disk.close()
+
+    assert titles()[1] == sample_reviews[0]["review_title"]
+    assert len(titles()) == 5
+
+
+def test_own_writes_are_read_back(replica_db):
+    assert insert_reviews([Review(**{**sample_reviews[0], "review_title": "Inserted"})]) == [6]
+    update_review([Condition(column="id", equals="2")], [ColumnToUpdate(column_name="review_title",
+                                                                         column_value="Updated")])
+    delete_reviews([Condition(column="id", equals="3")])
+
+    current = titles()
+
+    assert (current[6], current[2]) == ("Inserted", "Updated")
+    assert 3 not in current
+    content = run_select_query(QueryInput(table="reviews", columns=["review_content"],
+                                          conditions=[Condition(column="id", equals="6")]))
+    assert content == [{"review_content": sample_reviews[0]["review_content"]}]
+
+
+def test_writes_of_other_processes_are_synced(replica_db):
+    disk = database.create_connection()
+    disk.execute("UPDATE reviews SET review_title = 'Elsewhere' WHERE id = 4;")
+    log_changes(disk, [4], "update")
+    disk.commit()
+    disk.close()
+    assert titles()[4] != "Elsewhere"
+
+    assert REPLICA.sync() == 1
+
+    assert titles()[4] == "Elsewhere"
+    assert REPLICA.sync() == 0
+
+
+def test_truncate_empties_the_replica(replica_db):
+    disk = database.create_connection()
+    log_truncate(disk)
+    disk.execute("DELETE FROM reviews;")
+    disk.commit()
+    disk.close()
+    assert len(titles()) == 5
+
+    assert REPLICA.sync() == 0
+    assert titles() == {}
+
+    assert insert_reviews([Review(**sample_reviews[2])]) == [1]
+    delete_reviews()
+    assert insert_reviews([Review(**sample_reviews[3])]) == [1]
+    assert titles() == {1: sample_reviews[3]["review_title"]}
+
+
+def test_schema_change_reloads_the_replica(replica_db):
+    uri = REPLICA.uri
+    disk = database.create_connection()
+    disk.execute("CREATE INDEX idx_reviews_rating ON reviews (review_rating);")
+    disk.commit()
+    disk.close()
+
+    REPLICA.sync()
+
+    assert REPLICA.uri != uri
+    conn = create_read_connection()
+    assert conn.execute("SELECT name FROM sqlite_master WHERE name = 'idx_reviews_rating';").fetchone()
+    conn.close()
+
+
+def test_batches_and_totals_read_one_version_of_the_replica(replica_db, monkeypatch):
+    select_rows = read.select_rows
+    syncs = []
+
+    def select_then_sync(*args):
+        results = select_rows(*args)
+        if not syncs:
+            # Another process writes, and a sync starts, between the two statements
+            disk = database.create_connection()
+            review_id = disk.execute("INSERT INTO reviews (reviewer_name) VALUES ('Elsewhere');").lastrowid
+            log_changes(disk, [review_id], "insert")
+            disk.commit()
+            disk.close()
+            syncs.append(threading.Thread(target=REPLICA.sync))
+            syncs[-1].start()
+            syncs[-1].join(0.2)
+        return results
+
+    monkeypatch.setattr(read, "select_rows", select_then_sync)
+    results = read.run_select_batch([QueryInput(table="reviews", columns=["id"])] * 2)
+    syncs.pop().join()
+    assert results[0] == results[1]
+
+    results, total, _ = read.run_select_query_with_total(QueryInput(table="reviews", columns=["id"]))
+    syncs.pop().join()
+    assert len(results) == total == 6
+    assert len(titles()) == 7
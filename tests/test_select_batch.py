@@ -0,0 +1,58 @@
+import pytest
+
+from app import config
+from app.crud import read
+from app.crud.create import insert_reviews
+from app.database import database
+from app.models.models import QueryInput, Review
+from tests.test_integration_api_crud import sample_reviews
+
+
+@pytest.fixture
+def batch_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "db_path", str(tmp_path / "reviews.db"))
+    database.create_table()
+    assert insert_reviews([Review(**review) for review in sample_reviews])
+
+
+def test_batch_results_are_keyed_by_index(batch_db, test_client):
+    response = test_client.post("/reviews/select/batch", json=[
+        {"table": "reviews", "columns": ["id"], "limit": 2},
+        {"table": "reviews", "columns": ["reviewer_name"], "conditions": [{"column": "country", "equals": "Canada"}]},
+        {"table": "reviews", "columns": ["no_such_column"]},
+    ])
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["results"] == {"0": [{"id": 1}, {"id": 2}], "1": [{"reviewer_name": "Alexa Johnson"}]}
+    assert body["next_offsets"] == {"0": 2}
+    assert list(body["errors"]) == ["2"]
+
+
+def test_batch_size_and_row_limits_are_enforced(batch_db, test_client, monkeypatch):
+    monkeypatch.setattr(config, "SELECT_BATCH_MAX_QUERIES", 2)
+    monkeypatch.setattr(config, "SELECT_MAX_LIMIT", 3)
+
+    assert test_client.post("/reviews/select/batch", json=[{"table": "reviews"}] * 3).status_code == 400
+    response = test_client.post("/reviews/select/batch", json=[{"table": "reviews"}, {"table": "reviews", "limit": 4}])
+    assert response.status_code == 400
+    assert response.json()["max_limit"] == 3
+
+
+def test_batch_reads_one_snapshot(batch_db, monkeypatch):
+    conn = database.create_connection()
+    conn.execute("PRAGMA journal_mode = WAL;")
+    conn.close()
+    select_rows = read.select_rows
+
+    def select_then_write(*args):
+        results = select_rows(*args)
+        # Committed between the two queries of the batch
+        assert insert_reviews([Review(**sample_reviews[0])])
+        return results
+
+    monkeypatch.setattr(read, "select_rows", select_then_write)
+    results = read.run_select_batch([QueryInput(table="reviews", columns=["id"])] * 2)
+
+    assert results[0] == results[1]
+    assert len(results[1]) == 5
@@ -0,0 +1,76 @@
+import sqlite3
+
+import pytest
+
+from app import config
+from app.crud.create import insert_reviews
+from app.crud.update import update_review
+from app.database import database
+from app.models.models import ColumnToUpdate, Condition, Review
+from app.monitoring.slow_queries import (SLOW_QUERY_LOG, SlowQueryLog, explain_query_plan, normalize_sql,
+                                         uses_full_scan)
+from tests.test_integration_api_crud import sample_reviews
+
+
+@pytest.mark.parametrize("sql, expected", [
+    ("SELECT *\n  FROM reviews   WHERE id = ?", "SELECT * FROM reviews WHERE id = ?"),
+    ("DELETE FROM reviews WHERE 1 = 1;", "DELETE FROM reviews WHERE ? = ?;"),
+    ("SELECT * FROM reviews_2024_01 WHERE country = 'it''s'", "SELECT * FROM reviews_2024_01 WHERE country = ?"),
+])
+def test_normalize_sql(sql, expected):
+    assert normalize_sql(sql) == expected
+
+
+def test_explain_query_plan_detects_full_scan():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE reviews (id INTEGER PRIMARY KEY, country TEXT)")
+
+    scan_plan = explain_query_plan(conn, "SELECT * FROM reviews WHERE country = ?", ["Canada"])
+    search_plan = explain_query_plan(conn, "SELECT * FROM reviews WHERE id = ?", [1])
+
+    assert uses_full_scan(scan_plan)
+    assert not uses_full_scan(search_plan)
+
+
+def test_slow_query_log_is_bounded():
+    log = SlowQueryLog(capacity=2)
+    for i in range(3):
+        log.add({"sql": f"query {i}"})
+
+    assert [entry["sql"] for entry in log.entries()] == ["query 2", "query 1"]
+
+
+def test_slow_queries_endpoint(test_db, test_client, monkeypatch):
+    monkeypatch.setattr("app.config.SLOW_QUERY_THRESHOLD_MS", 0)
+    test_client.delete("/admin/slow-queries")
+
+    test_client.post("/reviews/select", json={"table": "reviews",
+                                              "conditions": [{"column": "country", "equals": "Canada"}]})
+
+    response = test_client.get("/admin/slow-queries")
+    assert response.status_code == 200
+    entry = response.json()["queries"][0]
+    assert entry["operation"] == "select"
+    assert entry["sql"] == "SELECT * FROM reviews WHERE country = ? LIMIT ?"
+    assert entry["parameter_shape"] == ["str", "int"]
+    assert entry["full_scan"] is True
+
+
+@pytest.mark.parametrize("layout, expected_sql", [
+    ("single", ["UPDATE reviews SET review_title = ? WHERE country = ?"]),
+    # Several statements run per update, none of them the plain UPDATE, so there is no single one to log
+    ("partitioned", []),
+    ("split", []),
+])
+def test_slow_update_logs_the_statement_it_ran(tmp_path, monkeypatch, layout, expected_sql):
+    monkeypatch.setattr(config, "STORAGE_LAYOUT", layout)
+    monkeypatch.setattr(database, "db_path", str(tmp_path / "reviews.db"))
+    database.create_table()
+    insert_reviews([Review(**review) for review in sample_reviews])
+    monkeypatch.setattr(config, "SLOW_QUERY_THRESHOLD_MS", 0)
+    SLOW_QUERY_LOG.clear()
+
+    assert update_review([Condition(column="country", equals="Canada")],
+                         [ColumnToUpdate(column_name="review_title", column_value="Updated")]) == 1
+
+    assert [entry["sql"] for entry in SLOW_QUERY_LOG.entries() if entry["operation"] == "update"] == expected_sql
@@ -0,0 +1,120 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from app import config
+from app.crud.create import insert_reviews
+from app.crud.delete import delete_reviews
+from app.crud.read import run_select_query
+from app.crud.update import update_review, update_reviews_batch
+from app.crud.utils import build_select_query
+from app.data_loader.load_data import write_reviews
+from app.database import database
+from app.database.text_compression import compress_text, decompress_text
+from app.models.models import ColumnToUpdate, Condition, QueryInput, Review, ReviewUpdate
+from tests.test_integration_api_crud import sample_reviews
+
+LONG_CONTENT = "The delivery was late but the support team sorted it out quickly. " * 10
+
+
+@pytest.fixture
+def split_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "STORAGE_LAYOUT", "split")
+    monkeypatch.setattr(database, "db_path", str(tmp_path / "reviews.db"))
+    database.create_table()
+    reviews = [Review(**review) for review in sample_reviews]
+    reviews[0].review_content = LONG_CONTENT
+    assert insert_reviews(reviews) == [1, 2, 3, 4, 5]
+
+
+def select(columns, conditions=()):
+    return run_select_query(QueryInput(table="reviews", columns=columns, conditions=list(conditions))) or []
+
+
+def stored_content(review_id):
+    conn = sqlite3.connect(database.db_path)
+    value = conn.execute("SELECT review_content FROM review_contents WHERE id = ?", [review_id]).fetchone()[0]
+    conn.close()
+    return value
+
+
+def stored_content_count():
+    conn = sqlite3.connect(database.db_path)
+    count = conn.execute("SELECT COUNT(*) FROM review_contents").fetchone()[0]
+    conn.close()
+    return count
+
+
+def test_compression_round_trip(monkeypatch):
+    assert isinstance(compress_text(LONG_CONTENT), bytes)
+    assert decompress_text(compress_text(LONG_CONTENT)) == LONG_CONTENT
+    assert compress_text("Good food") == "Good food"
+    monkeypatch.setattr(config, "CONTENT_COMPRESSION", False)
+    assert compress_text(LONG_CONTENT) == LONG_CONTENT
+
+
+def test_content_is_joined_only_when_requested(split_db):
+    narrow_query, _ = build_select_query(QueryInput(table="reviews", columns=["id", "reviewer_name"]))
+    wide_query, _ = build_select_query(QueryInput(table="reviews", columns=["id", "review_content"]))
+
+    assert "review_contents" not in narrow_query
+    assert "review_contents" in wide_query
+    assert isinstance(stored_content(1), bytes)
+    assert select(["id", "review_content"], [Condition(column="id", equals="1")]) == [
+        {"id": 1, "review_content": LONG_CONTENT}]
+    assert list(select(None, [Condition(column="id", equals="2")])[0]) == database.REVIEW_COLUMNS
+
+
+def test_conditions_on_content(split_db):
+    rows = select(["reviewer_name"], [Condition(column="review_content", contains="support team")])
+    assert rows == [{"reviewer_name": "Danny Walters"}]
+
+    assert delete_reviews([Condition(column="review_content", contains="support team")]) == 1
+    assert sorted(row["id"] for row in select(["id"])) == [2, 3, 4, 5]
+    conn = sqlite3.connect(database.db_path)
+    assert conn.execute("SELECT COUNT(*) FROM review_contents").fetchone()[0] == 4
+    conn.close()
+
+
+def test_delete_all_empties_both_tables_and_keeps_the_trigger(split_db):
+    assert delete_reviews([]) == 5
+
+    assert stored_content_count() == 0
+    conn = sqlite3.connect(database.db_path)
+    assert conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'").fetchall() == [
+        ("delete_review_content",)]
+    conn.close()
+    assert insert_reviews([Review(**sample_reviews[0])]) == [1]
+    assert delete_reviews([Condition(column="id", equals="1")]) == 1
+    assert stored_content_count() == 0
+
+
+def test_updates_write_both_tables(split_db):
+    assert update_review([Condition(column="reviewer_name", equals="Jeff Bezos")],
+                         [ColumnToUpdate(column_name="review_content", column_value=LONG_CONTENT),
+                          ColumnToUpdate(column_name="reviewer_name", column_value="J. Bezos")]) == 1
+    results = update_reviews_batch([
+        ReviewUpdate(id=3, changes=[ColumnToUpdate(column_name="review_content", column_value="Short")]),
+        ReviewUpdate(id=4, changes=[ColumnToUpdate(column_name="review_title", column_value="Retitled")])])
+
+    assert [result["status"] for result in results] == ["updated", "updated"]
+    rows = select(["id", "reviewer_name", "review_title", "review_content"],
+                  [Condition(column="id", range=["2", "4"])])
+    assert rows[0] == {"id": 2, "reviewer_name": "J. Bezos", "review_title": rows[0]["review_title"],
+                       "review_content": LONG_CONTENT}
+    assert rows[1]["review_content"] == "Short"
+    assert rows[2]["review_title"] == "Retitled"
+
+
+def test_loader_writes_split_tables(split_db):
+    df = pd.DataFrame({"reviewer_name": ["A", "B"], "review_content": [LONG_CONTENT, None],
+                       "review_date": ["2024-01-01", "2024-01-02"]})
+    conn = database.create_connection()
+    assert write_reviews(df, conn) == 2
+    conn.commit()
+    conn.close()
+
+    rows = select(["id", "reviewer_name", "review_content"], [Condition(column="id", range=["6", "7"])])
+    assert rows == [{"id": 6, "reviewer_name": "A", "review_content": LONG_CONTENT},
+                    {"id": 7, "reviewer_name": "B", "review_content": None}]
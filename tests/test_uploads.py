@@ -0,0 +1,63 @@
+import os
+import time
+
+import pytest
+
+from app import config
+from app.crud.read import run_select_query
+from app.database import database
+from app.models.models import QueryInput
+from app.routes import main
+
+TEST_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "test_reviews.csv")
+
+
+@pytest.fixture
+def upload_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "db_path", str(tmp_path / "reviews.db"))
+    monkeypatch.setattr(config, "UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(config, "UPLOAD_CHUNK_ROWS", 10)
+    monkeypatch.setattr(config, "JOB_BATCH_PAUSE_MS", 0)
+    database.create_table()
+    return tmp_path
+
+
+def wait_for(test_client, job_id):
+    for _ in range(200):
+        job = test_client.get(f"/jobs/{job_id}").json()
+        if job["status"] not in ("pending", "running"):
+            return job
+        time.sleep(0.05)
+    raise AssertionError("Job did not finish")
+
+
+def test_upload_loads_in_the_background(upload_db, test_client):
+    with open(TEST_FILE, "rb") as csv_file:
+        response = test_client.post("/reviews/upload", content=csv_file.read(), headers={"Content-Type": "text/csv"})
+
+    assert response.status_code == 202
+    job = wait_for(test_client, response.json()["id"])
+    assert job["status"] == "completed", job["error"]
+    assert job["details"] == {"rows_read": 18, "rows_accepted": 16, "rows_rejected": 2}
+    assert (job["total"], job["processed"], job["batches"]) == (16, 16, 2)
+    assert job["elapsed_seconds"] >= 0
+    assert len(run_select_query(QueryInput(table="reviews", columns=["id"]))) == 16
+    # The uploaded file is removed once loaded
+    assert not [name for name in os.listdir(upload_db) if name.startswith("reviews_upload_")]
+
+
+def test_invalid_uploads_are_refused(upload_db, test_client, monkeypatch):
+    assert test_client.post("/reviews/upload?format=xlsx", content=b"x").status_code == 400
+    assert test_client.post("/reviews/upload", content=b"").status_code == 400
+    monkeypatch.setattr(main, "parquet_supported", lambda: False)
+    assert test_client.post("/reviews/upload?format=parquet", content=b"PAR1").status_code == 415
+    monkeypatch.setattr(config, "UPLOAD_MAX_BYTES", 3)
+    assert test_client.post("/reviews/upload", content=b"a,b\n1,2\n").status_code == 413
+
+
+def test_upload_with_missing_columns_fails_the_job(upload_db, test_client):
+    response = test_client.post("/reviews/upload", content=b"Reviewer Name\nJohn\n")
+
+    job = wait_for(test_client, response.json()["id"])
+    assert job["status"] == "failed"
+    assert "Missing columns" in job["error"]
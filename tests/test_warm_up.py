@@ -0,0 +1,31 @@
+import sqlite3
+
+from app.database import database
+from app.countries.lookup import country_lookup
+from app.warm_up import prime_page_cache, warm_up
+
+
+def test_prime_page_cache_is_capped(tmp_path):
+    db_file = tmp_path / "reviews.db"
+    db_file.write_bytes(b"x" * 5000)
+    (tmp_path / "reviews.db-wal").write_bytes(b"y" * 5000)
+
+    assert prime_page_cache(str(db_file), 100_000) == 10_000
+    assert prime_page_cache(str(db_file), 6000) == 6000
+    assert prime_page_cache(str(tmp_path / "missing.db"), 100_000) == 0
+
+
+def test_warm_up_runs_every_step():
+    durations = warm_up()
+
+    assert set(durations) == {"database_connection", "page_cache", "country_lookup"}
+    assert country_lookup() is country_lookup()
+
+
+def test_enable_wal(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "db_path", str(tmp_path / "reviews.db"))
+
+    assert database.enable_wal() == "wal"
+    conn = sqlite3.connect(database.db_path)
+    assert conn.execute("PRAGMA journal_mode;").fetchone()[0] == "wal"
+    conn.close()